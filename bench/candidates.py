@@ -0,0 +1,103 @@
+"""Benchmark: memory and time of digest/breaking candidate selection per sweep.
+
+Usage (from the repo root):
+    python -m bench.candidates [--sizes 1000,10000,50000] [--seen-share 0.3] [--runs 5]
+
+Fills a scratch entry store with synthetic rows (reworded duplicate
+headlines, a spread of scores, some non-English / irrelevant / already
+seen), then runs the selection that follows every sweep both ways: the
+previous list-of-dicts path (kept here verbatim as the baseline) and
+feeds.select_news (generator chain over Candidate). Reports median wall
+time and tracemalloc peak for one run, and
+checks that both return the same candidates in the same order.
+"""
+
+import argparse, json, os, random, statistics, sys, tempfile, time, tracemalloc
+from datetime import datetime, timedelta
+
+from bench.dedupe import make_items
+
+FEEDS = [f"https://feed{i}.example.com/rss" for i in range(40)]
+TTL_DAYS = 14
+
+def fill(n, seen_share, seed=7):
+    from red_horizon import db, entries
+    from red_horizon.dedupe import normalize, signature
+    rng, now = random.Random(seed), time.time()
+    c = db.conn()
+    with c:
+        c.execute("DELETE FROM entries")
+    rows, seen = [], {}
+    for i, it in enumerate(make_items(n, seed)):
+        title = it["title"] if rng.random() > 0.1 else it["title"] + " — наука"   # ~10% fail is_english
+        english = rng.random() > 0.1
+        relevant = rng.random() > 0.3
+        norm = normalize(title) if english and relevant else None
+        link = f"https://news.example.com/{i}"
+        if rng.random() < seen_share: seen[link] = now - rng.uniform(0, 20) * 86400
+        rows.append((rng.choice(FEEDS), link, title, now - rng.uniform(0, 9) * 86400, english, relevant,
+                     round(rng.uniform(-1, 6) * 4) / 4, 0.0, None, norm,
+                     json.dumps(signature(norm)) if norm else None, now, None))
+    with c:
+        c.executemany(f"INSERT INTO entries ({','.join(entries._COLS)}) VALUES ({','.join('?' * len(entries._COLS))})", rows)
+    return seen
+
+def reference_select(seen, posted=None):
+    """The pre-Candidate fetch_news selection: dict rows, list copies, then dedupe."""
+    from red_horizon import db
+    from red_horizon.config import UTC, BREAKING_MIN_SCORE, FRESHNESS_DAYS
+    from red_horizon.feeds import _not_recently_seen, fuzzy_dedupe
+    since = (datetime.now(UTC) - timedelta(days=FRESHNESS_DAYS)).timestamp()
+    rows = []
+    for r in db.conn().execute(f"SELECT * FROM entries WHERE feed IN ({','.join('?' * len(FEEDS))}) "
+                               "AND published >= ? ORDER BY feed, published DESC", [*FEEDS, since]):
+        d = dict(r)
+        d["sig"] = json.loads(d["sig"]) if d["sig"] else None
+        rows.append(d)
+    rows = [r for r in rows if r["english"] and r["relevant"]]
+    rows = [r for r in rows if r["score"] >= BREAKING_MIN_SCORE]
+    items = [{"title": r["title"], "link": r["link"], "published": datetime.fromtimestamp(r["published"], UTC),
+              "score": r["score"], "norm": r["norm"], "sig": r["sig"]}
+             for r in rows if _not_recently_seen(r["link"], seen, TTL_DAYS)]
+    newest = {}
+    for it in items:
+        prev = newest.get(it["title"])
+        if (not prev) or (it["published"] > prev["published"]) or (it["score"] > prev["score"]):
+            newest[it["title"]] = it
+    dedup = fuzzy_dedupe(list(newest.values()), history=posted)
+    dedup.sort(key=lambda x: (x["score"], x["published"]), reverse=True)
+    return dedup
+
+def measure(fn, runs):
+    lat = []
+    for _ in range(runs):
+        t = time.perf_counter(); res = fn(); lat.append(time.perf_counter() - t)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return res, statistics.median(lat), peak
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="1000,10000,50000")
+    ap.add_argument("--seen-share", type=float, default=0.3)
+    ap.add_argument("--runs", type=int, default=5)
+    args = ap.parse_args()
+
+    repo = os.getcwd()
+    os.chdir(tempfile.mkdtemp(prefix="rh-bench-"))   # scratch state.db
+    sys.path.insert(0, repo)
+    from red_horizon.feeds import select_news
+
+    print(f"{'rows':>7} {'kept':>6} {'ref_ms':>9} {'new_ms':>9} {'ref_peak_KiB':>13} {'new_peak_KiB':>13} {'same':>5}")
+    for n in (int(x) for x in args.sizes.split(",")):
+        seen = fill(n, args.seen_share)
+        ref, t_ref, p_ref = measure(lambda: reference_select(seen), args.runs)
+        new, t_new, p_new = measure(lambda: select_news(FEEDS, seen, TTL_DAYS), args.runs)
+        same = [(x["title"], x["link"]) for x in ref] == [(x["title"], x["link"]) for x in new]
+        print(f"{n:>7} {len(new):>6} {t_ref*1000:>9.1f} {t_new*1000:>9.1f} "
+              f"{p_ref/1024:>13.0f} {p_new/1024:>13.0f} {str(same):>5}")
+
+if __name__ == "__main__":
+    main()
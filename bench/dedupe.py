@@ -0,0 +1,82 @@
+"""Benchmark: MinHash/LSH dedupe vs the original all-pairs SequenceMatcher.
+
+Usage (from the repo root):
+    python -m bench.dedupe [--sizes 100,300,1000] [--threshold 0.9]
+
+Builds a synthetic headline set where every story appears under a few
+reworded variants, runs both implementations, and reports wall time and
+recall: the share of items the reference drops that the LSH engine also
+drops (1.0 means identical output).
+"""
+
+import argparse, random, re, time
+from difflib import SequenceMatcher
+
+from red_horizon.dedupe import dedupe
+
+SUBJECTS = ["SpaceX", "NASA", "ESA", "Rocket Lab", "Blue Origin", "ULA", "Arianespace", "JAXA", "Firefly"]
+VEHICLES = ["Starship", "Falcon 9", "Super Heavy", "New Glenn", "Vulcan", "Electron", "Ariane 6", "Neutron", "SLS"]
+EVENTS = ["launches", "scrubs launch of", "completes static fire of", "rolls out", "delays", "stacks",
+          "reveals new", "prepares wet dress rehearsal for", "tests engines on", "announces next flight of"]
+TAILS = ["from Starbase", "at Cape Canaveral", "after weather delay", "ahead of Mars mission",
+         "carrying Starlink satellites", "for crewed mission", "in record turnaround", "on flight {n}"]
+SUFFIXES = ["", " - Space.com", " | NASASpaceflight.com", " (video)", ""]
+
+def _headline(rng):
+    t = f"{rng.choice(SUBJECTS)} {rng.choice(EVENTS)} {rng.choice(VEHICLES)} {rng.choice(TAILS)}"
+    return t.format(n=rng.randint(1, 40))
+
+def _variant(rng, title):
+    t = title
+    r = rng.random()
+    if r < 0.25: t = t.upper() if rng.random() < 0.3 else t.replace(" ", "  ")
+    elif r < 0.5: t = t + rng.choice(SUFFIXES)
+    elif r < 0.7: t = re.sub(r"\bthe\b|\ba\b", "", t) + "!"
+    elif r < 0.85: t = "BREAKING: " + t
+    else:
+        i = rng.randrange(len(t)); t = t[:i] + t[i+1:]   # typo
+    return t
+
+def make_items(n, seed=1):
+    rng = random.Random(seed)
+    items = []
+    while len(items) < n:
+        base = _headline(rng)
+        items.append({"title": base})
+        for _ in range(rng.randint(0, 3)):
+            items.append({"title": _variant(rng, base)})
+    rng.shuffle(items)
+    return items[:n]
+
+def reference_dedupe(items, threshold=0.90):
+    """The pre-LSH fuzzy_dedupe, kept verbatim as the baseline."""
+    kept, norms = [], []
+    def norm(t):
+        t = t.lower()
+        t = re.sub(r"[^a-z0-9 ]+", " ", t)
+        return re.sub(r"\s+", " ", t).strip()
+    for it in items:
+        n = norm(it["title"])
+        if any(SequenceMatcher(None, n, s).ratio() >= threshold for s in norms):
+            continue
+        kept.append(it); norms.append(n)
+    return kept
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="100,300,1000")
+    ap.add_argument("--threshold", type=float, default=0.90)
+    args = ap.parse_args()
+
+    print(f"{'n':>6} {'ref_s':>9} {'lsh_s':>9} {'speedup':>8} {'ref_kept':>9} {'lsh_kept':>9} {'recall':>7}")
+    for n in (int(x) for x in args.sizes.split(",")):
+        items = make_items(n)
+        t = time.perf_counter(); ref = reference_dedupe(items, args.threshold); t_ref = time.perf_counter() - t
+        t = time.perf_counter(); lsh = dedupe(items, args.threshold); t_lsh = time.perf_counter() - t
+        ref_drop = {id(x) for x in items} - {id(x) for x in ref}
+        lsh_drop = {id(x) for x in items} - {id(x) for x in lsh}
+        recall = len(ref_drop & lsh_drop) / len(ref_drop) if ref_drop else 1.0
+        print(f"{n:>6} {t_ref:>9.3f} {t_lsh:>9.3f} {t_ref/max(t_lsh,1e-9):>7.1f}x {len(ref):>9} {len(lsh):>9} {recall:>7.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Local stand-in for every upstream the bot talks to.
+
+    GET  /feeds/<n>/<original host>...   feed fixture n
+    POST /bot<token>/<method>            Telegram Bot API (sendMessage, sendPhoto, ...)
+    POST /zapier                         Zapier catch hook
+
+Telegram calls fail with 429 + Retry-After or 5xx at configurable rates so
+the retry path is exercised. Every request is counted per route.
+"""
+
+import json, random, threading, time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+class _Server(ThreadingHTTPServer):
+    request_queue_size = 128   # a whole sweep connects at once; the default 5 drops SYNs (1s retransmit)
+
+class FakeUpstream:
+    def __init__(self, docs, tg_429_rate=0.0, tg_5xx_rate=0.0, retry_after=1,
+                 feed_delay=0.0, seed=0):
+        self.docs = docs                     # original url -> bytes
+        self.tg_429_rate, self.tg_5xx_rate = tg_429_rate, tg_5xx_rate
+        self.retry_after = retry_after
+        self.feed_delay = feed_delay
+        self.counts = Counter()
+        self.sent = []                       # (method, payload) accepted by the fake Telegram
+        self._rng = random.Random(seed)
+        self._mu = threading.Lock()
+        self._routes = {}
+        self._httpd = _Server(("127.0.0.1", 0), self._handler())
+        self._httpd.daemon_threads = True
+        self._httpd.handle_error = lambda *a: None   # clients hang up mid-body on purpose
+        self.base = f"http://127.0.0.1:{self._httpd.server_address[1]}"
+        for i, url in enumerate(docs):
+            p = urlparse(url)
+            route = f"/feeds/{i}/{p.hostname}{p.path}"
+            self._routes[route] = url
+        self.urls = {url: self.base + route for route, url in self._routes.items()}
+
+    # ---------- lifecycle ----------
+    def start(self):
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown(); self._httpd.server_close()
+
+    def __enter__(self): return self.start()
+    def __exit__(self, *exc): self.stop()
+
+    # ---------- request handling ----------
+    def _roll(self):
+        with self._mu:
+            r = self._rng.random()
+        if r < self.tg_429_rate: return 429
+        if r < self.tg_429_rate + self.tg_5xx_rate: return 502
+        return 200
+
+    def _handler(self):
+        up = self
+
+        class H(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *a): pass
+
+            def _send(self, code, body=b"", ctype="application/json", headers=None):
+                self.send_response(code)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                for k, v in (headers or {}).items(): self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                url = up._routes.get(urlparse(self.path).path)
+                if url is None:
+                    up.counts["feed_404"] += 1; return self._send(404, b"not found", "text/plain")
+                up.counts["feed"] += 1
+                if up.feed_delay: time.sleep(up.feed_delay)
+                self._send(200, up.docs[url], "application/xml")
+
+            def do_HEAD(self):
+                up.counts["head"] += 1
+                self._send(200, b"", "image/jpeg")
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                path = urlparse(self.path).path
+                if path == "/zapier":
+                    up.counts["zapier"] += 1
+                    return self._send(200, b'{"status":"success"}')
+                if not path.startswith("/bot"):
+                    return self._send(404, b"{}")
+                method = path.rsplit("/", 1)[-1]
+                code = up._roll()
+                up.counts[f"tg_{code}"] += 1
+                if code == 429:
+                    return self._send(429, json.dumps({"ok": False, "error_code": 429,
+                        "parameters": {"retry_after": up.retry_after}}).encode(),
+                        headers={"Retry-After": str(up.retry_after)})
+                if code >= 500:
+                    return self._send(code, b'{"ok":false,"error_code":502}')
+                try: payload = json.loads(body or b"{}")
+                except ValueError: payload = {}
+                with up._mu:
+                    up.sent.append((method, payload))
+                self._send(200, json.dumps({"ok": True, "result": {"message_id": len(up.sent)}}).encode())
+
+        return H
@@ -0,0 +1,148 @@
+"""Feed fixtures for offline benchmarks.
+
+Synthetic fixtures are deterministic, real-sized documents (RSS 2.0 with
+HTML descriptions, Atom, YouTube channel feeds) whose entries are dated
+relative to "now", so freshness / breaking windows behave as in
+production. Recorded fixtures can be used instead:
+
+    python -m bench.fixtures record bench/recorded     # needs network
+    python -m bench.pipeline --fixtures bench/recorded
+
+A recorded directory holds one file per feed plus index.json mapping the
+original feed URL to its file name.
+"""
+
+import argparse, hashlib, json, os, random, time
+from email.utils import formatdate
+from urllib.parse import urlparse
+from xml.sax.saxutils import escape
+
+SUBJECTS = ["SpaceX", "NASA", "ESA", "Rocket Lab", "Blue Origin", "ULA", "Arianespace", "JAXA",
+            "Firefly", "Relativity", "ISRO", "China", "Astronomers", "Scientists"]
+VEHICLES = ["Starship", "Falcon 9", "Super Heavy booster", "New Glenn", "Vulcan", "Electron",
+            "Ariane 6", "Neutron", "SLS", "Crew Dragon", "Orion", "JWST", "Hubble", "Mars rover"]
+EVENTS = ["launches", "scrubs launch of", "completes static fire of", "rolls out", "delays",
+          "stacks", "reveals", "prepares wet dress rehearsal for", "tests engines on",
+          "announces next flight of", "captures new images with", "reports anomaly on"]
+TAILS = ["from Starbase", "at Cape Canaveral", "after weather delay", "ahead of Mars mission",
+         "carrying Starlink satellites", "for crewed mission", "in record turnaround",
+         "— live coverage", "(upcoming premiere)", "in weekly roundup", "podcast episode"]
+FOREIGN = ["La fusée Ariane 6 décolle à Kourou", "Запуск ракеты Союз", "宇宙ステーションの新しい実験",
+           "Die Rakete startet morgen früh"]
+LOREM = ("The vehicle lifted off from the pad after a short hold while engineers reviewed "
+         "telemetry from the second stage. Teams at the launch site said the countdown went "
+         "smoothly and the booster returned for a landing on the drone ship. ").split()
+
+def _title(rng):
+    if rng.random() < 0.05: return rng.choice(FOREIGN)
+    return f"{rng.choice(SUBJECTS)} {rng.choice(EVENTS)} {rng.choice(VEHICLES)} {rng.choice(TAILS)}"
+
+def _summary(rng, words=220):
+    body = " ".join(rng.choice(LOREM) for _ in range(words))
+    img = f'<img src="https://cdn.example.com/img/{rng.randrange(10**6)}.jpg" width="{rng.choice([640, 1200, 2048])}" />'
+    return f"<p>{img}</p><p>{body}</p>"
+
+def _entries(rng, n, host, spread_h):
+    now = time.time()
+    for i in range(n):
+        title = _title(rng)
+        slug = hashlib.md5(f"{host}{i}{title}".encode()).hexdigest()[:10]
+        yield {
+            "title": title,
+            "link": f"https://{host}/news/{slug}",
+            "ts": now - (i * spread_h * 3600 / n) - rng.randrange(300),
+            "summary": _summary(rng),
+        }
+
+def rss(host, n=60, seed=0, spread_h=72):
+    rng = random.Random(f"rss{host}{seed}")
+    items = "".join(
+        f"<item><title>{escape(e['title'])}</title><link>{e['link']}</link>"
+        f"<guid>{e['link']}</guid><pubDate>{formatdate(e['ts'], usegmt=True)}</pubDate>"
+        f"<description>{escape(e['summary'])}</description>"
+        f"<enclosure url=\"https://cdn.example.com/enc/{i}.jpg\" type=\"image/jpeg\" length=\"123456\"/></item>"
+        for i, e in enumerate(_entries(rng, n, host, spread_h)))
+    return (f"<?xml version=\"1.0\" encoding=\"UTF-8\"?><rss version=\"2.0\"><channel>"
+            f"<title>{host}</title><link>https://{host}/</link>{items}</channel></rss>").encode()
+
+def atom(host, n=40, seed=0, spread_h=72):
+    rng = random.Random(f"atom{host}{seed}")
+    iso = lambda ts: time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(ts))
+    entries = "".join(
+        f"<entry><title>{escape(e['title'])}</title><link href=\"{e['link']}\"/><id>{e['link']}</id>"
+        f"<updated>{iso(e['ts'])}</updated><published>{iso(e['ts'])}</published>"
+        f"<summary type=\"html\">{escape(e['summary'])}</summary></entry>"
+        for e in _entries(rng, n, host, spread_h))
+    return (f"<?xml version=\"1.0\" encoding=\"utf-8\"?><feed xmlns=\"http://www.w3.org/2005/Atom\">"
+            f"<title>{host}</title><id>https://{host}/</id>{entries}</feed>").encode()
+
+def youtube(channel, n=15, seed=0, spread_h=48):
+    rng = random.Random(f"yt{channel}{seed}")
+    iso = lambda ts: time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime(ts))
+    now = time.time()
+    entries = []
+    for i in range(n):
+        vid = hashlib.md5(f"{channel}{i}".encode()).hexdigest()[:11]
+        title = _title(rng) + rng.choice(["", " LIVE", " | Premiere", ""])
+        ts = now - i * spread_h * 3600 / n - rng.randrange(120)
+        entries.append(
+            f"<entry><id>yt:video:{vid}</id><yt:videoId>{vid}</yt:videoId><title>{escape(title)}</title>"
+            f"<link rel=\"alternate\" href=\"https://www.youtube.com/watch?v={vid}\"/>"
+            f"<published>{iso(ts)}</published><updated>{iso(ts)}</updated>"
+            f"<media:group><media:title>{escape(title)}</media:title>"
+            f"<media:thumbnail url=\"https://i.ytimg.com/vi/{vid}/hqdefault.jpg\" width=\"480\" height=\"360\"/>"
+            f"<media:description>{escape(' '.join(rng.choice(LOREM) for _ in range(80)))}</media:description>"
+            f"</media:group></entry>")
+    return ("<?xml version=\"1.0\" encoding=\"UTF-8\"?><feed xmlns:yt=\"http://www.youtube.com/xml/schemas/2015\" "
+            "xmlns:media=\"http://search.yahoo.com/mrss/\" xmlns=\"http://www.w3.org/2005/Atom\">"
+            f"<title>{channel}</title>{''.join(entries)}</feed>").encode()
+
+def synthetic(feed_urls, image_urls, youtube_urls, seed=0):
+    """{original feed url: document bytes} for every configured feed."""
+    docs = {}
+    for i, u in enumerate(feed_urls):
+        host = (urlparse(u).hostname or "example.com").replace("www.", "")
+        docs[u] = atom(host, seed=seed) if i % 4 == 3 else rss(host, seed=seed)
+    for u in image_urls:
+        host = (urlparse(u).hostname or "example.com").replace("www.", "")
+        docs.setdefault(u, rss(host, n=30, seed=seed))
+    for u in youtube_urls:
+        docs[u] = youtube(u.rsplit("=", 1)[-1], seed=seed)
+    return docs
+
+def load_recorded(path):
+    with open(os.path.join(path, "index.json"), encoding="utf-8") as f:
+        index = json.load(f)
+    docs = {}
+    for url, name in index.items():
+        with open(os.path.join(path, name), "rb") as f:
+            docs[url] = f.read()
+    return docs
+
+def record(path):
+    """Snapshot every configured feed into `path` (one-off, needs network)."""
+    import requests
+    from red_horizon.sources import current
+    src = current()
+    os.makedirs(path, exist_ok=True)
+    index = {}
+    for url in dict.fromkeys([*src.feeds, *src.image_feeds, *src.youtube_feeds]):
+        name = hashlib.sha1(url.encode()).hexdigest()[:12] + ".xml"
+        try:
+            r = requests.get(url, timeout=20, headers={"User-Agent": "RedHorizonBot/1.0 (fixture recorder)"})
+            r.raise_for_status()
+        except Exception as e:
+            print(f"skip {url}: {e}"); continue
+        with open(os.path.join(path, name), "wb") as f:
+            f.write(r.content)
+        index[url] = name
+        print(f"{len(r.content):>9} bytes  {url}")
+    with open(os.path.join(path, "index.json"), "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=1)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("command", choices=["record"])
+    ap.add_argument("path")
+    args = ap.parse_args()
+    record(args.path)
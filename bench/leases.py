@@ -0,0 +1,86 @@
+"""Multi-process check of the task leases (red_horizon.lease).
+
+Usage (from the repo root):
+    python -m bench.leases [--backend sqlite|file|http] [--procs 2] [--seconds 6] [--ttl 0.5]
+
+Starts --procs worker processes in one scratch directory. Each one tries
+to take the same lease every ttl/5 seconds and prints every attempt. The
+first worker starts a moment early and quits halfway through, so its
+lease should expire and pass to another worker. With --backend http the
+workers use the /lease routes of the web app, which this process serves
+on a local port.
+
+Afterwards it checks that no grant ever overlapped a valid lease held by
+someone else. It also reports grants per worker and how long the
+handover took (the expected value is about ttl).
+"""
+
+import argparse, json, os, subprocess, sys, tempfile, threading, time
+
+def worker(ttl, seconds, delay):
+    from red_horizon import lease
+    time.sleep(delay)
+    me, end = lease.holder(), time.time() + seconds
+    while time.time() < end:
+        t = time.time()
+        ok, rec = lease.acquire("demo", ttl)
+        print(json.dumps({"t": t, "who": me, "ok": ok, "expires": rec and rec["expires"],
+                          "holder": rec and rec["holder"]}), flush=True)
+        if ok: lease.note("demo", f"ran at {t:.3f}")
+        time.sleep(ttl / 5)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--backend", default="sqlite", choices=("sqlite", "file", "http"))
+    ap.add_argument("--procs", type=int, default=2)
+    ap.add_argument("--seconds", type=float, default=6)
+    ap.add_argument("--ttl", type=float, default=0.5)
+    ap.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    ap.add_argument("--delay", type=float, default=0.0, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.worker:
+        return worker(args.ttl, args.seconds, args.delay)
+
+    repo = os.getcwd()
+    scratch = tempfile.mkdtemp(prefix="rh-bench-")
+    env = {**os.environ, "PYTHONPATH": repo, "LEASE_BACKEND": args.backend, "CRON_SECRET": "bench"}
+    server = None
+    if args.backend == "http":
+        os.chdir(scratch); sys.path.insert(0, repo)
+        os.environ.update(CRON_SECRET="bench", LEASE_BACKEND="sqlite")
+        import logging
+        logging.getLogger("werkzeug").setLevel(logging.ERROR)
+        from werkzeug.serving import make_server
+        from red_horizon import main as app_main
+        app_main.CRON_SECRET = "bench"
+        server = make_server("127.0.0.1", 0, app_main.app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        env["LEASE_URL"] = f"http://127.0.0.1:{server.server_port}"
+
+    # worker 0 starts first (so it leads) and quits halfway; the rest start a moment later
+    procs = [subprocess.Popen([sys.executable, "-m", "bench.leases", "--worker", "--ttl", str(args.ttl),
+                               "--seconds", str(args.seconds / 2 if i == 0 else args.seconds),
+                               "--delay", str(0 if i == 0 else args.ttl)],
+                              cwd=scratch, env=env, stdout=subprocess.PIPE, text=True)
+             for i in range(args.procs)]
+    events = [json.loads(line) for p in procs for line in p.communicate()[0].splitlines() if line.startswith("{")]
+    if server: server.shutdown()
+
+    grants = sorted((e for e in events if e["ok"]), key=lambda e: e["t"])
+    bad, handovers, last = 0, [], {}
+    for i, g in enumerate(grants):
+        for who, exp in last.items():
+            if who != g["who"] and exp > g["t"] + 1e-3: bad += 1
+        if i and grants[i - 1]["who"] != g["who"]: handovers.append(g["t"] - grants[i - 1]["t"])
+        last[g["who"]] = g["expires"]
+    per = {}
+    for e in events: per.setdefault(e["who"], [0, 0])[0 if e["ok"] else 1] += 1
+    print(f"backend={args.backend} procs={args.procs} ttl={args.ttl}s attempts={len(events)}")
+    for who, (won, lost) in per.items():
+        print(f"  {who:<40} granted {won:>4}  refused {lost:>4}")
+    print(f"handovers: {len(handovers)} after {', '.join(f'{h:.2f}s' for h in handovers) or '-'}")
+    print(f"overlapping grants: {bad}")
+    return 1 if bad else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""Offline benchmark of the feed pipeline and the posting tasks.
+
+Usage (from the repo root):
+    python -m bench.pipeline [--iterations 10] [--fixtures DIR] [--tg-429-rate 0.05]
+                             [--tg-5xx-rate 0.05] [--stages fetch_news,run_digest]
+
+Serves feed fixtures (synthetic by default, or a directory recorded with
+`python -m bench.fixtures record`) from a local HTTP server that also
+mimics the Telegram Bot API and the Zapier hook, including 429 +
+Retry-After and 5xx replies. Every stage runs against that server in a
+scratch directory, so nothing touches the network or the repo's state.
+
+Per stage it reports p50/p99 latency, throughput (entries, titles or
+posts per second) and, from one extra tracemalloc run, peak traced memory
+and the number of blocks still allocated afterwards.
+"""
+
+import argparse, os, statistics, sys, tempfile, time, tracemalloc
+
+def _pct(xs, q):
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(q * (len(xs) - 1))))]
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--iterations", type=int, default=10)
+    ap.add_argument("--fixtures", help="directory recorded by `python -m bench.fixtures record`")
+    ap.add_argument("--tg-429-rate", type=float, default=0.05)
+    ap.add_argument("--tg-5xx-rate", type=float, default=0.05)
+    ap.add_argument("--retry-after", type=int, default=1)
+    ap.add_argument("--feed-delay", type=float, default=0.0, help="seconds the fake server waits per feed")
+    ap.add_argument("--warm", action="store_true", help="keep the entry store between iterations")
+    ap.add_argument("--stages", help="comma list to run a subset")
+    args = ap.parse_args()
+
+    # Scratch cwd: state.db, seen_links.json etc. are relative paths.
+    repo = os.getcwd()
+    if args.fixtures: args.fixtures = os.path.abspath(args.fixtures)
+    os.chdir(tempfile.mkdtemp(prefix="rh-bench-"))
+    sys.path.insert(0, repo)
+
+    from bench import fixtures
+    from bench.fakeserver import FakeUpstream
+    from red_horizon import config, db, feeds, fetcher, snapshot, sources, tasks, telegram, httpclient
+    import red_horizon.seen, red_horizon.entries, red_horizon.feedhealth, red_horizon.outbox   # noqa: F401  (register their tables before reset())
+
+    docs = (fixtures.load_recorded(args.fixtures) if args.fixtures
+            else fixtures.synthetic(config.FEEDS, config.IMAGE_FEEDS, config.YOUTUBE_FEEDS))
+    up = FakeUpstream(docs, args.tg_429_rate, args.tg_5xx_rate, args.retry_after, args.feed_delay).start()
+
+    # Point the bot at the stand-in. Every fake feed shares one host, so lift
+    # the per-host cap to what distinct hosts would get.
+    local = lambda urls: [up.urls[u] for u in urls if u in up.urls]
+    sources.use(feeds=local(config.FEEDS), image_feeds=local(config.IMAGE_FEEDS),
+                youtube_feeds=local(config.YOUTUBE_FEEDS))
+    fetcher.FETCH_PER_HOST = config.FETCH_WORKERS
+    telegram.TELEGRAM_API_BASE = up.base
+    tasks.BOT_TOKEN, tasks.CHANNEL_ID, tasks.ZAPIER_HOOK_URL = "bench", "@bench", up.base + "/zapier"
+
+    import feedparser
+    parsed = [feedparser.parse(d) for d in docs.values()]
+    entries = [(e.get("title") or "", e.get("summary") or "", e.get("link") or "")
+               for f in parsed for e in f.entries]
+    n_entries = {name: sum(len(feedparser.parse(docs[u]).entries) for u in urls if u in docs)
+                 for name, urls in (("news", config.FEEDS), ("images", config.IMAGE_FEEDS),
+                                    ("priority", [*config.YOUTUBE_FEEDS,
+                                                  *[u for u in config.FEEDS if any(d in u for d in config.HIGH_SIGNAL_DOMAINS)]]))}
+    titles = [{"title": t} for t, _, _ in entries]
+
+    def reset():
+        snapshot.clear()
+        c = db.conn()
+        with c:
+            c.execute("DELETE FROM seen"); c.execute("DELETE FROM outbox")
+            c.execute("DELETE FROM feed_health"); c.execute("DELETE FROM host_breaker")   # poll every feed
+            if not args.warm: c.execute("DELETE FROM entries")
+        tasks.STATE.__dict__.pop("posted", None)
+        if os.path.exists(tasks.POSTED_TITLES_FILE): os.remove(tasks.POSTED_TITLES_FILE)
+
+    seen = lambda: tasks.STATE.seen
+    stages = [
+        ("fetch_news", lambda: feeds.fetch_news(seen(), tasks.SEEN_FILE, config.SEEN_TTL_DAYS), n_entries["news"], "entries"),
+        ("fetch_images", lambda: feeds.fetch_images(seen(), tasks.SEEN_FILE, config.SEEN_TTL_DAYS), n_entries["images"], "entries"),
+        ("fetch_priority_candidates", lambda: feeds.fetch_priority_candidates(seen(), config.SEEN_TTL_DAYS), n_entries["priority"], "entries"),
+        ("relevance_score", lambda: [feeds.relevance_score(t, s, l) for t, s, l in entries], len(entries), "entries"),
+        ("relevance_scores", lambda: feeds.relevance_scores(*zip(*entries)), len(entries), "entries"),
+        ("fuzzy_dedupe", lambda: feeds.fuzzy_dedupe(titles), len(titles), "titles"),
+        # task latency (enqueue only), then delivery of what it queued through the fake Telegram
+        ("run_digest", tasks.run_digest, 1, "runs"),
+        ("run_breaking", tasks.run_breaking, 1, "runs"),
+        ("run_super_priority", lambda: tasks.run_super_priority(force=True), 1, "runs"),
+        ("run_digest+deliver", lambda: (tasks.run_digest(), tasks.STATE.outbox.drain(30))[0], 1, "runs"),
+    ]
+    if args.stages:
+        wanted = set(args.stages.split(","))
+        stages = [s for s in stages if s[0] in wanted]
+
+    print(f"fixtures: {len(docs)} feeds, {len(entries)} entries, {sum(map(len, docs.values()))/1e6:.1f} MB; "
+          f"iterations={args.iterations} {'warm' if args.warm else 'cold'} store")
+    print(f"{'stage':<27} {'p50_ms':>9} {'p99_ms':>9} {'throughput':>18} {'peak_KiB':>9} {'blocks':>8}  result")
+    for name, fn, size, unit in stages:
+        lat, res = [], None
+        for _ in range(args.iterations):
+            reset()
+            t = time.perf_counter(); res = fn(); lat.append(time.perf_counter() - t)
+        reset()
+        tracemalloc.start()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        blocks = sum(s.count for s in tracemalloc.take_snapshot().statistics("filename"))
+        tracemalloc.stop()
+        mean = statistics.mean(lat)
+        shown = res if isinstance(res, str) else f"{len(res)} items"
+        print(f"{name:<27} {_pct(lat, .5)*1000:>9.1f} {_pct(lat, .99)*1000:>9.1f} "
+              f"{size/mean:>11.0f} {unit+'/s':<6} {peak/1024:>9.0f} {blocks:>8}  {shown}")
+
+    print("upstream:", dict(sorted(up.counts.items())))
+    for host, st in httpclient.stats().items():
+        print(f"http {host}: {st}")
+    up.stop()
+
+if __name__ == "__main__":
+    main()
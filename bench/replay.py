@@ -0,0 +1,95 @@
+"""Benchmark: offline replay (red_horizon.replay) over a synthetic archive.
+
+Usage (from the repo root):
+    python -m bench.replay [--days 7] [--interval-min 5] [--workers 1,4] [--sets 4]
+
+Writes an archive of --days of snapshots, one every --interval-min, for
+every configured news and YouTube feed. Each feed publishes on its own
+random schedule and each snapshot holds its newest 10 entries, so most
+snapshots reuse the previous body. Then replays it with each worker count
+under a grid of --sets BREAKING_MIN_SCORE values and reports wall time and
+simulated posts. It also checks that every worker count reports the same
+posts.
+"""
+
+import argparse, hashlib, json, os, random, sys, tempfile, time
+from datetime import datetime, timezone
+from email.utils import formatdate
+from xml.sax.saxutils import escape
+
+from bench.fixtures import _title, _summary
+
+def _stream(rng, url, start, end, mean_gap_h):
+    ts, out, i = start - 86400, [], 0
+    while ts < end:
+        ts += rng.expovariate(1 / (mean_gap_h * 3600))
+        title = _title(rng) + (rng.choice(["", " LIVE", " | Premiere"]) if "youtube" in url else "")
+        slug = hashlib.md5(f"{url}{i}".encode()).hexdigest()[:10]
+        out.append({"title": title, "link": f"https://{slug}.example.com/news/{slug}", "ts": ts,
+                    "summary": _summary(rng, 60)})
+        i += 1
+    return out
+
+def _rss(url, items):
+    body = "".join(f"<item><title>{escape(e['title'])}</title><link>{e['link']}</link>"
+                   f"<pubDate>{formatdate(e['ts'], usegmt=True)}</pubDate>"
+                   f"<description>{escape(e['summary'])}</description></item>" for e in items)
+    return f"<?xml version=\"1.0\"?><rss version=\"2.0\"><channel><title>{url}</title>{body}</channel></rss>".encode()
+
+def build(archive, days, interval_min, seed=3):
+    from red_horizon import config
+    from red_horizon.replay import STAMP
+    rng = random.Random(seed)
+    end = time.time() // 60 * 60
+    start = end - days * 86400
+    streams = {u: _stream(rng, u, start, end, 6 if "youtube" in u else 2)
+               for u in dict.fromkeys([*config.FEEDS, *config.YOUTUBE_FEEDS])}
+    os.makedirs(os.path.join(archive, "bodies")); os.makedirs(os.path.join(archive, "snapshots"))
+    last, n_bodies, t = {}, 0, start
+    while t <= end:
+        index = {}
+        for u, items in streams.items():
+            newest = [e for e in items if e["ts"] <= t][-10:][::-1]
+            key = tuple(e["link"] for e in newest)
+            if last.get(u, (None,))[0] != key:
+                body = _rss(u, newest)
+                h = hashlib.sha1(body).hexdigest()
+                with open(os.path.join(archive, "bodies", f"{h}.xml"), "wb") as f: f.write(body)
+                last[u] = (key, h); n_bodies += 1
+            index[u] = last[u][1]
+        name = datetime.fromtimestamp(t, timezone.utc).strftime(STAMP) + ".json"
+        with open(os.path.join(archive, "snapshots", name), "w", encoding="utf-8") as f: json.dump(index, f)
+        t += interval_min * 60
+    return int((end - start) // (interval_min * 60)) + 1, n_bodies
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--days", type=float, default=7)
+    ap.add_argument("--interval-min", type=float, default=5)
+    ap.add_argument("--workers", default=f"1,{os.cpu_count()}")
+    ap.add_argument("--sets", type=int, default=4, help="BREAKING_MIN_SCORE values to grid over")
+    args = ap.parse_args()
+
+    repo = os.getcwd()
+    os.chdir(tempfile.mkdtemp(prefix="rh-bench-"))
+    sys.path.insert(0, repo)
+    from red_horizon.replay import run, summarize
+
+    t = time.perf_counter()
+    n_snaps, n_bodies = build("archive", args.days, args.interval_min)
+    print(f"archive: {n_snaps} snapshots, {n_bodies} distinct bodies, built in {time.perf_counter() - t:.1f}s")
+    grid = ["BREAKING_MIN_SCORE=" + ",".join(f"{1 + i * 0.5:g}" for i in range(args.sets))]
+    ref = None
+    for w in (int(x) for x in args.workers.split(",")):
+        t = time.perf_counter()
+        posts, labels = run("archive", grid, workers=w)
+        dt = time.perf_counter() - t
+        same = ref is None or posts == ref
+        ref = ref if ref is not None else posts
+        print(f"workers={w:<3} {dt:>7.1f}s  {len(posts)} posts  same={same}")
+    for label, nb, np_, links, delay in summarize(ref, labels):
+        print(f"  {label:<28} breaking {nb:>4}  priority {np_:>4}  median delay "
+              f"{'-' if delay is None else f'{delay:.1f}'} min")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Benchmark: cold-start cost of the bot's entry points.
+
+Usage (from the repo root):
+    python -m bench.startup [--runs 15]
+
+Each case runs in a fresh interpreter, so the numbers include module
+imports and any state loaded at import time. Also reports which heavy
+third-party modules each entry point drags in, to catch regressions where
+something starts importing requests/feedparser/flask eagerly again.
+"""
+
+import argparse, json, statistics, subprocess, sys
+
+HEAVY = ("requests", "feedparser", "flask", "sqlite3")
+
+CASES = {
+    "python (baseline)": "pass",
+    "import red_horizon.tasks": "import red_horizon.tasks",
+    "import red_horizon.main": "import red_horizon.main",
+    "cli --help": "import sys; from red_horizon import cli\n"
+                  "try: cli.main(['--help'])\nexcept SystemExit: pass",
+}
+
+PROBE = """
+import json, sys, time
+t = time.perf_counter()
+{code}
+dt = time.perf_counter() - t
+print(json.dumps({{"ms": dt * 1000, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+def _run_once(code):
+    src = PROBE.format(code=code, heavy=HEAVY)
+    out = subprocess.run([sys.executable, "-c", src], capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=15)
+    args = ap.parse_args()
+
+    print(f"{'case':<28} {'p50_ms':>8} {'min_ms':>8}  heavy modules loaded")
+    for name, code in CASES.items():
+        samples = [_run_once(code) for _ in range(args.runs)]
+        ms = [s["ms"] for s in samples]
+        print(f"{name:<28} {statistics.median(ms):>8.1f} {min(ms):>8.1f}  {', '.join(samples[-1]['heavy']) or '-'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# red_horizon/candidates.py — lightweight candidate records and a counting filter chain
+#
+# Selection streams rows straight off the entries cursor through generator
+# filters, cheapest first (stored flags, score threshold, seen lookup), and
+# only rows that survive all of them become a Candidate. Candidate uses
+# __slots__ (no per-object __dict__). The datetime and the decoded MinHash
+# signature are built on first access, so rows that are dropped later (same
+# title, near-duplicate) never pay for them. Candidates still answer c["title"]
+# / c.get("score"), so the tasks and dedupe() consume them like the dicts
+# they replace.
+
+import json
+from datetime import datetime
+
+from . import metrics
+from .config import UTC
+
+class Candidate:
+    __slots__ = ("title", "link", "ts", "score", "norm", "img", "_sig", "_published")
+
+    def __init__(self, title, link, ts, score=0.0, norm=None, sig=None, img=None):
+        self.title, self.link, self.ts, self.score = title, link, ts, score
+        self.norm, self.img, self._sig, self._published = norm, img, sig, None
+
+    @classmethod
+    def from_row(cls, r, score="score"):
+        """From an entries row (sig still JSON text); `score` picks the column."""
+        return cls(r["title"], r["link"], r["published"], r[score], r["norm"], r["sig"], r["img"])
+
+    @property
+    def published(self):
+        if self._published is None: self._published = datetime.fromtimestamp(self.ts, UTC)
+        return self._published
+
+    @property
+    def sig(self):
+        if isinstance(self._sig, str): self._sig = json.loads(self._sig)
+        return self._sig
+
+    # mapping-style access, as the tasks and dedupe() read candidates
+    def __getitem__(self, key):
+        try: return getattr(self, key)
+        except AttributeError: raise KeyError(key) from None
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def __repr__(self):
+        return f"Candidate({self.title!r}, {self.link!r}, score={self.score})"
+
+class Funnel:
+    """Counts how many items pass each stage of a generator chain and reports
+    each stage's drop through metrics.count_filter once the chain is consumed."""
+
+    def __init__(self):
+        self.counts = {}
+
+    def stage(self, name, items):
+        self.counts[name] = 0       # registered now, so stages report in chain order
+        return self._count(name, items)
+
+    def _count(self, name, items):
+        for it in items:
+            self.counts[name] += 1
+            yield it
+
+    def report(self):
+        names = list(self.counts)
+        for prev, name in zip(names, names[1:]):
+            metrics.count_filter(name, self.counts[prev], self.counts[name])
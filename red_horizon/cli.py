@@ -0,0 +1,41 @@
+# red_horizon/cli.py — run one task without Flask (cron / GitHub Actions entry point)
+#
+#   python -m red_horizon.cli priority [--force]
+#   python -m red_horizon.cli digest
+
+import argparse, sys, time
+
+TASKS = {
+    "digest": "run_digest",
+    "breaking": "run_breaking",
+    "priority": "run_super_priority",
+    "image": "run_daily_image",
+    "book": "run_book_spotlight",
+    "welcome": "run_welcome",
+    "fact": "run_starbase_fact",
+}
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="red_horizon.cli", description="Run one Red Horizon task.")
+    ap.add_argument("task", choices=sorted(TASKS))
+    ap.add_argument("--force", action="store_true", help="priority: ignore cooldown / ENABLE_SUPER_PRIORITY")
+    args = ap.parse_args(argv)
+
+    t0 = time.perf_counter()
+    from . import tasks
+    fn = getattr(tasks, TASKS[args.task])
+    res = fn(force=args.force) if args.task == "priority" else fn()
+    if "outbox" in tasks.STATE.loaded():
+        # the sender thread dies with the process: deliver what this run queued
+        from .config import OUTBOX_DRAIN_SEC
+        left = tasks.STATE.outbox.drain(OUTBOX_DRAIN_SEC)
+        if left: tasks.log(f"cli: {left} message(s) left queued in state.db for the next run")
+    if "red_horizon.db" in sys.modules:
+        from .db import checkpoint
+        checkpoint()   # the workflow caches state.db alone, without its -wal file
+    tasks.log(f"cli: {args.task} -> {res} in {time.perf_counter() - t0:.2f}s")
+    print(res)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -28,6 +28,91 @@ BREAKING_MAX_AGE_MIN = _env_int("BREAKING_MAX_AGE_MIN", 60)
 BREAKING_MIN_SCORE   = _env_float("BREAKING_MIN_SCORE", 1.5)
 SUPER_COOLDOWN_MIN   = _env_int("SUPER_COOLDOWN_MIN", 5)
 ENABLE_SUPER_PRIORITY = _env_bool("ENABLE_SUPER_PRIORITY", True)
+DEDUPE_THRESHOLD     = _env_float("DEDUPE_THRESHOLD", 0.90)   # title similarity (0..1) treated as the same story
+
+# Local SQLite file for incremental state (entry store etc.)
+STATE_DB = os.getenv("STATE_DB", "state.db")
+
+# Logging: directory, lowest level kept, records /logs/tail can serve, flush period, rotation size/age/backups
+LOG_DIR          = os.getenv("LOG_DIR", ".logs")
+LOG_LEVEL        = os.getenv("LOG_LEVEL", "info").strip().lower()
+LOG_RING_SIZE    = _env_int("LOG_RING_SIZE", 5000)
+LOG_FLUSH_SEC    = _env_float("LOG_FLUSH_SEC", 1.0)
+LOG_MAX_BYTES    = _env_int("LOG_MAX_BYTES", 2_000_000)
+LOG_ROTATE_HOURS = _env_float("LOG_ROTATE_HOURS", 24)
+LOG_BACKUPS      = _env_int("LOG_BACKUPS", 3)
+
+# Feed sweep: total worker threads, concurrent requests per host, whole-sweep deadline
+FETCH_WORKERS      = _env_int("FETCH_WORKERS", 12)
+FETCH_PER_HOST     = _env_int("FETCH_PER_HOST", 2)
+FETCH_DEADLINE_SEC = _env_float("FETCH_DEADLINE_SEC", 45)
+SNAPSHOT_TTL_SEC   = _env_float("SNAPSHOT_TTL_SEC", 120)   # parsed feeds shared across tasks this long
+
+# /run job runner: worker threads and how many finished jobs /jobs/<id> remembers
+JOB_WORKERS = _env_int("JOB_WORKERS", 4)
+JOB_HISTORY = _env_int("JOB_HISTORY", 200)
+
+# Telegram Bot API root (point at a local stand-in for offline benchmarks)
+TELEGRAM_API_BASE = os.getenv("TELEGRAM_API_BASE", "https://api.telegram.org").rstrip("/")
+
+# Image pre-flight: how long a probe result is trusted, biggest file sendPhoto takes by URL
+IMAGE_CHECK_TTL_HOURS = _env_float("IMAGE_CHECK_TTL_HOURS", 24)
+IMAGE_MAX_BYTES       = _env_int("IMAGE_MAX_BYTES", 5_000_000)
+
+# Telegram outbound queue: per-chat and bot-wide send rates, retry/keep limits, CLI drain wait
+OUTBOX_ENABLED      = _env_bool("OUTBOX_ENABLED", True)
+TG_CHAT_PER_MIN     = _env_float("TG_CHAT_PER_MIN", 20)
+TG_GLOBAL_PER_SEC   = _env_float("TG_GLOBAL_PER_SEC", 25)
+OUTBOX_MAX_ATTEMPTS = _env_int("OUTBOX_MAX_ATTEMPTS", 8)
+OUTBOX_KEEP_DAYS    = _env_float("OUTBOX_KEEP_DAYS", 2)
+OUTBOX_DRAIN_SEC    = _env_float("OUTBOX_DRAIN_SEC", 60)
+
+# Fan-out to several chats: parallel senders for direct posts and for the outbox (one in-flight message per chat)
+TG_FANOUT_WORKERS   = _env_int("TG_FANOUT_WORKERS", 4)
+OUTBOX_SENDERS      = _env_int("OUTBOX_SENDERS", 4)
+
+# Shared HTTP client: per-call timeouts, pooled connections per host, retry backoff cap
+FEED_TIMEOUT_SEC     = _env_float("FEED_TIMEOUT_SEC", 10)
+TELEGRAM_TIMEOUT_SEC = _env_float("TELEGRAM_TIMEOUT_SEC", 30)
+ZAPIER_TIMEOUT_SEC   = _env_float("ZAPIER_TIMEOUT_SEC", 10)
+HTTP_POOL_SIZE       = _env_int("HTTP_POOL_SIZE", 10)
+HTTP_MAX_BACKOFF_SEC = _env_float("HTTP_MAX_BACKOFF_SEC", 10)
+
+# Feed bodies are read only this far: entries per feed (>= any fetch_* limit), size cap
+FEED_MAX_ENTRIES = _env_int("FEED_MAX_ENTRIES", 10)
+FEED_MAX_BYTES   = _env_int("FEED_MAX_BYTES", 2_000_000)
+
+# Per-feed scheduling: learned poll interval bounds, error backoff cap, host breaker threshold
+FEED_SCHEDULER       = _env_bool("FEED_SCHEDULER", True)
+FEED_MIN_POLL_MIN    = _env_float("FEED_MIN_POLL_MIN", 5)
+FEED_MAX_POLL_MIN    = _env_float("FEED_MAX_POLL_MIN", 60)
+FEED_MAX_BACKOFF_MIN = _env_float("FEED_MAX_BACKOFF_MIN", 360)
+FEED_BREAKER_ERRORS  = _env_int("FEED_BREAKER_ERRORS", 3)
+
+# Priority watcher: run it inside the web app, jittered poll interval for the priority feeds, state flush period
+WATCH_ENABLED      = _env_bool("WATCH_ENABLED", False)
+WATCH_INTERVAL_SEC = _env_float("WATCH_INTERVAL_SEC", 30)
+WATCH_JITTER       = _env_float("WATCH_JITTER", 0.2)
+WATCH_FLUSH_SEC    = _env_float("WATCH_FLUSH_SEC", 60)
+
+# WebSub push for the YouTube feeds: public callback (empty = don't subscribe), signing secret, hub, lease/renewal
+WEBSUB_CALLBACK_URL = os.getenv("WEBSUB_CALLBACK_URL", "")
+WEBSUB_SECRET       = os.getenv("WEBSUB_SECRET", "")
+WEBSUB_HUB          = os.getenv("WEBSUB_HUB", "https://pubsubhubbub.appspot.com/subscribe")
+WEBSUB_LEASE_HOURS  = _env_float("WEBSUB_LEASE_HOURS", 120)
+WEBSUB_RENEW_HOURS  = _env_float("WEBSUB_RENEW_HOURS", 24)
+WEBSUB_ENABLED      = bool(WEBSUB_CALLBACK_URL and WEBSUB_SECRET)   # unsigned pushes are never accepted
+
+# Task leases (one replica per cycle): backend sqlite|file|http|off, cycle length, leader URL (http), lock dir (file), leased tasks
+LEASE_BACKEND = os.getenv("LEASE_BACKEND", "sqlite").strip().lower()
+LEASE_TTL_SEC = _env_float("LEASE_TTL_SEC", 240)
+LEASE_URL     = os.getenv("LEASE_URL", "")
+LEASE_DIR     = os.getenv("LEASE_DIR", ".leases")
+LEASE_TASKS   = [t.strip() for t in os.getenv("LEASE_TASKS", "priority,breaking").split(",") if t.strip()]
+
+# Feed/keyword lists below are defaults: a JSON file overrides them and is re-read when it changes (see sources.py)
+SOURCES_FILE      = os.getenv("SOURCES_FILE", "sources.json")
+SOURCES_CHECK_SEC = _env_float("SOURCES_CHECK_SEC", 10)
 
 # ---------- Keywords ----------
 KEYWORDS = [
@@ -0,0 +1,35 @@
+# red_horizon/db.py — shared SQLite connection handling for the local state file
+
+import sqlite3, threading
+from .config import STATE_DB
+
+_local = threading.local()
+_schemas = []
+_schema_lock = threading.Lock()
+
+def register_schema(sql: str):
+    """Add DDL (CREATE ... IF NOT EXISTS) applied to every new connection."""
+    with _schema_lock:
+        if sql not in _schemas: _schemas.append(sql)
+    c = getattr(_local, "conn", None)
+    if c is not None:
+        c.executescript(sql)
+
+def conn(path=None):
+    """Per-thread connection (WAL, autocommit off); use `with conn():` for a transaction."""
+    path = path or STATE_DB
+    c = getattr(_local, "conn", None)
+    if c is None or getattr(_local, "path", None) != path:
+        if c is not None: c.close()
+        c = sqlite3.connect(path, timeout=30)
+        c.row_factory = sqlite3.Row
+        c.execute("PRAGMA journal_mode=WAL")
+        c.execute("PRAGMA synchronous=NORMAL")
+        for sql in list(_schemas): c.executescript(sql)
+        _local.conn, _local.path = c, path
+    return c
+
+def checkpoint(path=None):
+    """Fold the WAL back into the main file (before state.db is copied/cached)."""
+    try: conn(path).execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    except Exception: pass
@@ -0,0 +1,131 @@
+# red_horizon/dedupe.py — near-duplicate title detection with MinHash + LSH
+
+import random, re, time, zlib
+from difflib import SequenceMatcher
+from .persistence import log, load_json, save_json
+
+SHINGLE = 3            # character n-gram size over the normalised title
+BANDS, ROWS = 16, 2    # 32 hash functions; pairs with Jaccard ~0.3+ usually collide
+_P = (1 << 61) - 1
+_rng = random.Random(20240829)   # fixed seed: signatures must be stable across runs
+_PERMS = [(_rng.randrange(1, _P), _rng.randrange(0, _P)) for _ in range(BANDS * ROWS)]
+
+_NON_ALNUM = re.compile(r"[^a-z0-9 ]+")
+_SPACES = re.compile(r"\s+")
+
+def normalize(title: str):
+    t = (title or "").lower()
+    t = _NON_ALNUM.sub(" ", t)
+    return _SPACES.sub(" ", t).strip()
+
+def signature(norm: str):
+    """MinHash signature of the title's character shingles."""
+    grams = {norm[i:i+SHINGLE] for i in range(max(1, len(norm) - SHINGLE + 1))}
+    hs = [zlib.crc32(g.encode("utf-8")) for g in grams]
+    return [min((a * h + b) % _P for h in hs) for a, b in _PERMS]
+
+def _bands(sig):
+    return [(i, tuple(sig[i*ROWS:(i+1)*ROWS])) for i in range(BANDS)]
+
+class TitleIndex:
+    """LSH buckets over title signatures.
+
+    Candidates sharing any band are confirmed with the same
+    SequenceMatcher ratio fuzzy_dedupe always used, so the threshold keeps
+    its meaning; LSH only removes the all-pairs comparison.
+    """
+
+    def __init__(self, threshold=0.90, max_age_days=None):
+        self.threshold = threshold
+        self.max_age_days = max_age_days   # history window: older titles are pruned on save
+        self.norms, self.sigs, self.stamps = [], [], []
+        self._buckets = {}
+
+    def __len__(self):
+        return len(self.norms)
+
+    def find(self, title: str, norm=None, sig=None):
+        """Index of a stored near-duplicate of title, or None."""
+        norm = normalize(title) if norm is None else norm
+        sig = signature(norm) if sig is None else sig
+        tried = set()
+        for key in _bands(sig):
+            for j in self._buckets.get(key, ()):
+                if j in tried: continue
+                tried.add(j)
+                sm = SequenceMatcher(None, norm, self.norms[j])
+                if sm.real_quick_ratio() >= self.threshold and sm.quick_ratio() >= self.threshold \
+                        and sm.ratio() >= self.threshold:
+                    return j
+        return None
+
+    def add(self, title: str, ts=None, norm=None, sig=None):
+        norm = normalize(title) if norm is None else norm
+        sig = signature(norm) if sig is None else sig
+        j = len(self.norms)
+        self.norms.append(norm); self.sigs.append(sig); self.stamps.append(ts or time.time())
+        for key in _bands(sig):
+            self._buckets.setdefault(key, []).append(j)
+        return j
+
+    def prune(self, max_age_days=None, now=None):
+        """Drop titles older than max_age_days (default: the index's window),
+        from the lists and the band buckets; returns how many went."""
+        days = self.max_age_days if max_age_days is None else max_age_days
+        if not days: return 0
+        cutoff = (now or time.time()) - days * 86400
+        keep = [j for j, ts in enumerate(self.stamps) if ts >= cutoff]
+        dropped = len(self.stamps) - len(keep)
+        if not dropped: return 0
+        buckets = {}
+        for n, j in enumerate(keep):
+            for key in _bands(self.sigs[j]):
+                buckets.setdefault(key, []).append(n)
+        # buckets first: a concurrent find() then only sees indices inside either list
+        self._buckets = buckets
+        self.norms, self.sigs, self.stamps = ([xs[j] for j in keep] for xs in (self.norms, self.sigs, self.stamps))
+        return dropped
+
+    # ---------- persistence (posted-title history) ----------
+    @classmethod
+    def load(cls, path: str, threshold=0.90, max_age_days=None):
+        idx = cls(threshold, max_age_days)
+        d = load_json(path, {})
+        cutoff = time.time() - max_age_days*86400 if max_age_days else 0
+        for rec in (d.get("titles") if isinstance(d, dict) else None) or []:
+            try:
+                if rec["ts"] < cutoff: continue
+                sig = rec.get("sig")
+                if not sig or len(sig) != BANDS * ROWS: sig = None
+                idx.add("", ts=rec["ts"], norm=rec["t"], sig=sig)
+            except Exception:
+                continue
+        return idx
+
+    def save(self, path: str):
+        self.prune()
+        try:
+            save_json(path, {"titles": [
+                {"t": n, "ts": ts, "sig": s} for n, s, ts in zip(self.norms, self.sigs, self.stamps)
+            ]})
+        except Exception as e:
+            log(f"TitleIndex save error {path}: {e}")
+
+def dedupe(items, threshold=0.90, history=None, key="title"):
+    """Keep the first of each group of near-duplicate items, in order.
+
+    Items whose title matches something in `history` (e.g. titles already
+    posted on earlier runs) are dropped as well. Precomputed "norm"/"sig"
+    fields on an item are used instead of recomputing them.
+    """
+    idx, kept = TitleIndex(threshold), []
+    for it in items:
+        norm = it.get("norm") or normalize(it[key])
+        sig = it.get("sig") or signature(norm)
+        if history is not None and history.find("", norm=norm, sig=sig) is not None:
+            continue
+        if idx.find("", norm=norm, sig=sig) is not None:
+            continue
+        idx.add("", norm=norm, sig=sig)
+        kept.append(it)
+    return kept
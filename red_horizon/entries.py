@@ -0,0 +1,113 @@
+# red_horizon/entries.py — incremental store of derived feed entries (SQLite)
+#
+# Each (feed, canonical link) is scored, language-checked and signed once,
+# the first time it shows up; later sweeps only look up what is new and the
+# fetch_* functions select candidates from stored rows. Each row records
+# which scorer derived it (sources.Sources.scorer_tag): after the keyword
+# lists or provider weights change, a feed's stored rows are re-derived on
+# its next ingest, and the ones it no longer carries are dropped.
+
+import json, threading, time
+from . import db
+from .persistence import log
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    feed        TEXT NOT NULL,
+    link        TEXT NOT NULL,
+    title       TEXT NOT NULL,
+    published   REAL NOT NULL,
+    english     INTEGER NOT NULL,
+    relevant    INTEGER NOT NULL,
+    score       REAL NOT NULL,
+    title_score REAL NOT NULL,
+    img         TEXT,
+    norm        TEXT,
+    sig         TEXT,
+    seen_at     REAL NOT NULL,
+    scorer      TEXT,
+    PRIMARY KEY (feed, link)
+);
+CREATE INDEX IF NOT EXISTS entries_seen_at ON entries(seen_at);
+"""
+db.register_schema(SCHEMA)
+
+_COLS = ("feed", "link", "title", "published", "english", "relevant",
+         "score", "title_score", "img", "norm", "sig", "seen_at", "scorer")
+
+_upgraded = False
+_lock = threading.Lock()
+
+def _conn():
+    """db.conn(), adding the scorer column to a table created before it existed."""
+    global _upgraded
+    c = db.conn()
+    if not _upgraded:
+        with _lock:
+            if not _upgraded:
+                if "scorer" not in {r["name"] for r in c.execute("PRAGMA table_info(entries)")}:
+                    with c: c.execute("ALTER TABLE entries ADD COLUMN scorer TEXT")
+                _upgraded = True
+    return c
+
+def ingest(feeds: dict, limit: int, derive, now=None, scorer=None):
+    """Store entries we have not seen yet, re-deriving rows a different scorer
+    produced; returns how many rows were written.
+
+    feeds  — {feed url: parsed feed}
+    derive — derive([(feed_url, entry), ...], known) -> row dicts (see _COLS)
+             for the batch, skipping any whose (feed, link) is in `known`
+             (the pairs already stored) before doing expensive work, and
+             adding the ones it returns
+    now    — seen_at for the new rows (default: the current time)
+    scorer — tag of the scorer derive uses; rows stored under another tag
+             count as unknown, and those derive does not return are deleted
+    """
+    c = _conn()
+    marks = ",".join("?" * len(feeds))
+    known, stale = set(), 0
+    for r in (c.execute(f"SELECT feed, link, scorer FROM entries WHERE feed IN ({marks})", list(feeds)) if feeds else ()):
+        if r["scorer"] == scorer: known.add((r["feed"], r["link"]))
+        else: stale += 1
+    now, rows = time.time() if now is None else now, []
+    for row in derive([(url, e) for url, feed in feeds.items() for e in feed.entries[:limit]], known):
+        row.setdefault("seen_at", now)
+        row["scorer"] = scorer
+        if row.get("sig") is not None: row["sig"] = json.dumps(row["sig"])
+        rows.append(tuple(row.get(k) for k in _COLS))
+    if rows or stale:
+        try:
+            with c:
+                # a re-derived row keeps its first seen_at, so pruning still counts from then
+                c.executemany(f"INSERT INTO entries ({','.join(_COLS)}) VALUES ({','.join('?'*len(_COLS))}) "
+                              f"ON CONFLICT (feed, link) DO UPDATE SET "
+                              f"{', '.join(f'{k} = excluded.{k}' for k in _COLS if k != 'seen_at')}", rows)
+                if stale:
+                    n = c.execute(f"DELETE FROM entries WHERE feed IN ({marks}) AND scorer IS NOT ?",
+                                  [*feeds, scorer]).rowcount
+                    log(f"entries: re-derived {stale - n} row(s) for a new scorer, dropped {n}")
+        except Exception as e:
+            log(f"entries ingest error: {e}")
+    return len(rows)
+
+def rows(feed_urls, since=None):
+    """Rows from the given feeds, optionally only those published at/after `since`
+    (epoch), streamed off the cursor as sqlite3.Row (sig still JSON text)."""
+    feed_urls = list(feed_urls)
+    if not feed_urls: return iter(())
+    sql = f"SELECT * FROM entries WHERE feed IN ({','.join('?'*len(feed_urls))})"
+    args = feed_urls
+    if since is not None:
+        sql += " AND published >= ?"; args = [*feed_urls, since]
+    return _conn().execute(sql + " ORDER BY feed, published DESC", args)
+
+def prune(max_age_days: float, now=None):
+    """Forget entries first seen more than max_age_days before now."""
+    try:
+        c = _conn()
+        with c:
+            n = c.execute("DELETE FROM entries WHERE seen_at < ?",
+                          ((time.time() if now is None else now) - max_age_days*86400,)).rowcount
+        if n: log(f"entries prune: {n}")
+    except Exception as e:
+        log(f"entries prune error: {e}")
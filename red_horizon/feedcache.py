@@ -0,0 +1,114 @@
+# red_horizon/feedcache.py — ETag / Last-Modified validator cache for feed fetches
+#
+# Rows live in state.db (feed_cache.json from older versions is imported
+# once); the process keeps them in memory and flush() writes changed ones.
+
+import json, threading, time, feedparser
+from . import db, statestore
+from .persistence import log, load_json
+
+FEED_CACHE_FILE = "feed_cache.json"   # legacy location, migrated
+MAX_CACHED_ENTRIES = 20   # more than any fetch_* ever reads per feed
+
+# Only the entry fields the bot reads are kept, so the cache stays small.
+# ("enclosures" is derived by feedparser from "links", so links are stored.)
+_ENTRY_KEYS = (
+    "id", "title", "link", "links", "summary", "description",
+    "published_parsed", "updated_parsed",
+    "media_content", "media_thumbnail",
+)
+_TIME_KEYS = ("published_parsed", "updated_parsed")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS feed_cache (
+    url      TEXT PRIMARY KEY,
+    etag     TEXT,
+    modified TEXT,
+    ts       REAL NOT NULL,
+    entries  TEXT NOT NULL
+);
+"""
+db.register_schema(SCHEMA)
+
+_cache = None
+_dirty = set()
+_lock = threading.Lock()
+
+def _row(url, hit):
+    return (url, hit.get("etag"), hit.get("modified"), hit.get("ts") or time.time(), json.dumps(hit.get("entries", [])))
+
+def _import_json(c):
+    d = load_json(FEED_CACHE_FILE, {})
+    if isinstance(d, dict) and d:
+        c.executemany("INSERT OR IGNORE INTO feed_cache (url, etag, modified, ts, entries) VALUES (?, ?, ?, ?, ?)",
+                      [_row(u, h) for u, h in d.items() if isinstance(h, dict)])
+
+def _load():
+    global _cache
+    if _cache is None:
+        statestore.once("feed-cache-json-v1", _import_json)
+        _cache = {r["url"]: {"etag": r["etag"], "modified": r["modified"], "ts": r["ts"],
+                             "entries": json.loads(r["entries"])}
+                  for r in db.conn().execute("SELECT * FROM feed_cache")}
+    return _cache
+
+def _pack_entry(e):
+    out = {}
+    for k in _ENTRY_KEYS:
+        v = e.get(k)
+        if v is None: continue
+        if k in _TIME_KEYS: v = list(v)
+        elif isinstance(v, list): v = [dict(x) for x in v]
+        out[k] = v
+    return out
+
+def _unpack_entry(d):
+    e = feedparser.FeedParserDict()
+    for k, v in d.items():
+        if k in _TIME_KEYS: v = time.struct_time(v)
+        elif isinstance(v, list): v = [feedparser.FeedParserDict(x) for x in v]
+        e[k] = v
+    return e
+
+def request_headers(url: str, base: dict):
+    """base headers plus If-None-Match / If-Modified-Since when we hold validators."""
+    headers = dict(base)
+    with _lock:
+        hit = _load().get(url)
+    if hit:
+        if hit.get("etag"): headers["If-None-Match"] = hit["etag"]
+        if hit.get("modified"): headers["If-Modified-Since"] = hit["modified"]
+    return headers
+
+def cached_feed(url: str):
+    """Rebuild the parsed feed stored for url (used on 304 and for skipped polls), or None."""
+    with _lock:
+        hit = _load().get(url)
+    if not hit: return None
+    return feedparser.FeedParserDict(
+        entries=[_unpack_entry(d) for d in hit.get("entries", [])],
+        bozo=0, status=304,
+    )
+
+def remember(url: str, headers, feed):
+    """Store validators + trimmed entries from a fresh 200 response (entries are
+    kept even without validators: the scheduler serves them between polls)."""
+    with _lock:
+        _load()[url] = {
+            "etag": headers.get("ETag"), "modified": headers.get("Last-Modified"), "ts": time.time(),
+            "entries": [_pack_entry(e) for e in feed.entries[:MAX_CACHED_ENTRIES]],
+        }
+        _dirty.add(url)
+
+def flush():
+    """Write the feeds remembered since the last flush, in one transaction."""
+    with _lock:
+        if not _dirty: return
+        rows = [_row(u, _cache[u]) for u in _dirty]
+        _dirty.clear()
+    try:
+        c = db.conn()
+        with c:
+            c.executemany("INSERT OR REPLACE INTO feed_cache (url, etag, modified, ts, entries) VALUES (?, ?, ?, ?, ?)", rows)
+    except Exception as e:
+        log(f"feedcache flush error: {e}")
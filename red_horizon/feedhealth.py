@@ -0,0 +1,143 @@
+# red_horizon/feedhealth.py — per-feed poll schedule, health and host circuit breaker
+#
+# Every fetch outcome is recorded: successes learn the feed's publish rate
+# from entry timestamps (poll interval = typical gap between posts / 3,
+# clamped to FEED_MIN_POLL_MIN..FEED_MAX_POLL_MIN, and for the news feeds
+# behind breaking posts to half of BREAKING_MAX_AGE_MIN, so an item
+# published just after one poll is still fresh at the next), failures back
+# the feed off exponentially. A host whose feeds fail FEED_BREAKER_ERRORS times in a
+# row is cut off for a growing cooldown, then probed with one feed at a time.
+# plan() splits a sweep into feeds that are due and feeds to serve from the
+# validator cache instead. State lives in state.db so cron runs share it.
+
+import calendar, statistics, threading, time
+from urllib.parse import urlparse
+
+from . import db, sources
+from .config import (
+    FEED_MIN_POLL_MIN, FEED_MAX_POLL_MIN, FEED_MAX_BACKOFF_MIN, FEED_BREAKER_ERRORS, BREAKING_MAX_AGE_MIN,
+)
+from .persistence import log
+
+POLLS_PER_POST = 3
+SLACK_SEC = 60        # cron ticks drift; a feed due within this is polled now
+LATENCY_ALPHA = 0.3   # EWMA weight of the newest latency sample
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS feed_health (
+    url          TEXT PRIMARY KEY,
+    host         TEXT NOT NULL,
+    last_attempt REAL,
+    last_success REAL,
+    last_error   TEXT,
+    error_streak INTEGER NOT NULL DEFAULT 0,
+    fetches      INTEGER NOT NULL DEFAULT 0,
+    errors       INTEGER NOT NULL DEFAULT 0,
+    mean_latency REAL,
+    interval     REAL,
+    next_due     REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS host_breaker (
+    host         TEXT PRIMARY KEY,
+    error_streak INTEGER NOT NULL DEFAULT 0,
+    trips        INTEGER NOT NULL DEFAULT 0,
+    open_until   REAL NOT NULL DEFAULT 0
+);
+"""
+db.register_schema(SCHEMA)
+
+_pending = []
+_lock = threading.Lock()
+
+def _host(url: str):
+    try: return (urlparse(url).hostname or "").lower()
+    except Exception: return ""
+
+def _interval(feed, url=None):
+    """Poll interval learned from the gaps between the feed's entry timestamps."""
+    ts = sorted((calendar.timegm(pp) for e in (feed.entries if feed else [])
+                 if (pp := e.get("published_parsed") or e.get("updated_parsed"))), reverse=True)
+    lo, hi = FEED_MIN_POLL_MIN * 60, FEED_MAX_POLL_MIN * 60
+    if url in sources.current().feeds:   # breaking candidates: poll at least twice per freshness window
+        hi = min(hi, BREAKING_MAX_AGE_MIN * 60 / 2)
+    if len(ts) < 2: return hi
+    gap = statistics.median(a - b for a, b in zip(ts, ts[1:]))
+    gap = max(gap, time.time() - ts[0])   # quiet for longer than usual: slow down
+    return min(hi, max(lo, gap / POLLS_PER_POST))
+
+def plan(urls, now=None):
+    """(due urls, {skipped url: "scheduled" | "breaker"})."""
+    now = now or time.time()
+    urls = list(urls)
+    if not urls: return [], {}
+    c = db.conn()
+    marks = ",".join("?" * len(urls))
+    rows = {r["url"]: r for r in c.execute(f"SELECT url, next_due FROM feed_health WHERE url IN ({marks})", urls)}
+    hosts = {_host(u) for u in urls}
+    open_until = {r["host"]: r["open_until"] for r in c.execute(
+        f"SELECT host, open_until FROM host_breaker WHERE host IN ({','.join('?' * len(hosts))})", list(hosts))}
+    due, skipped, probing = [], {}, set()
+    for u in urls:
+        h = _host(u)
+        if h in open_until and open_until[h] > 0:
+            # open: skip the host; cooled down (half-open): let one feed probe it
+            if now < open_until[h] or h in probing:
+                skipped[u] = "breaker"; continue
+            probing.add(h)
+        r = rows.get(u)
+        if r is not None and now < r["next_due"] - SLACK_SEC:
+            skipped[u] = "scheduled"; continue
+        due.append(u)
+    return due, skipped
+
+def record(url: str, ok: bool, latency: float, feed=None, error=None):
+    """Buffer one fetch outcome; flush() writes them."""
+    with _lock:
+        _pending.append((url, ok, latency, feed, error, time.time()))
+
+def flush():
+    with _lock:
+        pending, _pending[:] = list(_pending), []
+    if not pending: return
+    try:
+        c = db.conn()
+        with c:
+            for url, ok, latency, feed, error, now in pending:
+                _apply(c, url, _host(url), ok, latency, feed, error, now)
+    except Exception as e:
+        log(f"feedhealth flush error: {e}")
+
+def _apply(c, url, host, ok, latency, feed, error, now):
+    r = c.execute("SELECT * FROM feed_health WHERE url = ?", (url,)).fetchone()
+    r = dict(r) if r else {"url": url, "host": host, "last_success": None, "last_error": None,
+                           "error_streak": 0, "fetches": 0, "errors": 0, "mean_latency": None,
+                           "interval": None, "next_due": 0}
+    r.update(host=host, last_attempt=now, fetches=r["fetches"] + 1)
+    if latency is not None:
+        prev = r["mean_latency"]
+        r["mean_latency"] = latency if prev is None else prev + LATENCY_ALPHA * (latency - prev)
+    b = c.execute("SELECT * FROM host_breaker WHERE host = ?", (host,)).fetchone()
+    b = dict(b) if b else {"host": host, "error_streak": 0, "trips": 0, "open_until": 0}
+    if ok:
+        r.update(last_success=now, error_streak=0, interval=_interval(feed, url))
+        r["next_due"] = now + r["interval"]
+        if b["open_until"]: log(f"feedhealth: {host} recovered, breaker closed")
+        b.update(error_streak=0, trips=0, open_until=0)
+    else:
+        r.update(last_error=(error or "")[:300], error_streak=r["error_streak"] + 1, errors=r["errors"] + 1)
+        r["next_due"] = now + min(FEED_MAX_BACKOFF_MIN * 60, FEED_MIN_POLL_MIN * 60 * 2 ** r["error_streak"])
+        b["error_streak"] += 1
+        if b["error_streak"] >= FEED_BREAKER_ERRORS and now >= b["open_until"]:
+            cooldown = min(FEED_MAX_BACKOFF_MIN * 60, FEED_MIN_POLL_MIN * 60 * 2 ** b["trips"])
+            b.update(trips=b["trips"] + 1, open_until=now + cooldown)
+            log(f"feedhealth: {host} breaker open for {cooldown/60:.0f} min after {b['error_streak']} errors")
+    cols = list(r)
+    c.execute(f"INSERT OR REPLACE INTO feed_health ({','.join(cols)}) VALUES ({','.join('?' * len(cols))})",
+              [r[k] for k in cols])
+    c.execute("INSERT OR REPLACE INTO host_breaker (host, error_streak, trips, open_until) VALUES (?, ?, ?, ?)",
+              (host, b["error_streak"], b["trips"], b["open_until"]))
+
+def report():
+    """Every tracked feed's health row, worst first."""
+    return [dict(r) for r in db.conn().execute(
+        "SELECT * FROM feed_health ORDER BY error_streak DESC, url")]
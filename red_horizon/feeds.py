@@ -1,14 +1,20 @@
-import re, random, time, requests, feedparser
+import calendar, re, random, time, feedparser
+from functools import lru_cache
+from html.parser import HTMLParser
 from datetime import datetime, timedelta
 from urllib.parse import urlparse, urlunparse
-from difflib import SequenceMatcher
 
 from .config import (
-    FEEDS, IMAGE_FEEDS, KEYWORDS, STARBASE_KEYWORDS, PRIORITY_KEYWORDS,
-    NEGATIVE_HINTS, PROVIDER_WEIGHTS, HIGH_SIGNAL_DOMAINS, YOUTUBE_FEEDS,
-    FRESHNESS_DAYS, UTC, BREAKING_MIN_SCORE
+    FRESHNESS_DAYS, UTC, BREAKING_MIN_SCORE, FEED_TIMEOUT_SEC, DEDUPE_THRESHOLD,
+    FEED_MAX_ENTRIES, FEED_MAX_BYTES, FEED_SCHEDULER
 )
-from .persistence import log, save_json
+from .persistence import log
+from .fetcher import sweep
+from . import feedcache, feedhealth, feedstream, httpclient, snapshot, metrics, sources
+from .matcher import KeywordMatcher
+from .candidates import Candidate, Funnel
+from .dedupe import dedupe, normalize, signature
+from . import entries
 
 UA = {"User-Agent": "RedHorizonBot/1.0 (+https://t.me/RedHorizonHub)"}
 
@@ -19,14 +25,67 @@ def get_domain(url: str):
     return (m.group(1).lower() if m else "").replace("www.", "")
 
 def fetch_feed(url: str):
+    t = time.monotonic()
     try:
-        r = requests.get(url, headers=UA, timeout=10)
+        r = httpclient.get(url, headers=feedcache.request_headers(url, UA), timeout=FEED_TIMEOUT_SEC, stream=True)
+        metrics.inc("feed_responses_total", status=r.status_code)
+        if r.status_code == 304:
+            r.close()
+            cached = feedcache.cached_feed(url)
+            if cached is not None:
+                # unchanged is a success: reschedules the feed and closes a half-open breaker
+                feedhealth.record(url, True, time.monotonic() - t, cached)
+                return cached
+            r = httpclient.get(url, headers=UA, timeout=FEED_TIMEOUT_SEC, stream=True)
+        if r.status_code >= 400: r.close()
         r.raise_for_status()
-        return feedparser.parse(r.content)
+        # only the newest FEED_MAX_ENTRIES (and nothing past the freshness window) is read
+        body, cut = feedstream.fetch(r, FEED_MAX_ENTRIES, (FRESHNESS_DAYS + 1) * 86400, FEED_MAX_BYTES)
+        metrics.inc("feed_bytes_total", len(body))
+        if cut: metrics.inc("feed_cutoff_total", reason=cut)
+        with metrics.span("feed_parse"):
+            feed = feedparser.parse(body)
+        feedcache.remember(url, r.headers, feed)
+        feedhealth.record(url, True, time.monotonic() - t, feed)
+        return feed
     except Exception as e:
+        metrics.inc("feed_errors_total", feed=url)
+        feedhealth.record(url, False, time.monotonic() - t, error=str(e))
         log(f"fetch_feed error {url}: {e}")
         return feedparser.parse(b"")
 
+def _sweep(urls, label, due_only=True, flush=True):
+    urls, skipped, cached = list(urls), {}, {}
+    if FEED_SCHEDULER:
+        urls, skipped = feedhealth.plan(urls)
+        cached = {u: feedcache.cached_feed(u) for u in skipped}
+        # nothing cached to stand in for a feed that is merely not due (or the
+        # caller polls regardless of schedule): poll it anyway
+        urls += [u for u, why in skipped.items() if why == "scheduled" and (cached[u] is None or not due_only)]
+    got = sweep(urls, fetch_feed, label=label)
+    for u in urls:
+        if u not in got: feedhealth.record(u, False, None, error="sweep deadline")
+    # not due yet / host breaker open: serve the last good copy instead
+    served = {u: why for u, why in skipped.items() if u not in urls}
+    for u, why in served.items():
+        if cached[u] is not None: got[u] = cached[u]
+        metrics.inc("feed_skipped_total", reason=why)
+    if served:
+        log(f"{label}: {sum(v == 'scheduled' for v in served.values())} feeds not due, "
+            f"{sum(v == 'breaker' for v in served.values())} behind an open breaker")
+    if flush:
+        feedcache.flush()
+        feedhealth.flush()
+    return got
+
+def fetch_feeds(urls, label="sweep", ttl=None, due_only=True, flush=True):
+    """Feeds for urls from the shared snapshot, sweeping stale ones concurrently;
+    {url: feed}, empty feed for failures/timeouts. ttl=0 refetches everything
+    (conditionally); due_only=False ignores the learned poll schedule."""
+    urls = list(dict.fromkeys(urls))
+    got = snapshot.feeds(urls, lambda todo: _sweep(todo, label, due_only, flush), ttl=ttl, label=label)
+    return {u: got.get(u) or feedparser.parse(b"") for u in urls}
+
 def canonical_url(u: str):
     try:
         p = urlparse(u)
@@ -49,152 +108,221 @@ def is_recent(entry):
     return True
 
 def is_relevant(text: str):
-    return any(re.search(rf"\b{re.escape(kw)}\b", text, re.IGNORECASE) for kw in KEYWORDS)
+    return sources.current().matcher.hits(text)["keywords"] > 0
+
+@lru_cache(maxsize=32)
+def _matcher_for(words: tuple):
+    return KeywordMatcher({"words": words})
 
 def text_hits_any(text: str, words):
     if not text: return 0
-    t = text.lower()
-    hits = 0
-    for w in words:
-        if re.search(rf"\b{re.escape(w)}\b", t):
-            hits += 1
-    return hits
+    return _matcher_for(tuple(words)).hits(text)["words"]
 
-def relevance_score(title: str, summary: str, link: str):
-    """Score by keyword hits + provider weight + priority terms - negatives."""
-    t = (title or "").lower()
-    s = (summary or "").lower()
-    domain = get_domain(link)
+def score_hits(th: dict, sh: dict, link: str, weights=None):
+    """relevance_score from precomputed matcher hits of title (th) and summary (sh)."""
     score = 0.0
-    score += 1.5 * text_hits_any(t, KEYWORDS)
-    score += 0.5 * text_hits_any(s, KEYWORDS)
-    score += 1.5 * text_hits_any(t, PRIORITY_KEYWORDS)
-    score += 0.75 * text_hits_any(s, PRIORITY_KEYWORDS)
-    score += PROVIDER_WEIGHTS.get(domain, 0.0)
-    if text_hits_any(t, NEGATIVE_HINTS) or text_hits_any(s, NEGATIVE_HINTS):
+    score += 1.5 * th["keywords"]
+    score += 0.5 * sh["keywords"]
+    score += 1.5 * th["priority"]
+    score += 0.75 * sh["priority"]
+    score += (sources.current().provider_weights if weights is None else weights).get(get_domain(link), 0.0)
+    if th["negative"] or sh["negative"]:
         score -= 1.0
     return score
 
-def fuzzy_dedupe(items, threshold=0.90):
-    kept, norms = [], []
-    def norm(t):
-        t = t.lower()
-        t = re.sub(r"[^a-z0-9 ]+", " ", t)
-        return re.sub(r"\s+"," ", t).strip()
-    for it in items:
-        n = norm(it["title"])
-        if any(SequenceMatcher(None, n, s).ratio() >= threshold for s in norms):
-            continue
-        kept.append(it); norms.append(n)
-    return kept
+def relevance_score(title: str, summary: str, link: str):
+    """Score by keyword hits + provider weight + priority terms - negatives."""
+    src = sources.current()
+    return score_hits(src.matcher.hits(title), src.matcher.hits(summary), link, src.provider_weights)
+
+def relevance_scores(titles, summaries, links):
+    """relevance_score for many entries in one call (same values, same order)."""
+    return [s for s, _, _ in sources.current().scorer.score(list(titles), list(summaries), list(links))]
+
+def fuzzy_dedupe(items, threshold=DEDUPE_THRESHOLD, history=None):
+    """Drop near-duplicate titles (and any matching a posted-title history)."""
+    return dedupe(items, threshold, history)
+
+class _ImgParser(HTMLParser):
+    """Collects (url, width, height) for every <img> (src and srcset) in an HTML fragment."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.found = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag != "img": return
+        a = dict(attrs)
+        w, h = _px(a.get("width")), _px(a.get("height"))
+        if a.get("src"): self.found.append((a["src"], w, h))
+        for part in (a.get("srcset") or "").split(","):
+            bits = part.split()
+            if not bits: continue
+            d = bits[1] if len(bits) > 1 else ""
+            if d.endswith("w"): self.found.append((bits[0], _px(d[:-1]), None))
+            elif d.endswith("x") and w: self.found.append((bits[0], int(w * (_float(d[:-1]) or 1)), None))
+
+def _px(v):
+    try: return int(float(str(v).strip().rstrip("px")))
+    except (TypeError, ValueError): return None
+
+def _float(v):
+    try: return float(v)
+    except (TypeError, ValueError): return None
+
+def _largest(cands):
+    """Biggest rendition by pixel area (or width); ties keep the first listed."""
+    cands = [c for c in cands if c[0]]
+    if not cands: return None
+    return max(enumerate(cands), key=lambda ic: ((ic[1][1] or 0) * (ic[1][2] or ic[1][1] or 0), -ic[0]))[1][0]
 
 def extract_image_from_entry(e):
+    """Largest image rendition from the first source that has one: image
+    enclosures, then media:content, then media:thumbnail, then <img> tags
+    (src/srcset) in the description."""
     try:
-        if "enclosures" in e and e.enclosures:
-            url = e.enclosures[0].get("url")
-            if url: return url
-        if "media_content" in e and e.media_content:
-            url = e.media_content[0].get("url")
+        encl = [(x.get("href") or x.get("url"), None, None) for x in (e.get("enclosures") or [])
+                if (x.get("type") or "image/").startswith("image/")]
+        media = [(x.get("url"), _px(x.get("width")), _px(x.get("height"))) for x in (e.get("media_content") or [])
+                 if x.get("medium", "image") == "image" and (x.get("type") or "image/").startswith("image/")]
+        thumbs = [(x.get("url"), _px(x.get("width")), _px(x.get("height"))) for x in (e.get("media_thumbnail") or [])]
+        for group in (encl, media, thumbs):
+            url = _largest(group)
             if url: return url
         desc = e.get("description") or e.get("summary") or ""
-        m = re.search(r'<img[^>]+src="([^"]+)"', desc)
-        return m.group(1) if m else None
+        if "<img" not in desc: return None
+        p = _ImgParser(); p.feed(desc); p.close()
+        return _largest(p.found)
     except Exception:
         return None
 
-def _not_recently_seen(url: str, seen: dict, ttl_days: int):
-    now = time.time()
+def _not_recently_seen(url: str, seen: dict, ttl_days: int, now=None):
+    now = time.time() if now is None else now
     then = seen.get(url)
     return (then is None) or (now - then) > ttl_days*86400
 
-def _mark_seen(url: str, seen: dict, seen_path: str):
-    seen[url] = time.time()
-    save_json(seen_path, seen)
+def _mark_seen(url: str, seen, seen_path: str):
+    """Mark url seen; the caller exports the snapshot once when its task is done."""
+    seen.mark(url)
 
-def fetch_news(seen: dict, seen_path: str, ttl_days: int):
-    items=[]
-    for url in set(FEEDS):
-        feed = fetch_feed(url)
-        for e in feed.entries[:6]:
-            title = (e.get("title") or "").strip()
-            link  = canonical_url((e.get("link") or "").strip())
-            if not title or not link: continue
-            summary = (e.get("summary") or e.get("description") or "").strip()
-            if not is_english(title): continue
-            if not is_recent(e): continue
-            if not (is_relevant(title) or (summary and is_relevant(summary))): continue
-            score = relevance_score(title, summary, link)
-            if score < BREAKING_MIN_SCORE: continue
-            pub = datetime(*e.published_parsed[:6], tzinfo=UTC) if e.get("published_parsed") else datetime.now(UTC)
-            if _not_recently_seen(link, seen, ttl_days):
-                items.append({"title":title, "link":link, "published":pub, "score":score})
-
-    newest={}
-    for it in items:
-        prev = newest.get(it["title"])
-        if (not prev) or (it["published"] > prev["published"]) or (it["score"] > prev["score"]):
-            newest[it["title"]] = it
-
-    dedup = fuzzy_dedupe(list(newest.values()))
-    dedup.sort(key=lambda x: (x["score"], x["published"]), reverse=True)
+def _derive_entries(batch, known, now=None, src=None):
+    """Everything later selection needs from new feed entries, computed once
+    (scores for the whole batch in one scorer call). Entries already past the
+    freshness window can never be selected and are dropped before any of it."""
+    todo, cutoff = [], _fresh_cutoff(now)
+    for feed_url, e in batch:
+        pp = e.get("published_parsed")
+        if pp and calendar.timegm(pp) < cutoff: continue
+        title = (e.get("title") or "").strip()
+        link  = canonical_url((e.get("link") or "").strip())
+        if not title or not link or (feed_url, link) in known: continue
+        known.add((feed_url, link))
+        todo.append((feed_url, e, title, link, (e.get("summary") or e.get("description") or "").strip()))
+    scored = (src or sources.current()).scorer.score([t[2] for t in todo], [t[4] for t in todo], [t[3] for t in todo])
+    rows = []
+    for (feed_url, e, title, link, _), (score, title_score, relevant) in zip(todo, scored):
+        english = is_english(title)
+        pp = e.get("published_parsed")
+        row = {
+            "feed": feed_url, "link": link, "title": title,
+            "published": calendar.timegm(pp) if pp else (time.time() if now is None else now),
+            "english": english, "relevant": relevant,
+            "score": score, "title_score": title_score,
+            "img": extract_image_from_entry(e) if relevant else None,
+        }
+        if english and relevant:
+            row["norm"] = normalize(title); row["sig"] = signature(row["norm"])
+        rows.append(row)
+    return rows
+
+def _ingest(feeds: dict, limit: int, now=None):
+    """Store new entries of feeds; now (epoch) stands in for the clock in replays."""
+    src = sources.current()
+    derive = lambda batch, known: _derive_entries(batch, known, now, src)
+    with metrics.span("score"):
+        new = entries.ingest(feeds, limit, derive, now=now, scorer=src.scorer_tag)
+    metrics.inc("entries_ingested_total", new)
+    entries.prune(FRESHNESS_DAYS + 1, now=now)
+    return new
+
+def _fresh_cutoff(now=None):
+    return (time.time() if now is None else now) - FRESHNESS_DAYS * 86400
+
+def select_news(feed_urls, seen: dict, ttl_days: int, posted=None, now=None,
+                min_score=BREAKING_MIN_SCORE, threshold=DEDUPE_THRESHOLD):
+    """Digest/breaking candidates from stored entries, best first: a generator
+    chain over the rows, cheap checks before the dedupe, no per-row copies.
+    now (epoch), min_score and threshold are only overridden by replays."""
+    f = Funnel()
+    with metrics.span("filter"):
+        rows = f.stage("fresh", entries.rows(feed_urls, since=_fresh_cutoff(now)))
+        rows = f.stage("english_relevant", (r for r in rows if r["english"] and r["relevant"]))
+        rows = f.stage("min_score", (r for r in rows if r["score"] >= min_score))
+        rows = f.stage("not_seen", (r for r in rows if _not_recently_seen(r["link"], seen, ttl_days, now)))
+        newest = {}
+        for c in map(Candidate.from_row, rows):
+            prev = newest.get(c.title)
+            if (not prev) or (c.ts > prev.ts) or (c.score > prev.score):
+                newest[c.title] = c
+        f.counts["same_title"] = len(newest)
+    with metrics.span("dedupe"):
+        dedup = fuzzy_dedupe(newest.values(), threshold, history=posted)
+    f.counts["fuzzy_dedupe"] = len(dedup)
+    f.report()
+    dedup.sort(key=lambda x: (x.score, x.ts), reverse=True)
     return dedup
 
+def fetch_news(seen: dict, seen_path: str, ttl_days: int, posted=None):
+    feeds = fetch_feeds(set(sources.current().feeds), label="fetch_news")
+    _ingest(feeds, 6)
+    return select_news(feeds, seen, ttl_days, posted)
+
 def fetch_images(seen: dict, seen_path: str, ttl_days: int):
-    cands=[]
-    for url in set(IMAGE_FEEDS):
-        feed = fetch_feed(url)
-        for e in feed.entries[:6]:
-            title=(e.get("title") or "").strip()
-            link = canonical_url((e.get("link") or "").strip())
-            if not title or not link: continue
-            if not is_recent(e): continue
-            desc = (e.get("description") or e.get("summary") or "")
-            if not (is_relevant(title) or (desc and is_relevant(desc))): continue
-            img = extract_image_from_entry(e)
-            if not img: continue
-            if _not_recently_seen(link, seen, ttl_days):
-                cands.append({"title":title,"link":link,"img":img})
+    feeds = fetch_feeds(set(sources.current().image_feeds), label="fetch_images")
+    _ingest(feeds, 6)
+    cands = [Candidate.from_row(r) for r in entries.rows(feeds, since=_fresh_cutoff())
+             if r["relevant"] and r["img"] and _not_recently_seen(r["link"], seen, ttl_days)]
     random.shuffle(cands)
     return cands
 
+def priority_feeds():
+    """YouTube feeds plus the feeds on high-signal domains."""
+    return list(sources.current().priority_feeds)
+
+def poll_priority(flush=True):
+    """Conditionally refetch every priority feed now, due or not (the watcher's
+    tick); returns how many new entries were stored."""
+    feeds = fetch_feeds(priority_feeds(), label="watch", ttl=0, due_only=False, flush=flush)
+    return _ingest(feeds, 5)
+
+def ingest_feed(url: str, body: bytes):
+    """Store the entries of a pushed (WebSub) body as if fetched from url; returns how many were new."""
+    return _ingest({url: feedparser.parse(body)}, 5)
+
 def fetch_priority_candidates(seen: dict, ttl_days: int):
     """Super-priority signals from YouTube feeds and high-signal domains."""
+    src = sources.current()
+    # launch signals are time-critical: poll every priority feed, never wait on a learned interval
+    feeds = fetch_feeds(src.priority_feeds, label="fetch_priority", due_only=False)
+    _ingest(feeds, 5)
+    return select_priority(feeds, src)
+
+def select_priority(feed_urls, src=None):
+    """Priority candidates from stored entries of feed_urls, best first."""
     items=[]
-    # YouTube signals
-    for url in YOUTUBE_FEEDS:
-        feed = fetch_feed(url)
-        for e in feed.entries[:5]:
-            title = (e.get("title") or "").strip()
-            link  = canonical_url((e.get("link") or "").strip())
-            if not title or not link: continue
-            # Must be English-ish title
-            if not is_english(title): continue
-            # Look for LIVE / UPCOMING / priority terms + SpaceX context preferred
-            low = title.lower()
-            if not any(k in low for k in [*PRIORITY_KEYWORDS, "live","stream","premiere","upcoming"]):
-                continue
-            # score it
-            score = relevance_score(title, "", link)
-            pub = datetime(*e.published_parsed[:6], tzinfo=UTC) if e.get("published_parsed") else datetime.now(UTC)
-            items.append({"title":title,"link":link,"published":pub,"score":score})
-
-    # High-signal website feeds for priority words
-    for url in set(FEEDS):
-        if not any(d in url for d in HIGH_SIGNAL_DOMAINS): continue
-        feed = fetch_feed(url)
-        for e in feed.entries[:5]:
-            title = (e.get("title") or "").strip()
-            link  = canonical_url((e.get("link") or "").strip())
-            if not title or not link: continue
-            if not is_english(title): continue
-            low = title.lower()
-            if not any(k in low for k in PRIORITY_KEYWORDS): continue
-            score = relevance_score(title, "", link)
-            pub = datetime(*e.published_parsed[:6], tzinfo=UTC) if e.get("published_parsed") else datetime.now(UTC)
-            items.append({"title":title,"link":link,"published":pub,"score":score})
+    src = src or sources.current()
+    youtube_terms = [*src.priority_keywords, "live","stream","premiere","upcoming"]
+    for r in entries.rows(feed_urls):
+        # Must be English-ish title
+        if not r["english"]: continue
+        # YouTube: LIVE / UPCOMING / priority terms; websites: priority words only
+        low = r["title"].lower()
+        terms = youtube_terms if r["feed"] in src.youtube_feeds else src.priority_keywords
+        if not any(k in low for k in terms): continue
+        items.append(Candidate.from_row(r, score="title_score"))
 
     if not items: return []
-    items.sort(key=lambda x: (x["score"], x["published"]), reverse=True)
+    items.sort(key=lambda x: (x.score, x.ts), reverse=True)
     return items
 
 # expose helpers
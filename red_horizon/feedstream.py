@@ -0,0 +1,89 @@
+# red_horizon/feedstream.py — read a feed body only as far as the bot will use it
+#
+# fetch_* never look past the first few entries of a feed, yet big feeds
+# (space.com/feeds/all, phys.org) are hundreds of KB. read() pulls the
+# response in chunks and stops once `max_entries` items/entries have
+# closed, once a run of entries is older than the freshness window, or at
+# `max_bytes`. The kept prefix is closed off with the root's end tags so
+# feedparser still gets a well-formed document and behaves as before.
+
+import re, time
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+
+CHUNK = 16 * 1024
+STALE_RUN = 3     # consecutive old entries before we trust the feed is date-ordered
+
+_ROOT_RE = re.compile(rb"<([A-Za-z_][\w.:-]*)[\s>/]")
+_START_RE = re.compile(rb"<(?:[\w.-]+:)?(?:item|entry)[\s>]")
+_END_RE = re.compile(rb"</(?:[\w.-]+:)?(?:item|entry)\s*>")
+_DATE_RE = re.compile(rb"<(?:[\w.-]+:)?(pubDate|published|updated|date)\b[^>]*>\s*([^<]{6,64}?)\s*<")
+
+def _root(head: bytes):
+    """Name of the document element (skips the prolog, comments and doctype)."""
+    i = 0
+    while True:
+        m = _ROOT_RE.search(head, i)
+        if not m: return None
+        if head[m.start() + 1:m.start() + 2] not in (b"?", b"!"):
+            return m.group(1)
+        i = m.end()
+
+def _closers(root: bytes):
+    if root is None: return b""
+    local = root.rsplit(b":", 1)[-1].lower()
+    if local == b"rss": return b"</channel></" + root + b">"
+    return b"</" + root + b">"
+
+def _timestamp(raw: bytes):
+    s = raw.decode("utf-8", "ignore").strip()
+    try: return parsedate_to_datetime(s).timestamp()
+    except Exception: pass
+    try: return datetime.fromisoformat(s.replace("Z", "+00:00")).timestamp()
+    except Exception: return None
+
+def _entry_time(body: bytes):
+    """pubDate/published/updated/dc:date of one entry's bytes, first that parses."""
+    for m in _DATE_RE.finditer(body):
+        ts = _timestamp(m.group(2))
+        if ts is not None: return ts
+    return None
+
+def read(chunks, max_entries=None, cutoff=None, max_bytes=None):
+    """Consume byte chunks; returns (document bytes, reason) where reason is
+    "entries", "stale", "size" or "" when the whole body was read."""
+    buf = bytearray()
+    seen = stale = scan = 0
+    cut, reason = None, ""
+    for chunk in chunks:
+        if not chunk: continue
+        buf += chunk
+        # UTF-16/32 bodies cannot be scanned bytewise; just read them (up to the cap)
+        wide = buf[:2] in (b"\xff\xfe", b"\xfe\xff") or buf[:1] == b"\x00"
+        while not wide:
+            m = _END_RE.search(buf, scan)
+            if not m: break
+            start = _START_RE.search(buf, scan, m.start())
+            entry, scan = bytes(buf[start.start() if start else scan:m.end()]), m.end()
+            seen += 1
+            if max_entries and seen >= max_entries:
+                cut, reason = scan, "entries"; break
+            if cutoff:
+                ts = _entry_time(entry)
+                stale = stale + 1 if ts is not None and ts < cutoff else 0
+                if stale >= STALE_RUN:
+                    cut, reason = scan, "stale"; break
+        if cut is None and max_bytes and len(buf) >= max_bytes:
+            cut, reason = (scan or max_bytes), "size"
+        if cut is not None: break
+    if cut is None:
+        return bytes(buf), ""
+    return bytes(buf[:cut]) + _closers(_root(bytes(buf[:4096]))), reason
+
+def fetch(resp, max_entries=None, max_age_sec=None, max_bytes=None):
+    """read() a streamed requests response and release its connection."""
+    cutoff = time.time() - max_age_sec if max_age_sec else None
+    try:
+        return read(resp.iter_content(CHUNK), max_entries, cutoff, max_bytes)
+    finally:
+        resp.close()
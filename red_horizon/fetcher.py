@@ -0,0 +1,72 @@
+# red_horizon/fetcher.py — bounded-concurrency sweep over many feed URLs
+
+import threading, time
+from concurrent.futures import ThreadPoolExecutor, wait
+from urllib.parse import urlparse
+
+from .config import FETCH_WORKERS, FETCH_PER_HOST, FETCH_DEADLINE_SEC
+from .persistence import log
+from . import metrics
+
+# Per-host semaphores are shared by every sweep so overlapping sweeps
+# (e.g. two /run calls) still respect the per-host limit together.
+_HOST_SEMS = {}
+_HOST_SEMS_LOCK = threading.Lock()
+
+# Latency report of the most recent sweep (url -> seconds), for diagnostics.
+LAST_SWEEP = {"elapsed": 0.0, "feeds": {}, "timed_out": []}
+
+def _host(url: str):
+    try: return (urlparse(url).hostname or "").lower()
+    except Exception: return ""
+
+def _host_sem(host: str, limit: int):
+    with _HOST_SEMS_LOCK:
+        sem = _HOST_SEMS.get((host, limit))
+        if sem is None:
+            sem = _HOST_SEMS[(host, limit)] = threading.BoundedSemaphore(max(1, limit))
+        return sem
+
+def sweep(urls, fn, workers=None, per_host=None, deadline=None, label="sweep"):
+    """Run fn(url) for every url on a thread pool; returns {url: result}.
+
+    URLs still running when the deadline passes are left out of the result,
+    so callers must treat a missing key as an empty fetch.
+    """
+    workers  = workers  or FETCH_WORKERS
+    per_host = per_host or FETCH_PER_HOST
+    deadline = FETCH_DEADLINE_SEC if deadline is None else deadline
+    urls = list(dict.fromkeys(urls))
+    results, latency = {}, {}
+    if not urls: return results
+
+    run = metrics.current()
+
+    def job(u):
+        with metrics.attach(run), _host_sem(_host(u), per_host):
+            t = time.monotonic()
+            try:
+                return fn(u)
+            finally:
+                latency[u] = time.monotonic() - t
+                metrics.observe("feed_fetch", latency[u], feed=u)
+
+    t0 = time.monotonic()
+    pool = ThreadPoolExecutor(max_workers=min(workers, len(urls)), thread_name_prefix="feed")
+    futs = {pool.submit(job, u): u for u in urls}
+    done, pending = wait(futs, timeout=deadline)
+    pool.shutdown(wait=False, cancel_futures=True)
+    for f in done:
+        try: results[futs[f]] = f.result()
+        except Exception as e: log(f"{label}: {futs[f]} failed: {e}")
+    timed_out = [futs[f] for f in pending]
+    elapsed = time.monotonic() - t0
+
+    LAST_SWEEP.update(elapsed=elapsed, feeds=dict(latency), timed_out=timed_out)
+    slow = sorted(latency.items(), key=lambda kv: kv[1], reverse=True)
+    report = ", ".join(f"{_host(u)} {s*1000:.0f}ms" for u, s in slow)
+    log(f"{label}: {len(done)}/{len(urls)} feeds in {elapsed:.2f}s [{report}]")
+    for u in timed_out: metrics.inc("feed_timeouts_total", feed=u)
+    if timed_out:
+        log(f"{label}: deadline {deadline:g}s hit, skipped {', '.join(timed_out)}")
+    return results
@@ -0,0 +1,104 @@
+# red_horizon/httpclient.py — one pooled HTTP layer for feeds, Telegram and Zapier
+
+import random, threading, time, requests
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
+
+from .config import HTTP_POOL_SIZE, HTTP_MAX_BACKOFF_SEC
+from .persistence import log
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_sessions = {}
+_stats = {}
+_lock = threading.Lock()
+
+def _host(url: str):
+    try: return (urlparse(url).hostname or "").lower()
+    except Exception: return ""
+
+def session_for(url: str):
+    """Keep-alive session for url's host, created on first use."""
+    host = _host(url)
+    with _lock:
+        s = _sessions.get(host)
+        if s is None:
+            s = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_SIZE, max_retries=0)
+            s.mount("http://", adapter); s.mount("https://", adapter)
+            _sessions[host] = s
+            _stats[host] = {"requests": 0, "retries": 0, "errors": 0}
+        return s
+
+def _count(host: str, key: str):
+    with _lock:
+        _stats.setdefault(host, {"requests": 0, "retries": 0, "errors": 0})[key] += 1
+
+def _retry_after(resp):
+    val = (resp.headers.get("Retry-After") or "").strip()
+    if not val: return None
+    try: return max(0.0, float(val))
+    except ValueError: pass
+    try: return max(0.0, parsedate_to_datetime(val).timestamp() - time.time())
+    except Exception: return None
+
+def _backoff(attempt: int, base: float, cap: float, resp=None):
+    hinted = _retry_after(resp) if resp is not None else None
+    if hinted is not None:
+        return min(hinted, cap) + random.uniform(0, 0.5)
+    return random.uniform(0.5, 1.0) * min(cap, base * (2 ** attempt))
+
+def request(method: str, url: str, *, timeout=10, retries=0, backoff=1.0,
+            max_wait=None, retry_on=RETRY_STATUSES, **kwargs):
+    """Send through the host's pooled session, retrying on retry_on statuses and
+    connection errors with jittered exponential backoff (Retry-After wins).
+
+    Returns the last response (with .retries = attempts beyond the first);
+    re-raises the last connection error when every attempt failed without one.
+    """
+    cap = HTTP_MAX_BACKOFF_SEC if max_wait is None else max_wait
+    host, sess = _host(url), session_for(url)
+    resp = None
+    for attempt in range(retries + 1):
+        if attempt: _count(host, "retries")
+        _count(host, "requests")
+        try:
+            resp = sess.request(method, url, timeout=timeout, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            _count(host, "errors")
+            if attempt >= retries: raise
+            time.sleep(_backoff(attempt, backoff, cap)); continue
+        resp.retries = attempt
+        if resp.status_code not in retry_on or attempt >= retries:
+            return resp
+        time.sleep(_backoff(attempt, backoff, cap, resp))
+    return resp
+
+def get(url: str, **kwargs):
+    return request("GET", url, **kwargs)
+
+def post(url: str, **kwargs):
+    return request("POST", url, **kwargs)
+
+def stats():
+    """Per-host request/retry/error counts plus connections opened vs reused."""
+    with _lock:
+        out = {h: dict(v) for h, v in _stats.items()}
+        sessions = dict(_sessions)
+    for host, sess in sessions.items():
+        opened = 0
+        for adapter in {id(a): a for a in sess.adapters.values()}.values():
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is not None: opened += pool.num_connections
+        st = out.setdefault(host, {"requests": 0, "retries": 0, "errors": 0})
+        st["connections"] = opened
+        st["reused"] = max(0, st["requests"] - st["errors"] - opened)
+    return out
+
+def log_stats(label="http"):
+    parts = [f"{h} req={s['requests']} conn={s.get('connections', 0)} reused={s.get('reused', 0)} retries={s['retries']}"
+             for h, s in sorted(stats().items())]
+    if parts: log(f"{label}: " + "; ".join(parts))
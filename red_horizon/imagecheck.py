@@ -0,0 +1,132 @@
+# red_horizon/imagecheck.py — pre-flight image URLs before they reach sendPhoto
+#
+# One ranged GET per URL (first 64 KiB) gives the content type, the full
+# size (Content-Range / Content-Length) and, from the header bytes, the
+# pixel dimensions of JPEG/PNG/GIF/WebP files. Results are cached in
+# state.db for IMAGE_CHECK_TTL_HOURS so a candidate is probed once a day,
+# not once per run; pick() probes a batch concurrently and returns the
+# first candidate Telegram will accept.
+
+import struct, time
+from . import db, httpclient, metrics
+from .config import IMAGE_CHECK_TTL_HOURS, IMAGE_MAX_BYTES, FEED_TIMEOUT_SEC
+from .fetcher import sweep
+from .persistence import log
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS image_meta (
+    url     TEXT PRIMARY KEY,
+    ok      INTEGER NOT NULL,
+    ctype   TEXT,
+    size    INTEGER,
+    width   INTEGER,
+    height  INTEGER,
+    error   TEXT,
+    checked REAL NOT NULL
+);
+"""
+db.register_schema(SCHEMA)
+
+PROBE_BYTES = 64 * 1024
+PHOTO_TYPES = ("image/jpeg", "image/png", "image/webp", "image/gif")
+MAX_SIDE_SUM, MAX_ASPECT = 10000, 20      # Telegram's sendPhoto limits
+UA = {"User-Agent": "RedHorizonBot/1.0 (+https://t.me/RedHorizonHub)"}
+
+def dimensions(head: bytes):
+    """(width, height) from the first bytes of a JPEG/PNG/GIF/WebP, or None."""
+    try:
+        if head[:8] == b"\x89PNG\r\n\x1a\n" and head[12:16] == b"IHDR":
+            return struct.unpack(">II", head[16:24])
+        if head[:6] in (b"GIF87a", b"GIF89a"):
+            return struct.unpack("<HH", head[6:10])
+        if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+            kind = head[12:16]
+            if kind == b"VP8 ":
+                w, h = struct.unpack("<HH", head[26:30]); return w & 0x3FFF, h & 0x3FFF
+            if kind == b"VP8L":
+                b = int.from_bytes(head[21:25], "little")
+                return (b & 0x3FFF) + 1, ((b >> 14) & 0x3FFF) + 1
+            if kind == b"VP8X":
+                return int.from_bytes(head[24:27], "little") + 1, int.from_bytes(head[27:30], "little") + 1
+        if head[:2] == b"\xff\xd8":
+            i = 2
+            while i + 9 < len(head):
+                if head[i] != 0xFF: i += 1; continue
+                marker = head[i + 1]
+                if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7: i += 2; continue
+                seg = struct.unpack(">H", head[i + 2:i + 4])[0]
+                if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                    h, w = struct.unpack(">HH", head[i + 5:i + 9]); return w, h
+                i += 2 + seg
+    except struct.error:
+        pass
+    return None
+
+def probe(url: str):
+    """Metadata for one image URL (never raises)."""
+    meta = {"url": url, "ok": False, "ctype": None, "size": None, "width": None, "height": None, "error": None}
+    try:
+        r = httpclient.get(url, headers={**UA, "Range": f"bytes=0-{PROBE_BYTES - 1}"},
+                           timeout=FEED_TIMEOUT_SEC, stream=True)
+        try:
+            if r.status_code >= 400:
+                meta["error"] = f"HTTP {r.status_code}"; return meta
+            meta["ctype"] = (r.headers.get("Content-Type") or "").split(";")[0].strip().lower() or None
+            total = (r.headers.get("Content-Range") or "").rpartition("/")[2]
+            size = total if total.isdigit() else (r.headers.get("Content-Length") if r.status_code == 200 else None)
+            meta["size"] = int(size) if size and str(size).isdigit() else None
+            head = bytearray()
+            for chunk in r.iter_content(16 * 1024):
+                head += chunk
+                if len(head) >= PROBE_BYTES: break
+        finally:
+            r.close()
+        dims = dimensions(bytes(head))
+        if dims: meta["width"], meta["height"] = dims
+        meta["error"] = _reject(meta)
+        meta["ok"] = meta["error"] is None
+    except Exception as e:
+        meta["error"] = str(e)[:200]
+    return meta
+
+def _reject(m):
+    if m["ctype"] not in PHOTO_TYPES: return f"content-type {m['ctype']}"
+    if m["size"] is not None and m["size"] > IMAGE_MAX_BYTES: return f"{m['size']} bytes"
+    w, h = m["width"], m["height"]
+    if w and h:
+        if w + h > MAX_SIDE_SUM or max(w, h) / min(w, h) > MAX_ASPECT: return f"{w}x{h}"
+    return None
+
+def check(urls):
+    """{url: metadata} for urls, probing (concurrently) only those not cached within the TTL."""
+    urls = list(dict.fromkeys(u for u in urls if u))
+    if not urls: return {}
+    c = db.conn()
+    ttl = IMAGE_CHECK_TTL_HOURS * 3600
+    fresh = {r["url"]: dict(r) for r in c.execute(
+        f"SELECT * FROM image_meta WHERE url IN ({','.join('?' * len(urls))}) AND checked >= ?",
+        [*urls, time.time() - ttl])}
+    todo = [u for u in urls if u not in fresh]
+    if todo:
+        got = sweep(todo, probe, deadline=FEED_TIMEOUT_SEC + 5, label="image preflight")
+        now = time.time()
+        with c:
+            c.executemany("INSERT OR REPLACE INTO image_meta (url, ok, ctype, size, width, height, error, checked) "
+                          "VALUES (:url, :ok, :ctype, :size, :width, :height, :error, :checked)",
+                          [{**m, "checked": now} for m in got.values()])
+        fresh.update(got)
+    metrics.inc("image_checks_total", len(todo), source="probe")
+    metrics.inc("image_checks_total", len(urls) - len(todo), source="cache")
+    return fresh
+
+def pick(cands, key="img", batch=8, limit=24):
+    """First candidate (in the given order) whose image passes pre-flight, checking
+    `batch` at a time and at most `limit`; None if none does."""
+    for i in range(0, min(len(cands), limit), batch):
+        group = cands[i:i + batch]
+        meta = check([c[key] for c in group])
+        for cand in group:
+            m = meta.get(cand[key])
+            if m and m["ok"]: return cand
+            log(f"image preflight: skip {cand[key]} ({(m or {}).get('error') or 'no answer'})")
+    return None
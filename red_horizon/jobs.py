@@ -0,0 +1,93 @@
+# red_horizon/jobs.py — background job runner behind /run
+
+import itertools, threading, time, uuid
+from collections import OrderedDict
+from contextlib import ExitStack
+from concurrent.futures import ThreadPoolExecutor
+
+from .config import JOB_WORKERS, JOB_HISTORY
+from .persistence import log
+from . import metrics
+
+class JobRunner:
+    """Runs task callables on a worker pool, one at a time per lock key.
+
+    A trigger for a task whose job is still queued or running returns that
+    job instead of starting a second one (coalescing). Jobs that share a
+    lock key (the same task, two tasks posting from one candidate pool, or a
+    batch containing either) never run at the same time. Finished jobs are
+    kept, newest last, up to `history` entries for /jobs/<id>.
+    """
+
+    def __init__(self, workers=JOB_WORKERS, history=JOB_HISTORY):
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._jobs = OrderedDict()
+        self._active = {}          # task -> job id still queued/running
+        self._locks = {}           # lock key -> Lock held while a job runs
+        self._history = history
+        self._mu = threading.Lock()
+        self._seq = itertools.count(1)
+
+    def submit(self, task: str, fn, lock_keys=None):
+        """Queue fn() for `task` holding every lock in lock_keys (default: the
+        task name); returns (job dict, coalesced?)."""
+        with self._mu:
+            active = self._active.get(task)
+            if active and self._jobs[active]["status"] in ("queued", "running"):
+                return self._public(self._jobs[active]), True
+            job = {
+                "id": f"{next(self._seq)}-{uuid.uuid4().hex[:8]}", "task": task,
+                "status": "queued", "created": time.time(),
+                "started": None, "finished": None, "duration": None,
+                "result": None, "error": None, "summary": None,
+            }
+            self._jobs[job["id"]] = job
+            self._active[task] = job["id"]
+            locks = [self._locks.setdefault(k, threading.Lock()) for k in sorted(set(lock_keys or [task]))]
+            while len(self._jobs) > self._history:
+                old_id, old = next(iter(self._jobs.items()))
+                if old["status"] in ("queued", "running"): break
+                self._jobs.pop(old_id)
+            job["_future"] = self._pool.submit(self._run, job, fn, locks)
+            return self._public(job), False
+
+    def _run(self, job, fn, locks):
+        with ExitStack() as held:
+            for lock in locks: held.enter_context(lock)   # sorted order: no deadlocks
+            job.update(status="running", started=time.time())
+            with metrics.run(job["task"]) as run:
+                try:
+                    job["result"] = fn()
+                    job["status"] = "done"
+                except Exception as e:
+                    job.update(status="error", error=str(e))
+                    log(f"job {job['id']} ({job['task']}) ERROR {e}")
+                finally:
+                    job["finished"] = time.time()
+                    job["duration"] = round(job["finished"] - job["started"], 3)
+                    job["summary"] = run.summary()
+            metrics.inc("jobs_total", task=job["task"], status=job["status"])
+            metrics.observe("job", job["duration"], task=job["task"])
+        log(f"job {job['id']} ({job['task']}) -> {job['status']} in {job['duration']}s")
+        return job
+
+    def wait(self, job_id: str, timeout=None):
+        """Block until the job finishes (or timeout); returns its public view."""
+        with self._mu:
+            job = self._jobs.get(job_id)
+        if job is None: return None
+        try: job["_future"].result(timeout=timeout)
+        except Exception: pass
+        return self._public(job)
+
+    def get(self, job_id: str):
+        with self._mu:
+            job = self._jobs.get(job_id)
+        return self._public(job) if job else None
+
+    @staticmethod
+    def _public(job):
+        out = {k: v for k, v in job.items() if not k.startswith("_")}
+        if out["status"] == "queued": out["waited"] = round(time.time() - out["created"], 3)
+        elif out["started"]: out["queued_for"] = round(out["started"] - out["created"], 3)
+        return out
@@ -0,0 +1,206 @@
+# red_horizon/lease.py — time-bounded task leases so one replica runs each cycle
+#
+# The web app and the cron workflow can both fire priority/breaking. Before
+# running a leased task a replica takes the task's lease for LEASE_TTL_SEC
+# (about one cron period) and keeps it after finishing, so anyone else
+# firing in the same cycle skips — no second sweep, no second post. The
+# holder may take its own lease again at any time (the watcher re-triggers
+# priority every few seconds) and the last result is kept on the lease as
+# a note, which is what a skipped replica reports.
+#
+# Backends share one interface: acquire / release / get / note.
+#   sqlite — the leases table in state.db (replicas on one machine)
+#   file   — fcntl-locked JSON files under LEASE_DIR
+#   http   — the /lease endpoints of another replica (the web app), so a
+#            cron runner without its disk can still coordinate with it
+# A backend that cannot be reached fails open: running twice beats never.
+
+import json, os, socket, threading, time, uuid
+
+from . import db
+from .config import LEASE_BACKEND, LEASE_TTL_SEC, LEASE_URL, LEASE_DIR
+from .persistence import log
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    name    TEXT PRIMARY KEY,
+    holder  TEXT NOT NULL,
+    epoch   INTEGER NOT NULL,
+    expires REAL NOT NULL,
+    note    TEXT
+);
+"""
+db.register_schema(SCHEMA)
+
+_holder = None
+_pid = None
+_backend = None
+_lock = threading.Lock()
+
+def holder():
+    """This process's holder id (LEASE_HOLDER, else host:pid:random)."""
+    global _holder, _pid
+    if _holder is None or _pid != os.getpid():
+        _pid = os.getpid()
+        _holder = os.getenv("LEASE_HOLDER") or f"{socket.gethostname()}:{_pid}:{uuid.uuid4().hex[:6]}"
+    return _holder
+
+def _grant(rec, name, who, ttl, now):
+    """New record if `who` may hold lease `name` (free, expired or already its own), else None."""
+    if rec and rec["holder"] != who and rec["expires"] > now: return None
+    epoch = (rec["epoch"] if rec else 0) + (0 if rec and rec["holder"] == who and rec["expires"] > now else 1)
+    return {"name": name, "holder": who, "epoch": epoch, "expires": now + ttl, "note": rec["note"] if rec else None}
+
+class SqliteLeases:
+    def __init__(self, path=None):
+        self.path = path
+
+    def _c(self):
+        c = db.conn(self.path)
+        if c.in_transaction: c.commit()
+        return c
+
+    def get(self, name):
+        r = self._c().execute("SELECT * FROM leases WHERE name = ?", (name,)).fetchone()
+        return dict(r) if r else None
+
+    def acquire(self, name, who, ttl):
+        """(granted?, current record)."""
+        c = self._c()
+        c.execute("BEGIN IMMEDIATE")
+        try:
+            r = c.execute("SELECT * FROM leases WHERE name = ?", (name,)).fetchone()
+            rec = _grant(dict(r) if r else None, name, who, ttl, time.time())
+            if rec:
+                c.execute("INSERT OR REPLACE INTO leases (name, holder, epoch, expires, note) VALUES (?, ?, ?, ?, ?)",
+                          (name, who, rec["epoch"], rec["expires"], rec["note"]))
+            c.execute("COMMIT")
+        except Exception:
+            c.execute("ROLLBACK"); raise
+        return (True, rec) if rec else (False, dict(r))
+
+    def release(self, name, who):
+        c = self._c()
+        with c:
+            return c.execute("UPDATE leases SET expires = 0 WHERE name = ? AND holder = ?", (name, who)).rowcount > 0
+
+    def note(self, name, who, note):
+        c = self._c()
+        with c:
+            return c.execute("UPDATE leases SET note = ? WHERE name = ? AND holder = ?",
+                             (note, name, who)).rowcount > 0
+
+class FileLeases:
+    def __init__(self, directory=LEASE_DIR):
+        self.dir = directory
+
+    def _edit(self, name, fn):
+        """Run fn(record or None) -> (result, new record or None) under an exclusive flock."""
+        import fcntl
+        os.makedirs(self.dir, exist_ok=True)
+        with open(os.path.join(self.dir, f"{name}.lease"), "a+", encoding="utf-8") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                raw = f.read()
+                rec = json.loads(raw) if raw.strip() else None
+                out, new = fn(rec)
+                if new is not None:
+                    f.seek(0); f.truncate(); f.write(json.dumps(new)); f.flush(); os.fsync(f.fileno())
+                return out
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def get(self, name):
+        return self._edit(name, lambda rec: (rec, None))
+
+    def acquire(self, name, who, ttl):
+        def fn(rec):
+            new = _grant(rec, name, who, ttl, time.time())
+            return ((True, new) if new else (False, rec)), new
+        return self._edit(name, fn)
+
+    def release(self, name, who):
+        def fn(rec):
+            if not rec or rec["holder"] != who: return False, None
+            return True, {**rec, "expires": 0}
+        return self._edit(name, fn)
+
+    def note(self, name, who, note):
+        def fn(rec):
+            if not rec or rec["holder"] != who: return False, None
+            return True, {**rec, "note": note}
+        return self._edit(name, fn)
+
+class HttpLeases:
+    """Client for another replica's /lease/<name> routes (see main.py)."""
+
+    def __init__(self, base=LEASE_URL, key=None):
+        self.base = base.rstrip("/")
+        self.key = key or os.getenv("LEASE_KEY") or os.getenv("CRON_SECRET") or ""
+
+    def _call(self, method, name, path="", **body):
+        from . import httpclient
+        r = httpclient.request(method, f"{self.base}/lease/{name}{path}", params={"key": self.key},
+                               json=body or None, timeout=5, retries=1)
+        if r.status_code not in (200, 409): raise RuntimeError(f"lease {method} {name}: HTTP {r.status_code}")
+        return r.json()
+
+    def get(self, name):
+        return self._call("GET", name).get("lease")
+
+    def acquire(self, name, who, ttl):
+        d = self._call("POST", name, holder=who, ttl=ttl)
+        return d["ok"], d.get("lease")
+
+    def release(self, name, who):
+        return self._call("DELETE", name, holder=who)["ok"]
+
+    def note(self, name, who, note):
+        return self._call("POST", name, "/note", holder=who, note=note)["ok"]
+
+BACKENDS = {"sqlite": SqliteLeases, "file": FileLeases, "http": HttpLeases}
+
+def backend():
+    """The configured backend (LEASE_BACKEND); None when leases are off."""
+    global _backend
+    if _backend is None:
+        with _lock:
+            if _backend is None:
+                kind = LEASE_BACKEND if LEASE_BACKEND in (*BACKENDS, "off") else "sqlite"
+                if kind == "http" and not LEASE_URL:
+                    log("lease: LEASE_BACKEND=http without LEASE_URL, using sqlite"); kind = "sqlite"
+                _backend = False if kind == "off" else BACKENDS[kind]()
+    return _backend or None
+
+def local_backend():
+    """What this replica serves /lease from: its own backend, never an http hop."""
+    b = backend()
+    return b if isinstance(b, (SqliteLeases, FileLeases)) else SqliteLeases()
+
+def acquire(name, ttl=LEASE_TTL_SEC):
+    """(run?, lease record); fails open when the backend is off or unreachable."""
+    b = backend()
+    if b is None: return True, None
+    try:
+        return b.acquire(name, holder(), ttl)
+    except Exception as e:
+        log(f"lease {name}: backend error ({e}), running without a lease", level="warn")
+        return True, None
+
+def held_elsewhere(name):
+    """The lease record if another holder has `name` right now, else None (never raises)."""
+    b = backend()
+    if b is None: return None
+    try:
+        rec = b.get(name)
+    except Exception:
+        return None
+    return rec if rec and rec["holder"] != holder() and rec["expires"] > time.time() else None
+
+def note(name, text):
+    """Record this holder's last result on the lease (what skipped replicas report)."""
+    b = backend()
+    if b is None: return
+    try: b.note(name, holder(), str(text)[:300])
+    except Exception as e: log(f"lease {name}: note failed ({e})", level="warn")
@@ -0,0 +1,121 @@
+# red_horizon/logs.py — buffered structured logging
+#
+# log() only builds a record and appends it to an in-memory ring (what
+# /logs/tail serves) and to a pending list; a background thread writes the
+# pending records as JSON lines every LOG_FLUSH_SEC (at once for errors),
+# through a file handle it keeps open. The file size is tracked as it is
+# written, and the file rotates by renaming (log.jsonl -> .1 -> .2 ...) once
+# it passes LOG_MAX_BYTES or LOG_ROTATE_HOURS, so nothing is ever re-read.
+# Whatever is pending is written at interpreter exit, and a forked worker
+# starts its own flusher.
+
+import atexit, itertools, json, os, re, sys, threading, time
+from collections import deque
+
+from .config import (
+    LOG_DIR, LOG_LEVEL, LOG_RING_SIZE, LOG_FLUSH_SEC, LOG_MAX_BYTES, LOG_ROTATE_HOURS, LOG_BACKUPS,
+)
+
+LOG_FILE = os.path.join(LOG_DIR, "log.jsonl")
+LEVELS = {"debug": 10, "info": 20, "warn": 30, "error": 40}
+_ERROR_RE = re.compile(r"\b(error|exception|failed|fail)\b|traceback", re.I)
+
+_ring = deque(maxlen=LOG_RING_SIZE)
+_pending = []
+_seq = itertools.count(1)
+_mu = threading.Lock()
+_wake = threading.Event()
+_min_level = LEVELS.get(LOG_LEVEL, 20)
+_writer = None
+
+def log(msg: str, level=None, **fields):
+    """Record one line; level defaults to "error" for messages that read like one, else "info"."""
+    level = level or ("error" if _ERROR_RE.search(msg) else "info")
+    if LEVELS.get(level, 20) < _min_level: return
+    rec = {"ts": round(time.time(), 3), "level": level, "msg": msg, "thread": threading.current_thread().name}
+    run = _current_run()
+    if run is not None: rec["task"] = run.task
+    if fields: rec.update(fields)
+    with _mu:
+        rec["seq"] = next(_seq)
+        _ring.append(rec)
+        _pending.append(rec)
+    _ensure_writer()
+    if level == "error": _wake.set()
+
+def _current_run():
+    m = sys.modules.get("red_horizon.metrics")
+    return m.current() if m else None
+
+def tail(n=200, level=None, since=0, q=None):
+    """Newest-last records from memory: at most n, at/above `level`, with seq > since, msg containing q."""
+    floor = LEVELS.get(level, 0)
+    with _mu:
+        recs = list(_ring)
+    out = [r for r in recs if r["seq"] > since and LEVELS.get(r["level"], 20) >= floor
+           and (not q or q.lower() in r["msg"].lower())]
+    return out[-n:] if n else out
+
+def flush():
+    """Write everything pending now (the flusher does this on its own)."""
+    w = _writer
+    if w is not None: w.flush()
+
+class _Writer:
+    def __init__(self):
+        self.f, self.size, self.opened = None, 0, 0.0
+        self.io = threading.Lock()       # one writer at a time (thread vs. atexit/flush())
+        self.thread = threading.Thread(target=self._loop, name="log-flush", daemon=True)
+        self.thread.start()
+
+    def _open(self):
+        os.makedirs(LOG_DIR, exist_ok=True)
+        self.f = open(LOG_FILE, "a", encoding="utf-8")
+        self.size, self.opened = self.f.tell(), time.time()
+        if self.size:   # age of an existing file = its first record (one line, not the file)
+            try:
+                with open(LOG_FILE, encoding="utf-8") as f: self.opened = float(json.loads(f.readline())["ts"])
+            except Exception: pass
+
+    def _rotate(self):
+        self.f.close(); self.f = None
+        for i in range(LOG_BACKUPS - 1, 0, -1):
+            if os.path.exists(f"{LOG_FILE}.{i}"): os.replace(f"{LOG_FILE}.{i}", f"{LOG_FILE}.{i + 1}")
+        if LOG_BACKUPS > 0: os.replace(LOG_FILE, f"{LOG_FILE}.1")
+        else: os.remove(LOG_FILE)
+        self._open()
+
+    def flush(self):
+        with _mu:
+            if not _pending: return
+            batch, _pending[:] = list(_pending), []
+        with self.io:
+            try:
+                if self.f is None: self._open()
+                data = "".join(json.dumps(r, ensure_ascii=False, default=str) + "\n" for r in batch)
+                self.f.write(data); self.f.flush()
+                self.size += len(data.encode("utf-8"))
+                if self.size > LOG_MAX_BYTES or time.time() - self.opened > LOG_ROTATE_HOURS * 3600:
+                    self._rotate()
+            except Exception as e:
+                print(f"log write failed ({e}):", *(r["msg"] for r in batch), sep="\n  ", file=sys.stderr)
+
+    def _loop(self):
+        while True:
+            _wake.wait(LOG_FLUSH_SEC); _wake.clear()
+            self.flush()
+
+def _ensure_writer():
+    global _writer
+    if _writer is not None: return
+    with _mu:
+        if _writer is None: _writer = _Writer()
+
+def _after_fork():
+    """In a forked worker: fresh lock and flusher; the parent still writes what it had pending."""
+    global _mu, _wake, _writer
+    _mu, _wake, _writer = threading.Lock(), threading.Event(), None
+    _pending.clear()
+
+atexit.register(flush)
+if hasattr(os, "register_at_fork"): os.register_at_fork(after_in_child=_after_fork)
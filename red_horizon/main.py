@@ -1,14 +1,40 @@
 import os
 from flask import Flask, request, jsonify
-from .persistence import log, clean_seen_links
+from .persistence import log
+from .jobs import JobRunner
+from . import snapshot, metrics
 from .tasks import (
     run_digest, run_breaking, run_super_priority, run_daily_image,
-    run_book_spotlight, run_welcome, run_starbase_fact, SEEN_FILE
+    run_book_spotlight, run_welcome, run_starbase_fact, STATE, BOT_TOKEN
 )
+from .config import OUTBOX_ENABLED, WATCH_ENABLED, WEBSUB_ENABLED
 
 CRON_SECRET = os.getenv("CRON_SECRET")
 
 app = Flask(__name__)
+JOBS = JobRunner()
+
+# resume delivering whatever an earlier process left in the outbound queue
+if OUTBOX_ENABLED and BOT_TOKEN:
+    STATE.outbox.start(BOT_TOKEN)
+
+def _priority_job():
+    """Run priority through the job runner (coalesced with /run) and wait for its verdict."""
+    info, _ = JOBS.submit("priority", lambda: run_super_priority())
+    return (JOBS.wait(info["id"], timeout=300) or {}).get("result")
+
+# priority watcher: polls the priority feeds every few seconds instead of waiting for cron
+WATCHER = None
+if WATCH_ENABLED:
+    from .watcher import Watcher
+    WATCHER = Watcher(trigger=_priority_job)
+    WATCHER.start()
+
+# digest and breaking pick from the same fetch_news pool; never run them side by side
+LOCK_KEYS = {"digest": "news", "breaking": "news"}
+
+# task=all: every feed-driven task, run back to back against one feed snapshot
+BATCH_ALL = ("priority", "breaking", "digest", "image")
 
 @app.get("/")
 def index():
@@ -34,18 +60,148 @@ def run_task():
         "welcome": lambda: run_welcome(),
         "fact": lambda: run_starbase_fact(),
     }
-    fn = mapping.get(task)
-    if not fn:
+    # task=digest,breaking (or task=all) runs several tasks as one job on one snapshot
+    names = list(BATCH_ALL) if task == "all" else [t.strip() for t in task.split(",") if t.strip()]
+    if not names or any(n not in mapping for n in names):
         return (f"Unknown task: {task}", 400)
-    log(f"/run: {task} start (force={force})")
-    try:
-        clean_seen_links(SEEN_FILE)
-        res = fn()
+    task = ",".join(dict.fromkeys(names))
+    names = task.split(",")
+
+    def job():
+        from .httpclient import log_stats
+        STATE.seen.expire()
+        with snapshot.cycle():
+            res = {n: mapping[n]() for n in names}
+        res = res[names[0]] if len(names) == 1 else res
         log(f"/run: {task} -> {res}")
-        return jsonify({"ok": True, "task": task, "result": res})
-    except Exception as e:
-        log(f"/run: {task} ERROR {e}")
-        return jsonify({"ok": False, "task": task, "error": str(e)}), 500
+        log_stats(f"/run: {task} http")
+        return res
+
+    info, coalesced = JOBS.submit(task, job, [LOCK_KEYS.get(n, n) for n in names])
+    log(f"/run: {task} {'coalesced into' if coalesced else 'queued as'} job {info['id']} (force={force})")
+    # ?wait=<seconds> keeps the old synchronous behaviour for callers that want the result
+    try: wait = float(request.args.get("wait") or 0)
+    except ValueError: wait = 0
+    if wait > 0:
+        info = JOBS.wait(info["id"], timeout=wait)
+        if info["status"] in ("done", "error"):
+            body = {"ok": info["status"] == "done", "task": task, "job": info, "summary": info.get("summary")}
+            if info["status"] == "done": body["result"] = info["result"]
+            else: body["error"] = info["error"]
+            return jsonify(body), (200 if body["ok"] else 500)
+    return jsonify({"ok": True, "task": task, "job": info, "coalesced": coalesced,
+                    "status_url": f"/jobs/{info['id']}"}), 202
+
+@app.get("/jobs/<job_id>")
+def job_status(job_id):
+    if not _auth():
+        return ("Unauthorized", 401)
+    info = JOBS.get(job_id)
+    if not info:
+        return jsonify({"ok": False, "error": "unknown job"}), 404
+    return jsonify(info)
+
+@app.get("/logs/tail")
+def logs_tail():
+    """Recent log records from memory: ?n=200&level=error&since=<seq>&q=<text>."""
+    if not _auth():
+        return ("Unauthorized", 401)
+    from .logs import tail
+    try: n, since = int(request.args.get("n") or 200), int(request.args.get("since") or 0)
+    except ValueError: return ("n and since must be integers", 400)
+    recs = tail(n, level=request.args.get("level"), since=since, q=request.args.get("q"))
+    return jsonify({"records": recs, "last": recs[-1]["seq"] if recs else since})
+
+@app.get("/sources")
+def sources_status():
+    """Feed/keyword lists in use (sources.py); ?reload=1 re-reads SOURCES_FILE now."""
+    if not _auth():
+        return ("Unauthorized", 401)
+    from . import sources
+    if (request.args.get("reload") or "0").lower() in ("1","true","yes","on"): sources.reload(force=True)
+    st = sources.status()
+    return jsonify({"ok": st["last_error"] is None, **st})
+
+# task leases for other replicas (LEASE_BACKEND=http, LEASE_URL=<this app>), kept in this app's backend
+@app.route("/lease/<name>", methods=["GET", "POST", "DELETE"])
+def lease_route(name):
+    if not _auth():
+        return ("Unauthorized", 401)
+    from . import lease
+    b = lease.local_backend()
+    if request.method == "GET":
+        return jsonify({"ok": True, "lease": b.get(name)})
+    body = request.get_json(silent=True) or {}
+    who = (body.get("holder") or "").strip()
+    if not who: return jsonify({"ok": False, "error": "holder required"}), 400
+    if request.method == "DELETE":
+        return jsonify({"ok": b.release(name, who)})
+    try: ttl = min(max(float(body.get("ttl") or lease.LEASE_TTL_SEC), 1.0), 3600.0)
+    except (TypeError, ValueError): return jsonify({"ok": False, "error": "bad ttl"}), 400
+    ok, rec = b.acquire(name, who, ttl)
+    return jsonify({"ok": ok, "lease": rec}), (200 if ok else 409)
+
+@app.post("/lease/<name>/note")
+def lease_note(name):
+    if not _auth():
+        return ("Unauthorized", 401)
+    from . import lease
+    body = request.get_json(silent=True) or {}
+    b = lease.local_backend()
+    return jsonify({"ok": b.note(name, body.get("holder") or "", str(body.get("note") or "")[:300])})
+
+def websub_verify():
+    """Hub (un)subscribe confirmation: echo hub.challenge for our own topics only."""
+    from .websub import feed_for
+    topic, challenge = request.args.get("hub.topic", ""), request.args.get("hub.challenge", "")
+    if request.args.get("hub.mode") not in ("subscribe", "unsubscribe") or not challenge or not feed_for(topic):
+        log(f"websub: refused verification for {topic!r}"); return ("Not found", 404)
+    log(f"websub: {request.args['hub.mode']} {topic} verified (lease {request.args.get('hub.lease_seconds')})")
+    return challenge, 200, {"Content-Type": "text/plain"}
+
+def websub_push():
+    from .websub import feed_for, topic_from, verify
+    body = request.get_data()
+    if not verify(body, request.headers.get("X-Hub-Signature", "")):
+        # per WebSub, a bad signature is acknowledged but ignored
+        metrics.inc("websub_pushes_total", result="bad_signature")
+        log("websub: push with a bad signature ignored"); return ("", 202)
+    url = feed_for(topic_from(request.headers, body))
+    if not url:
+        metrics.inc("websub_pushes_total", result="unknown_topic"); return ("", 202)
+    from .feeds import ingest_feed
+    new = ingest_feed(url, body)
+    metrics.inc("websub_pushes_total", result="new" if new else "known")
+    log(f"websub: push for {url}: {new} new")
+    if new:
+        if WATCHER is not None: WATCHER.notify(new)
+        else: JOBS.submit("priority", lambda: run_super_priority())
+    return ("", 204)
+
+# only with a callback URL *and* a signing secret: anything else would accept forged pushes
+if WEBSUB_ENABLED:
+    app.add_url_rule("/websub", view_func=websub_verify, methods=["GET"])
+    app.add_url_rule("/websub", view_func=websub_push, methods=["POST"])
+
+@app.get("/metrics")
+def metrics_text():
+    if not _auth():
+        return ("Unauthorized", 401)
+    import sys
+    gauges = {"snapshot_feeds": [({"kind": k}, v) for k, v in sorted(snapshot.STATS.items())]}
+    if "red_horizon.httpclient" in sys.modules:   # nothing to report before the first request
+        from .httpclient import stats
+        for host, st in sorted(stats().items()):
+            for k, v in st.items():
+                gauges.setdefault(f"http_{k}", []).append(({"host": host}, v))
+    if "outbox" in STATE.loaded():
+        gauges["outbox_pending"] = [({}, STATE.outbox.pending())]
+    if "red_horizon.feedhealth" in sys.modules:
+        from .feedhealth import report
+        for r in report():
+            for k in ("error_streak", "mean_latency", "interval", "next_due", "last_success"):
+                if r[k] is not None: gauges.setdefault(f"feed_{k}", []).append(({"feed": r["url"]}, round(r[k], 3)))
+    return metrics.render(gauges), 200, {"Content-Type": "text/plain; version=0.0.4"}
 
 if __name__ == "__main__":
     port = int(os.getenv("PORT", "8080"))
@@ -0,0 +1,71 @@
+# red_horizon/matcher.py — one-pass word-boundary keyword matching over several lists
+
+import re
+from collections import Counter
+from types import MappingProxyType
+
+def _is_word(c: str):
+    return c.isalnum() or c == "_"
+
+def _trie_pattern(words):
+    """Alternation of words factored into a prefix trie ("s(?:pacex|tar(?:base|ship))"),
+    so the engine branches on each character instead of trying every word in
+    turn. A word ending at a node is the node's last alternative, which keeps
+    "longest keyword wins" as in a longest-first flat alternation."""
+    trie = {}
+    for w in words:
+        node = trie
+        for ch in w: node = node.setdefault(ch, {})
+        node[""] = {}
+    def build(node):
+        alts = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if "" in node: alts.append("")
+        return alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+    return build(trie) if words else r"(?!)"
+
+class KeywordMatcher:
+    """Counts distinct \\b-bounded keyword hits per named list in a single scan.
+
+    Equivalent to running re.search(rf"\\b{re.escape(w)}\\b", text.lower()) for
+    every word of every list, but compiled once. All keywords live in one
+    trie-shaped alternation (longest wins) inside a lookahead, so every start
+    position is tried; shorter keywords that are prefixes of the matched one (e.g. "mars"
+    inside "mars sample return") are credited from a precomputed table.
+    """
+
+    def __init__(self, groups: dict):
+        self.names = tuple(groups)
+        mult = {}
+        for name, words in groups.items():
+            for w in words:
+                w = (w or "").lower()
+                if w: mult.setdefault(w, Counter())[name] += 1
+        kws = sorted(mult, key=len, reverse=True)
+        self._mult = mult
+        # keyword -> itself plus every shorter keyword that also matches at the same spot
+        self._implied = {
+            k: (k, *[p for p in kws if len(p) < len(k) and k.startswith(p)
+                     and _is_word(p[-1]) != _is_word(k[len(p)])])
+            for k in kws
+        }
+        self._re = re.compile(rf"\b(?=({_trie_pattern(kws)})\b)")
+
+    def matches(self, text: str):
+        """Set of distinct keywords found in text."""
+        found = set()
+        if not text: return found
+        for m in self._re.finditer(text.lower()):
+            found.update(self._implied[m.group(1)])
+        return found
+
+    def multiplicities(self):
+        """{keyword: {list name: times it appears in that list}} (read-only view)."""
+        return MappingProxyType(self._mult)
+
+    def hits(self, text: str):
+        """{list name: number of its keywords present in text}."""
+        counts = dict.fromkeys(self.names, 0)
+        for k in self.matches(text):
+            for name, n in self._mult[k].items():
+                counts[name] += n
+        return counts
@@ -0,0 +1,115 @@
+# red_horizon/metrics.py — timing spans + counters, Prometheus text and per-run summaries
+#
+# Everything is recorded into the process-wide registry (served by /metrics)
+# and, when a run is active on the current thread, into that run's summary
+# as well (returned from /run). Worker threads started on behalf of a run
+# join it with `attach(current())`.
+
+import threading, time
+from contextlib import contextmanager
+
+PREFIX = "redhorizon_"
+
+_mu = threading.Lock()
+_counters = {}     # (name, labels) -> value
+_timings = {}      # (name, labels) -> [count, sum, max]
+_local = threading.local()
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+class Run:
+    """Per-run aggregation of the same spans/counters, keyed by name only."""
+
+    def __init__(self, task: str):
+        self.task, self.started = task, time.time()
+        self.stages, self.counters = {}, {}
+        self._mu = threading.Lock()
+
+    def _observe(self, name, secs):
+        with self._mu:
+            st = self.stages.setdefault(name, {"count": 0, "seconds": 0.0, "max": 0.0})
+            st["count"] += 1; st["seconds"] += secs; st["max"] = max(st["max"], secs)
+
+    def _inc(self, name, labels, value):
+        label = ",".join(f"{k}={v}" for k, v in sorted(labels.items()))
+        with self._mu:
+            k = f"{name}[{label}]" if label else name
+            self.counters[k] = self.counters.get(k, 0) + value
+
+    def summary(self):
+        with self._mu:
+            return {
+                "task": self.task, "seconds": round(time.time() - self.started, 3),
+                "stages": {k: {"count": v["count"], "seconds": round(v["seconds"], 4), "max": round(v["max"], 4)}
+                           for k, v in sorted(self.stages.items())},
+                "counters": dict(sorted(self.counters.items())),
+            }
+
+def current():
+    return getattr(_local, "run", None)
+
+@contextmanager
+def attach(run):
+    """Record this thread's metrics into `run` too (for pool workers)."""
+    prev = current(); _local.run = run
+    try: yield run
+    finally: _local.run = prev
+
+@contextmanager
+def run(task: str):
+    with attach(Run(task)) as r:
+        yield r
+
+def observe(name: str, secs: float, **labels):
+    k = _key(name, labels)
+    with _mu:
+        t = _timings.setdefault(k, [0, 0.0, 0.0])
+        t[0] += 1; t[1] += secs; t[2] = max(t[2], secs)
+    r = current()
+    if r is not None: r._observe(name, secs)
+
+def inc(name: str, value=1, **labels):
+    with _mu:
+        k = _key(name, labels)
+        _counters[k] = _counters.get(k, 0) + value
+    r = current()
+    if r is not None: r._inc(name, labels, value)
+
+@contextmanager
+def span(name: str, **labels):
+    t = time.perf_counter()
+    try: yield
+    finally: observe(name, time.perf_counter() - t, **labels)
+
+def count_filter(name: str, n_in: int, n_out: int):
+    """Entries entering / surviving one filter stage."""
+    inc("filter_entries_total", n_in, filter=name, side="in")
+    inc("filter_entries_total", n_out, filter=name, side="out")
+
+def _labels(labels, extra=()):
+    items = [*labels, *extra]
+    if not items: return ""
+    esc = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in items) + "}"
+
+def render(gauges=None):
+    """Prometheus text exposition of the registry (+ optional {name: [(labels, value)]} gauges)."""
+    with _mu:
+        counters, timings = dict(_counters), {k: list(v) for k, v in _timings.items()}
+    out = []
+    for name in sorted({n for n, _ in counters}):
+        out.append(f"# TYPE {PREFIX}{name} counter")
+        out += [f"{PREFIX}{name}{_labels(l)} {v}" for (n, l), v in sorted(counters.items()) if n == name]
+    for name in sorted({n for n, _ in timings}):
+        base = f"{PREFIX}{name}_seconds"
+        out.append(f"# TYPE {base} summary")
+        for (n, l), (cnt, total, mx) in sorted(timings.items()):
+            if n != name: continue
+            out.append(f"{base}_count{_labels(l)} {cnt}")
+            out.append(f"{base}_sum{_labels(l)} {total:.6f}")
+            out.append(f"{base}_max{_labels(l)} {mx:.6f}")
+    for name, series in sorted((gauges or {}).items()):
+        out.append(f"# TYPE {PREFIX}{name} gauge")
+        out += [f"{PREFIX}{name}{_labels(sorted(l.items()))} {v}" for l, v in series]
+    return "\n".join(out) + "\n"
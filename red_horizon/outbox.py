@@ -0,0 +1,300 @@
+# red_horizon/outbox.py — persisted Telegram outbound queue with rate limiting
+#
+# Tasks enqueue messages and return; a sender thread delivers them in
+# order per chat under a token bucket per chat and one for the whole bot,
+# so a burst of tasks (or a 429 with retry_after) never stalls a caller.
+# Rows live in state.db: queued messages survive a restart, and the
+# idempotency key (unique) makes a retried /run enqueue nothing new.
+# Heads of different chats go out in parallel (one in flight per chat, so
+# each chat's order holds), which keeps a fan-out to N chats from queueing
+# every mirror behind the others. Delivery is written back: a row's links
+# are marked seen with the send time and its titles go to the posted-title
+# history, so nothing is recorded for a message that never went out. A
+# message that finally fails stays as 'failed' for inspection, and
+# enqueueing its key again re-queues it, so a later run can pick the link
+# again. The sender is a daemon thread, so starting it also registers an
+# exit hook that drains what is still queued (bounded by OUTBOX_DRAIN_SEC):
+# a one-shot caller that posts and returns does not lose its message.
+
+import atexit, hashlib, json, threading, time
+from concurrent.futures import ThreadPoolExecutor
+
+from . import db, metrics
+from .config import (
+    TG_CHAT_PER_MIN, TG_GLOBAL_PER_SEC, OUTBOX_MAX_ATTEMPTS, OUTBOX_KEEP_DAYS, OUTBOX_SENDERS,
+    OUTBOX_DRAIN_SEC,
+)
+from .persistence import log
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id         INTEGER PRIMARY KEY AUTOINCREMENT,
+    key        TEXT NOT NULL UNIQUE,
+    chat       TEXT NOT NULL,
+    method     TEXT NOT NULL,
+    payload    TEXT NOT NULL,
+    links      TEXT NOT NULL DEFAULT '[]',
+    titles     TEXT NOT NULL DEFAULT '[]',
+    status     TEXT NOT NULL DEFAULT 'queued',
+    attempts   INTEGER NOT NULL DEFAULT 0,
+    next_try   REAL NOT NULL DEFAULT 0,
+    created    REAL NOT NULL,
+    sent_at    REAL,
+    message_id INTEGER,
+    error      TEXT
+);
+CREATE INDEX IF NOT EXISTS outbox_status ON outbox(status, chat, id);
+"""
+db.register_schema(SCHEMA)
+
+_upgraded = False
+_upgrade_lock = threading.Lock()
+
+def _conn():
+    """db.conn(), adding the titles column to a table created before it existed."""
+    global _upgraded
+    c = db.conn()
+    if not _upgraded:
+        with _upgrade_lock:
+            if not _upgraded:
+                if "titles" not in {r["name"] for r in c.execute("PRAGMA table_info(outbox)")}:
+                    with c: c.execute("ALTER TABLE outbox ADD COLUMN titles TEXT NOT NULL DEFAULT '[]'")
+                _upgraded = True
+    return c
+
+STALE_SENDING_SEC = 300   # a 'sending' row this old belongs to a sender that died
+IDLE_POLL_SEC = 30        # re-check for rows queued by other processes
+
+class TokenBucket:
+    """`rate` tokens per second, up to `burst` saved; pause() empties it for a while."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate, self.burst = rate, burst
+        self.tokens, self.stamp = burst, time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    def wait(self):
+        """Seconds until one token is available (0 = now)."""
+        now = time.monotonic(); self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self._refill(time.monotonic()); self.tokens -= 1
+
+    def pause(self, secs: float):
+        self._refill(time.monotonic()); self.tokens = min(self.tokens, 1 - secs * self.rate)
+
+def message_key(chat_id, method, payload):
+    """Default idempotency key: same message to the same chat on the same UTC day."""
+    raw = json.dumps([str(chat_id), method, payload, time.strftime("%Y-%m-%d", time.gmtime())], sort_keys=True)
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+class Outbox:
+    def __init__(self, seen=None, remember=None):
+        self.seen = seen
+        self.remember = remember   # remember(*titles) once a post carrying titles is delivered
+        self.token = None
+        self._global = TokenBucket(TG_GLOBAL_PER_SEC, TG_GLOBAL_PER_SEC)
+        self._chats = {}
+        self._mu = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._pool = None
+        self._at_exit = False
+
+    # ---------- producer side ----------
+    def enqueue(self, chat_id, method: str, payload: dict, key=None, links=(), titles=()):
+        """Queue one message; returns (row id, False) if `key` is already queued
+        or sent. A `key` whose message finally failed is queued afresh."""
+        key = key or message_key(chat_id, method, payload)
+        c = _conn()
+        with c:
+            c.execute("DELETE FROM outbox WHERE key = ? AND status = 'failed'", (key,))
+            cur = c.execute(
+                "INSERT OR IGNORE INTO outbox (key, chat, method, payload, links, titles, created) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, str(chat_id), method, json.dumps(payload), json.dumps(list(links)),
+                 json.dumps(list(titles)), time.time()))
+        if cur.rowcount:
+            metrics.inc("outbox_enqueued_total", method=method)
+            self._wake.set()
+            return cur.lastrowid, True
+        log(f"outbox: duplicate {key[:12]} ignored")
+        metrics.inc("outbox_duplicates_total", method=method)
+        return c.execute("SELECT id FROM outbox WHERE key = ?", (key,)).fetchone()[0], False
+
+    def start(self, bot_token):
+        """Run the background sender (idempotent)."""
+        with self._mu:
+            self.token = bot_token
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="outbox", daemon=True)
+                self._thread.start()
+            if not self._at_exit:
+                atexit.register(self._drain_at_exit)
+                self._at_exit = True
+
+    def _drain_at_exit(self):
+        try:
+            if self.pending(): self.drain(OUTBOX_DRAIN_SEC)
+        except Exception as e:
+            log(f"outbox: exit drain error: {e}")
+
+    def drain(self, timeout=60.0):
+        """Deliver what is queued now in the calling thread (CLI runs exit right
+        after); returns how many rows are still pending. Serial: at exit the
+        sender pool no longer takes work."""
+        end = time.monotonic() + timeout
+        while True:
+            wait = self.pump(serial=True)
+            left = self.pending()
+            if not left: return 0
+            if wait is None: wait = 0.2   # head rows are in flight on another sender
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                log(f"outbox: drain timed out with {left} pending"); return left
+            time.sleep(min(wait, remaining))
+
+    def pending(self):
+        return db.conn().execute("SELECT COUNT(*) FROM outbox WHERE status IN ('queued', 'sending')").fetchone()[0]
+
+    def status(self, row_id):
+        r = db.conn().execute("SELECT id, key, status, attempts, sent_at, message_id, error FROM outbox WHERE id = ?",
+                              (row_id,)).fetchone()
+        return dict(r) if r else None
+
+    # ---------- sender side ----------
+    def _loop(self):
+        while True:
+            try:
+                wait = self.pump()
+            except Exception as e:
+                log(f"outbox sender error: {e}"); wait = 5
+            self._wake.wait(IDLE_POLL_SEC if wait is None else wait)
+            self._wake.clear()
+
+    def _bucket(self, chat):
+        b = self._chats.get(chat)
+        if b is None:
+            b = self._chats[chat] = TokenBucket(TG_CHAT_PER_MIN / 60.0, 3)
+        return b
+
+    def pump(self, serial=False):
+        """Send every head-of-chat message the limits allow right now (one
+        after another in this thread if serial); returns seconds until the
+        next one could go, or None when nothing is queued."""
+        if not self.token: return None
+        c = _conn()
+        now = time.time()
+        with c:
+            c.execute("UPDATE outbox SET status = 'queued' WHERE status = 'sending' AND next_try < ?",
+                      (now - STALE_SENDING_SEC,))
+        heads = c.execute(
+            "SELECT * FROM outbox WHERE id IN (SELECT MIN(id) FROM outbox "
+            "WHERE status IN ('queued', 'sending') GROUP BY chat) AND status = 'queued' ORDER BY id").fetchall()
+        waits, ready = [], []
+        for row in heads:
+            with self._mu:
+                chat = self._bucket(row["chat"])
+                wait = max(row["next_try"] - time.time(), chat.wait(), self._global.wait())
+                if wait > 0:
+                    waits.append(wait); continue
+                chat.take(); self._global.take()
+            with c:
+                claimed = c.execute("UPDATE outbox SET status = 'sending', next_try = ? WHERE id = ? AND status = 'queued'",
+                                    (time.time(), row["id"])).rowcount
+            if claimed: ready.append(row)
+            waits.append(0.0)   # the chat may have more behind this one
+        if len(ready) > 1 and not serial:
+            changed = any(f.result() for f in self._submit(c, ready))
+        else:
+            changed = any([self._deliver(row) for row in ready])
+        if changed: self.seen.export()   # once per batch, not once per message
+        self._prune(c)
+        return min(waits) if waits else None
+
+    def _submit(self, c, rows):
+        """Futures for the rows handed to the sender pool; rows it refuses
+        (interpreter shutting down) go back to 'queued' for the exit drain."""
+        futures = []
+        for i, row in enumerate(rows):
+            try:
+                futures.append(self._senders().submit(self._deliver, row))
+            except RuntimeError as e:
+                left = [r["id"] for r in rows[i:]]
+                with c:
+                    c.execute(f"UPDATE outbox SET status = 'queued' WHERE id IN ({','.join('?' * len(left))})", left)
+                log(f"outbox: {len(left)} message(s) requeued: {e}")
+                break
+        return futures
+
+    def _senders(self):
+        with self._mu:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=OUTBOX_SENDERS, thread_name_prefix="outbox-send")
+            return self._pool
+
+    def _deliver(self, row):
+        from .telegram import tg_request
+        c = db.conn()
+        attempts = row["attempts"] + 1
+        try:
+            r = tg_request(self.token, row["method"], json.loads(row["payload"]), retries=0)
+            code, body = r.status_code, _json(r)
+        except Exception as e:
+            code, body = None, {"description": str(e)}
+        now = time.time()
+        if code is not None and code < 300:
+            msg_id = (body.get("result") or {}).get("message_id") if isinstance(body.get("result"), dict) else None
+            with c:
+                c.execute("UPDATE outbox SET status = 'sent', attempts = ?, sent_at = ?, message_id = ?, error = NULL "
+                          "WHERE id = ?", (attempts, now, msg_id, row["id"]))
+            metrics.inc("outbox_sent_total", method=row["method"])
+            metrics.observe("outbox_queue_wait", now - row["created"], chat=row["chat"])
+            return self._write_back(row, ts=now)
+        err = f"{code}: {body.get('description', '')}"[:300]
+        retry_after = ((body.get("parameters") or {}).get("retry_after") if code == 429 else None)
+        retryable = code is None or code == 429 or code >= 500
+        if retryable and attempts < OUTBOX_MAX_ATTEMPTS:
+            delay = float(retry_after) if retry_after else min(300.0, 2.0 ** attempts)
+            if code == 429:
+                with self._mu:
+                    self._bucket(row["chat"]).pause(delay)
+            with c:
+                c.execute("UPDATE outbox SET status = 'queued', attempts = ?, next_try = ?, error = ? WHERE id = ?",
+                          (attempts, now + delay, err, row["id"]))
+            metrics.inc("outbox_retries_total", status=code)
+            log(f"outbox: {row['method']} #{row['id']} {err}; retry in {delay:.0f}s")
+            self._wake.set()
+            return False
+        with c:
+            c.execute("UPDATE outbox SET status = 'failed', attempts = ?, error = ? WHERE id = ?",
+                      (attempts, err, row["id"]))
+        metrics.inc("outbox_failed_total", method=row["method"])
+        log(f"outbox: {row['method']} #{row['id']} failed after {attempts} attempt(s): {err}")
+        return False
+
+    def _write_back(self, row, ts):
+        """Record a delivered row's links as seen and its titles as posted; True
+        if the seen snapshot needs exporting."""
+        titles = json.loads(row["titles"] or "[]")
+        if titles and self.remember is not None: self.remember(*titles)
+        links = json.loads(row["links"] or "[]")
+        if not links or self.seen is None: return False
+        self.seen.mark(*links, ts=ts)
+        return True
+
+    def _prune(self, c):
+        with c:
+            c.execute("DELETE FROM outbox WHERE status IN ('sent', 'failed') AND created < ?",
+                      (time.time() - OUTBOX_KEEP_DAYS * 86400,))
+
+def _json(r):
+    try:
+        d = r.json()
+        return d if isinstance(d, dict) else {}
+    except ValueError:
+        return {"description": (r.text or "")[:200]}
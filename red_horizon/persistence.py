@@ -1,31 +1,6 @@
-import os, json, time
-from .config import SEEN_TTL_DAYS
+import os, json, tempfile
 
-LOG_DIR = ".logs"
-LOG_FILE = os.path.join(LOG_DIR, "log.txt")
-
-def _ensure_dirs():
-    os.makedirs(LOG_DIR, exist_ok=True)
-
-def _rotate_if_large(path, max_bytes=2_000_000):
-    try:
-        if os.path.exists(path) and os.path.getsize(path) > max_bytes:
-            with open(path, "rb") as f:
-                tail = f.read()[-200_000:]
-            with open(path, "wb") as f:
-                f.write(tail)
-    except Exception:
-        pass
-
-def log(msg: str):
-    _ensure_dirs()
-    _rotate_if_large(LOG_FILE)
-    try:
-        with open(LOG_FILE, "a", encoding="utf-8") as f:
-            ts = time.strftime("%Y-%m-%d %H:%M:%S")
-            f.write(f"[{ts}] {msg}\n")
-    except Exception:
-        print("LOG_FAIL:", msg)
+from .logs import log   # noqa: F401  (re-exported: every module logs through persistence)
 
 def load_json(path: str, default):
     try:
@@ -36,23 +11,20 @@ def load_json(path: str, default):
         log(f"load_json error {path}: {e}")
     return default
 
-def save_json(path: str, data):
+def save_json(path: str, data, compact=False):
+    """Write via a temp file + rename so a crash never leaves a truncated file.
+    The temp name is unique, so concurrent writers never share one."""
+    tmp = None
     try:
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(data, f)
+        fd, tmp = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp",
+                                   dir=os.path.dirname(path) or ".")
+        with open(fd, "w", encoding="utf-8") as f:
+            if compact: json.dump(data, f, separators=(",", ":"), sort_keys=True)
+            else: json.dump(data, f)
+            f.flush(); os.fsync(f.fileno())
+        os.replace(tmp, path)
     except Exception as e:
         log(f"save_json error {path}: {e}")
-
-def clean_seen_links(path: str):
-    """Prune entries older than TTL to keep file tiny."""
-    try:
-        now = time.time()
-        ttl = SEEN_TTL_DAYS * 86400
-        d = load_json(path, {})
-        if not isinstance(d, dict): d = {}
-        pruned = {k:v for k,v in d.items() if isinstance(v,(int,float)) and (now - v) <= ttl}
-        if len(pruned) != len(d):
-            save_json(path, pruned)
-            log(f"clean_seen_links: pruned {len(d)-len(pruned)}")
-    except Exception as e:
-        log(f"clean_seen_links error: {e}")
+        if tmp and os.path.exists(tmp):
+            try: os.remove(tmp)
+            except OSError: pass
@@ -0,0 +1,272 @@
+# red_horizon/replay.py — offline replay of captured feed snapshots, for tuning thresholds
+#
+# `capture` stores one snapshot of every configured news/priority feed
+# (run it from cron next to the bot). Bodies are kept once per content
+# hash, so weeks of 5-minute snapshots cost little more than the distinct
+# documents:
+#
+#   <archive>/bodies/<sha1>.xml
+#   <archive>/snapshots/<YYYYmmddTHHMMSSZ>.json     {feed url: sha1 or null}
+#
+# `run` walks the snapshots in simulated time through the real selection
+# (feeds.select_news / select_priority over the entry store) and the real
+# pick (tasks.pick_fresh, the priority cooldown, outbox key dedupe), and
+# reports what would have been posted and when. The timeline is cut into
+# --window-hours windows and every (window, parameter set) pair is one job
+# on a process pool; each worker has its own scratch state.db. A window
+# starts --warmup-hours early to rebuild the entry store and seen/posted
+# history, and only posts inside the window are reported, so results near
+# window edges are approximate when the warm-up is shorter than the seen TTL.
+#
+#   python -m red_horizon.replay capture ARCHIVE
+#   python -m red_horizon.replay run ARCHIVE --set BREAKING_MIN_SCORE=1.5,2.5 \
+#       --set DEDUPE_THRESHOLD=0.85,0.9 --weights alt_weights.json --out posts.jsonl
+
+import argparse, hashlib, itertools, json, multiprocessing, os, statistics, sys, tempfile, time
+from datetime import datetime, timezone
+
+from .config import (
+    BREAKING_MIN_SCORE, BREAKING_MAX_AGE_MIN, SUPER_COOLDOWN_MIN, DEDUPE_THRESHOLD, SEEN_TTL_DAYS,
+    FEED_TIMEOUT_SEC,
+)
+from .persistence import log, save_json
+
+# knobs --set can vary, with their live values as the baseline
+TUNABLE = {
+    "BREAKING_MIN_SCORE": (float, BREAKING_MIN_SCORE),
+    "BREAKING_MAX_AGE_MIN": (float, BREAKING_MAX_AGE_MIN),
+    "SUPER_COOLDOWN_MIN": (float, SUPER_COOLDOWN_MIN),
+    "DEDUPE_THRESHOLD": (float, DEDUPE_THRESHOLD),
+}
+STAMP = "%Y%m%dT%H%M%SZ"
+
+# ---------- capture ----------
+
+def capture(archive, urls=None):
+    """Fetch every url (default: the configured news + priority feeds) and store
+    one snapshot; returns (snapshot path, feeds stored, bodies new to the archive)."""
+    from . import httpclient, sources
+    from .feeds import UA
+    from .fetcher import sweep
+    if urls is None:
+        src = sources.current()
+        urls = [*src.feeds, *src.priority_feeds]
+    urls = list(dict.fromkeys(urls))
+    os.makedirs(os.path.join(archive, "bodies"), exist_ok=True)
+    os.makedirs(os.path.join(archive, "snapshots"), exist_ok=True)
+    at = time.time()
+
+    def fetch(url):
+        r = httpclient.get(url, headers=UA, timeout=FEED_TIMEOUT_SEC)
+        r.raise_for_status()
+        return r.content
+
+    def safe(url):
+        try: return fetch(url)
+        except Exception as e:
+            log(f"replay capture {url}: {e}"); return None
+
+    got, index, new = sweep(urls, safe, label="capture"), {}, 0
+    for url in urls:
+        body = got.get(url)
+        if body is None: index[url] = None; continue
+        h = hashlib.sha1(body).hexdigest()
+        path = os.path.join(archive, "bodies", f"{h}.xml")
+        if not os.path.exists(path):
+            with open(f"{path}.tmp", "wb") as f: f.write(body)
+            os.replace(f"{path}.tmp", path); new += 1
+        index[url] = h
+    out = os.path.join(archive, "snapshots", datetime.fromtimestamp(at, timezone.utc).strftime(STAMP) + ".json")
+    save_json(out, index)
+    return out, sum(h is not None for h in index.values()), new
+
+def snapshots(archive):
+    """[(epoch, {url: sha1 or None})] in time order."""
+    d = os.path.join(archive, "snapshots")
+    out = []
+    for name in sorted(os.listdir(d)):
+        if not name.endswith(".json"): continue
+        try: ts = datetime.strptime(name[:-5], STAMP).replace(tzinfo=timezone.utc).timestamp()
+        except ValueError: continue
+        with open(os.path.join(d, name), encoding="utf-8") as f: out.append((ts, json.load(f)))
+    return out
+
+# ---------- replay ----------
+
+def _iso(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%d %H:%M")
+
+_parsed = {}     # body hash -> parsed feed, shared by the jobs one worker runs
+
+def _simulate(job):
+    """One window under one parameter set, in a worker; returns its posts."""
+    archive, snaps, report_from, report_to, params, label, every = job
+    import feedparser
+    from . import db, feeds, sources
+    from .dedupe import TitleIndex
+    from .tasks import pick_fresh, priority_prefix
+
+    src = sources.use(**({"provider_weights": params["weights"]} if params.get("weights") else {}))
+    c = db.conn()
+    with c: c.execute("DELETE FROM entries")
+    news_urls, prio_urls = set(src.feeds), list(src.priority_feeds)
+    seen, keys, posts = {}, set(), []
+    posted = TitleIndex(params["DEDUPE_THRESHOLD"])
+    last_prio, next_due = 0.0, {"breaking": 0.0, "priority": 0.0}
+    ingested, parsed = {}, _parsed      # (limit, url) -> body hash already stored
+
+    def feeds_for(urls, snap, limit, now):
+        """Ingest bodies that changed since this task last saw them (an unchanged
+        one is a 304 in production); returns the feeds present in this snapshot."""
+        todo = {}
+        for u in urls:
+            h = snap.get(u)
+            if not h or ingested.get((limit, u)) == h: continue
+            if h not in parsed:
+                with open(os.path.join(archive, "bodies", f"{h}.xml"), "rb") as f: parsed[h] = feedparser.parse(f.read())
+            todo[u] = parsed[h]; ingested[(limit, u)] = h
+        if todo: feeds._ingest(todo, limit, now=now)
+        return [u for u in urls if snap.get(u)]
+
+    def emit(task, pick, now, prefix=""):
+        # as in production: seen/posted are marked either way, the outbox drops a repeated key
+        key = f"{task}:{pick['link']}"
+        seen[pick["link"]] = now
+        posted.add(pick["title"], ts=now)
+        if key in keys: return
+        keys.add(key)
+        if report_from <= now < report_to:
+            posts.append({"params": label, "task": task, "at": now, "published": pick.ts,
+                          "title": prefix + pick["title"], "link": pick["link"], "score": pick["score"]})
+
+    for now, snap in snaps:
+        if len(parsed) > 4096: parsed.clear()
+        when = datetime.fromtimestamp(now, timezone.utc)
+        if now >= next_due["priority"]:
+            next_due["priority"] = now + every["priority"] * 60 - 1
+            urls = feeds_for(prio_urls, snap, 5, now)
+            if now - last_prio >= params["SUPER_COOLDOWN_MIN"] * 60:
+                pick = pick_fresh(feeds.select_priority(urls, src), when, params["BREAKING_MAX_AGE_MIN"])
+                if pick is not None:
+                    last_prio = now
+                    emit("priority", pick, now, priority_prefix(pick["title"]))
+        if now >= next_due["breaking"]:
+            next_due["breaking"] = now + every["breaking"] * 60 - 1
+            urls = feeds_for(news_urls, snap, 6, now)
+            items = feeds.select_news(urls, seen, SEEN_TTL_DAYS, posted, now=now,
+                                      min_score=params["BREAKING_MIN_SCORE"], threshold=params["DEDUPE_THRESHOLD"])
+            pick = pick_fresh(items, when, params["BREAKING_MAX_AGE_MIN"])
+            if pick is not None: emit("breaking", pick, now)
+    return posts
+
+def _worker_init(root):
+    # per-process state.db, logs and JSON state; the pool forks before any db use
+    os.chdir(tempfile.mkdtemp(prefix="w", dir=root))
+
+def windows(snaps, hours, warmup_hours):
+    """[(start, end, snapshots from start - warmup to end)] covering the archive."""
+    if not snaps: return []
+    first, last = snaps[0][0], snaps[-1][0]
+    out, start, size = [], first, hours * 3600
+    while start <= last:
+        end = start + size
+        part = [s for s in snaps if start - warmup_hours * 3600 <= s[0] < end]
+        if any(start <= s[0] for s in part): out.append((start, end, part))
+        start = end
+    return out
+
+def param_sets(sets, weight_files):
+    """Cartesian product of --set values (and --weights files); [(label, params)]."""
+    axes = []
+    for spec in sets:
+        name, _, vals = spec.partition("=")
+        name = name.strip().upper()
+        if name not in TUNABLE: raise SystemExit(f"--set: unknown knob {name} (one of {', '.join(TUNABLE)})")
+        axes.append([(name, TUNABLE[name][0](v)) for v in vals.split(",") if v.strip()])
+    tables = [(None, None)]
+    if weight_files:
+        from .sources import current
+        tables = []
+        for path in weight_files:
+            with open(path, encoding="utf-8") as f:
+                tables.append((os.path.basename(path), {**current().provider_weights, **json.load(f)}))
+    out = []
+    for combo in itertools.product(*axes):
+        for wname, weights in tables:
+            params = {k: v for k, (_, v) in TUNABLE.items()}
+            params.update(combo)
+            params["weights"] = weights
+            label = " ".join([*(f"{k}={v:g}" for k, v in combo), *([f"weights={wname}"] if wname else [])]) or "baseline"
+            out.append((label, params))
+    return out
+
+def run(archive, sets=(), weight_files=(), window_hours=24, warmup_hours=24, breaking_every=30,
+        priority_every=5, workers=None):
+    """Replay the archive under every parameter set; (posts sorted by set and time, labels)."""
+    snaps = snapshots(archive)
+    psets = param_sets(sets, weight_files)
+    wins = windows(snaps, window_hours, warmup_hours)
+    every = {"breaking": breaking_every, "priority": priority_every}
+    # window-major, one window's parameter sets per chunk: a worker parses each body once
+    jobs = [(os.path.abspath(archive), part, start, end, params, label, every)
+            for start, end, part in wins for label, params in psets]
+    log(f"replay: {len(snaps)} snapshots, {len(wins)} windows x {len(psets)} parameter sets = {len(jobs)} jobs")
+    posts = []
+    with tempfile.TemporaryDirectory(prefix="rh-replay-") as root:
+        ctx = multiprocessing.get_context("fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn")
+        with ctx.Pool(workers or os.cpu_count(), initializer=_worker_init, initargs=(root,)) as pool:
+            for got in pool.imap_unordered(_simulate, jobs, chunksize=len(psets)):
+                posts.extend(got)
+    order = {label: i for i, (label, _) in enumerate(psets)}
+    posts.sort(key=lambda p: (order[p["params"]], p["at"]))
+    return posts, [label for label, _ in psets]
+
+def summarize(posts, labels):
+    """One row per parameter set: posts per task, median minutes from publish to post."""
+    rows = []
+    for label in labels:
+        mine = [p for p in posts if p["params"] == label]
+        delay = [(p["at"] - p["published"]) / 60 for p in mine]
+        rows.append((label, sum(p["task"] == "breaking" for p in mine), sum(p["task"] == "priority" for p in mine),
+                     len({p["link"] for p in mine}), statistics.median(delay) if delay else None))
+    return rows
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="red_horizon.replay", description="Capture feed snapshots or replay them offline.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    cap = sub.add_parser("capture", help="store one snapshot of the configured feeds")
+    cap.add_argument("archive")
+    rp = sub.add_parser("run", help="replay an archive and report what would have been posted")
+    rp.add_argument("archive")
+    rp.add_argument("--set", action="append", default=[], metavar="KNOB=v1,v2",
+                    help=f"values to try for one of {', '.join(TUNABLE)} (repeat for a grid)")
+    rp.add_argument("--weights", action="append", default=[], metavar="FILE",
+                    help="JSON provider weights merged over the current ones (repeat to compare tables)")
+    rp.add_argument("--window-hours", type=float, default=24, help="simulated time per job")
+    rp.add_argument("--warmup-hours", type=float, default=24, help="replayed before each window, not reported")
+    rp.add_argument("--breaking-every", type=float, default=30, help="minutes between simulated breaking runs")
+    rp.add_argument("--priority-every", type=float, default=5, help="minutes between simulated priority runs")
+    rp.add_argument("--workers", type=int, default=None)
+    rp.add_argument("--out", help="write every simulated post here as JSON lines")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "capture":
+        path, n, new = capture(args.archive)
+        print(f"{path}: {n} feeds, {new} new bodies")
+        return 0
+
+    t0 = time.perf_counter()
+    posts, labels = run(args.archive, args.set, args.weights, args.window_hours, args.warmup_hours,
+                        args.breaking_every, args.priority_every, args.workers)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            for p in posts: f.write(json.dumps({**p, "at": _iso(p["at"]), "published": _iso(p["published"])},
+                                               ensure_ascii=False) + "\n")
+    print(f"{'parameters':<48} {'breaking':>8} {'priority':>8} {'links':>6} {'median_delay_min':>17}")
+    for label, nb, np_, links, delay in summarize(posts, labels):
+        print(f"{label:<48} {nb:>8} {np_:>8} {links:>6} {'-' if delay is None else f'{delay:.1f}':>17}")
+    print(f"replayed in {time.perf_counter() - t0:.1f}s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
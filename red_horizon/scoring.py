@@ -0,0 +1,43 @@
+# red_horizon/scoring.py — relevance scores for a whole sweep's entries in one call
+#
+# Same formula as feeds.relevance_score, restated per keyword: every distinct
+# keyword found in a title adds 1.5 x (keyword lists) + 1.5 x (priority lists),
+# in a summary 0.5 x / 0.75 x, so the weights are folded into one table up
+# front and each entry is a scan per text plus a running sum over its hits,
+# with no per-list count dicts and nothing held beyond the current entry.
+# All those weights are multiples of 0.25, so the sums are exact in any
+# order and the scores match the per-entry path bit for bit.
+
+from functools import lru_cache
+
+TITLE_WEIGHTS   = {"keywords": 1.5, "priority": 1.5}
+SUMMARY_WEIGHTS = {"keywords": 0.5, "priority": 0.75}
+NEGATIVE_PENALTY = 1.0
+
+class BatchScorer:
+    def __init__(self, matcher, provider_weights: dict, domain_of):
+        self.matcher = matcher
+        per = lambda weights, m: sum(w * m.get(name, 0) for name, w in weights.items())
+        # keyword -> (title weight, summary weight, negative, on the keywords list)
+        self._table = {k: (per(TITLE_WEIGHTS, m), per(SUMMARY_WEIGHTS, m), m.get("negative", 0) > 0,
+                           m.get("keywords", 0) > 0)
+                       for k, m in matcher.multiplicities().items()}
+        self._provider = lru_cache(maxsize=4096)(lambda link: provider_weights.get(domain_of(link), 0.0))
+
+    def score(self, titles, summaries, links):
+        """Per entry: (score, title-only score, relevant), with
+        score == relevance_score(title, summary, link) and
+        title-only == relevance_score(title, "", link)."""
+        table, matches, out = self._table, self.matcher.matches, []
+        for title, summary, link in zip(titles, summaries, links):
+            t = s = 0.0
+            t_neg = s_neg = rel = False
+            for k in matches(title):
+                wt, _, neg, kw = table[k]
+                t += wt; t_neg |= neg; rel |= kw
+            for k in matches(summary):
+                _, ws, neg, kw = table[k]
+                s += ws; s_neg |= neg; rel |= kw
+            p = self._provider(link)
+            out.append(((t + s) + p - NEGATIVE_PENALTY * (t_neg or s_neg), t + p - NEGATIVE_PENALTY * t_neg, rel))
+        return out
@@ -0,0 +1,93 @@
+# red_horizon/seen.py — seen-link store: indexed SQLite rows + compact JSON snapshot
+#
+# state.db is the working store (O(1) lookup/insert, TTL expiry by index).
+# seen_links.json stays the durable snapshot that the cron workflows commit;
+# it is merged in on first use and rewritten atomically by export().
+
+import threading, time
+from . import db
+from .persistence import log, load_json, save_json
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS seen (
+    link TEXT PRIMARY KEY,
+    ts   REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS seen_ts ON seen(ts);
+"""
+db.register_schema(SCHEMA)
+
+class SeenStore:
+    def __init__(self, snapshot_path: str, ttl_days: int):
+        self.snapshot_path = snapshot_path
+        self.ttl = ttl_days * 86400
+        self._imported = False
+        self._lock = threading.Lock()
+        self._export_lock = threading.Lock()   # job threads and the outbox sender both export
+
+    def _conn(self):
+        c = db.conn()
+        if not self._imported:
+            with self._lock:
+                if not self._imported:
+                    self._import(c); self._imported = True
+        return c
+
+    def _import(self, c):
+        d = load_json(self.snapshot_path, {})
+        rows = [(k, v) for k, v in (d.items() if isinstance(d, dict) else [])
+                if isinstance(v, (int, float))]
+        if not rows: return
+        with c:
+            c.executemany(
+                "INSERT INTO seen (link, ts) VALUES (?, ?) "
+                "ON CONFLICT(link) DO UPDATE SET ts = MAX(ts, excluded.ts)", rows)
+
+    def get(self, link: str, default=None):
+        """Timestamp the link was last posted, or default (dict-compatible)."""
+        r = self._conn().execute("SELECT ts FROM seen WHERE link = ?", (link,)).fetchone()
+        return r[0] if r else default
+
+    def __contains__(self, link):
+        return self.get(link) is not None
+
+    def mark(self, *links, ts=None):
+        """Record links as seen now, in one transaction."""
+        if not links: return
+        ts = ts or time.time()
+        c = self._conn()
+        with c:
+            c.executemany("INSERT OR REPLACE INTO seen (link, ts) VALUES (?, ?)", [(l, ts) for l in links])
+
+    def forget(self, *links):
+        """Drop links so they can be picked again (e.g. their post never went out)."""
+        if not links: return
+        c = self._conn()
+        with c:
+            c.executemany("DELETE FROM seen WHERE link = ?", [(l,) for l in links])
+
+    def expire(self):
+        """Delete rows older than the TTL; returns how many were removed."""
+        try:
+            c = self._conn()
+            with c:
+                n = c.execute("DELETE FROM seen WHERE ts < ?", (time.time() - self.ttl,)).rowcount
+            if n: log(f"seen expire: pruned {n}")
+            return n
+        except Exception as e:
+            log(f"seen expire error: {e}"); return 0
+
+    def export(self, path=None):
+        """Write unexpired links to the JSON snapshot (sorted, compact, atomic)."""
+        try:
+            with self._export_lock:
+                rows = self._conn().execute(
+                    "SELECT link, ts FROM seen WHERE ts >= ? ORDER BY link", (time.time() - self.ttl,))
+                save_json(path or self.snapshot_path, {l: int(ts) for l, ts in rows}, compact=True)
+        except Exception as e:
+            log(f"seen export error: {e}")
+
+if __name__ == "__main__":
+    # python -m red_horizon.seen — refresh seen_links.json before a state commit
+    from .tasks import STATE
+    STATE.seen.expire(); STATE.seen.export()
@@ -0,0 +1,76 @@
+# red_horizon/snapshot.py — per-cycle feed snapshot shared by every run_* task
+#
+# Parsed feeds are kept for SNAPSHOT_TTL_SEC, so digest, breaking and
+# priority firing close together fetch each URL once. Concurrent callers
+# asking for a URL that is already being fetched wait for that fetch
+# instead of issuing their own. Inside `with cycle():` anything fetched
+# since the cycle began counts as fresh regardless of the TTL, so a batch
+# of tasks always sees one consistent snapshot.
+
+import threading, time
+from contextlib import contextmanager
+
+from .config import SNAPSHOT_TTL_SEC, FETCH_DEADLINE_SEC
+from .persistence import log
+
+_cache = {}        # url -> (fetched_at monotonic, parsed feed)
+_inflight = {}     # url -> Event set when its fetch finishes
+_lock = threading.Lock()
+_local = threading.local()
+STATS = {"reused": 0, "fetched": 0, "joined": 0}
+
+@contextmanager
+def cycle():
+    """Pin everything fetched from here on for the duration of the block."""
+    prev = getattr(_local, "since", None)
+    _local.since = time.monotonic() if prev is None else prev
+    try:
+        yield
+    finally:
+        _local.since = prev
+
+def _fresh(fetched_at, now, ttl):
+    since = getattr(_local, "since", None)
+    return (now - fetched_at) <= ttl or (since is not None and fetched_at >= since)
+
+def feeds(urls, fetch_many, ttl=None, label="snapshot"):
+    """{url: feed} for urls, calling fetch_many(missing_urls) only for stale ones."""
+    ttl = SNAPSHOT_TTL_SEC if ttl is None else ttl
+    out, todo, joined = {}, [], {}
+    now = time.monotonic()
+    with _lock:
+        for u, (t, _) in list(_cache.items()):
+            if now - t > max(ttl, 3600): del _cache[u]     # drop long-dead entries
+        for u in urls:
+            hit = _cache.get(u)
+            if hit and _fresh(hit[0], now, ttl): out[u] = hit[1]
+            elif u in _inflight: joined[u] = _inflight[u]
+            else:
+                _inflight[u] = threading.Event(); todo.append(u)
+        reused = len(out)
+        STATS["reused"] += reused; STATS["fetched"] += len(todo); STATS["joined"] += len(joined)
+
+    if todo:
+        got = {}
+        try:
+            got = fetch_many(todo)
+        finally:
+            with _lock:
+                t = time.monotonic()
+                for u in todo:
+                    if u in got: _cache[u] = (t, got[u])
+                    _inflight.pop(u).set()
+        out.update(got)
+    for u, ev in joined.items():
+        ev.wait(FETCH_DEADLINE_SEC + 5)
+        with _lock:
+            hit = _cache.get(u)
+        if hit: out[u] = hit[1]
+
+    if reused or joined:
+        log(f"{label}: snapshot reused {reused}, joined {len(joined)}, fetched {len(todo)}")
+    return out
+
+def clear():
+    with _lock:
+        _cache.clear()
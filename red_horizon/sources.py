@@ -0,0 +1,184 @@
+# red_horizon/sources.py — feed and keyword lists, hot-reloaded from SOURCES_FILE
+#
+# The lists in config.py are the defaults; SOURCES_FILE (JSON, any subset
+# of the keys below) overrides them without a redeploy. current() returns
+# an immutable Sources snapshot: the lists plus what is derived from them
+# (keyword matcher, batch scorer, priority feed list). At most every
+# SOURCES_CHECK_SEC it stats the file; a changed file is parsed and
+# validated off to the side, and only the derived parts whose inputs
+# changed are rebuilt (a new provider weight keeps the compiled matcher, a
+# new feed keeps both). A rebuilt scorer gets a new scorer_tag, a digest
+# of its inputs that entries rows are stamped with, so rows an older
+# scorer derived are re-derived rather than selected on stale scores. The
+# new snapshot replaces the old one in a single assignment: a run that
+# already holds a snapshot finishes with it, the next call sees the new
+# one, and nobody waits on a reload in progress. A
+# file that fails to parse or validate is logged and the previous snapshot
+# stays in place; deleting the file goes back to the defaults.
+#
+#   {"feeds": [...], "image_feeds": [...], "youtube_feeds": [...],
+#    "keywords": [...], "starbase_keywords": [...], "priority_keywords": [...],
+#    "negative_hints": [...], "high_signal_domains": [...],
+#    "provider_weights": {"nasa.gov": 2.5, ...}}
+
+import hashlib, json, math, os, threading, time
+from types import MappingProxyType
+
+from . import config
+from .config import SOURCES_FILE, SOURCES_CHECK_SEC
+from .matcher import KeywordMatcher
+from .scoring import BatchScorer
+from .persistence import log
+
+URL_LISTS = ("feeds", "image_feeds", "youtube_feeds")
+WORD_LISTS = ("keywords", "starbase_keywords", "priority_keywords", "negative_hints", "high_signal_domains")
+KEYS = (*URL_LISTS, *WORD_LISTS, "provider_weights")
+REQUIRED = ("feeds", "keywords")   # an empty one of these would silently post nothing
+
+# derived part -> the keys it is built from
+MATCHER_KEYS = ("keywords", "priority_keywords", "negative_hints")
+SCORER_KEYS = (*MATCHER_KEYS, "provider_weights")
+PRIORITY_KEYS = ("youtube_feeds", "feeds", "high_signal_domains")
+
+def defaults():
+    return {k: getattr(config, k.upper()) for k in KEYS}
+
+class Sources:
+    __slots__ = (*KEYS, "matcher", "scorer", "scorer_tag", "priority_feeds", "version", "origin")
+
+    def __init__(self, values, version, origin):
+        for k in KEYS: setattr(self, k, values[k])
+        self.version, self.origin = version, origin
+
+    def values(self):
+        return {k: getattr(self, k) for k in KEYS}
+
+def _tag(values, keys):
+    """Digest of values[keys]: equal for equal inputs, in any process."""
+    raw = json.dumps({k: (dict(values[k]) if k == "provider_weights" else list(values[k])) for k in keys},
+                     sort_keys=True)
+    return hashlib.sha1(raw.encode()).hexdigest()[:12]
+
+def validate(raw):
+    """Defaults overridden by raw (a parsed SOURCES_FILE); ValueError on anything malformed."""
+    if not isinstance(raw, dict): raise ValueError("top level must be an object")
+    unknown = sorted(set(raw) - set(KEYS))
+    if unknown: raise ValueError(f"unknown keys: {', '.join(unknown)}")
+    out = defaults()
+    for k, v in raw.items():
+        if k == "provider_weights":
+            if not isinstance(v, dict): raise ValueError("provider_weights must be an object")
+            for d, w in v.items():
+                if isinstance(w, bool) or not isinstance(w, (int, float)) or not math.isfinite(w):
+                    raise ValueError(f"provider_weights[{d!r}] must be a number")
+            out[k] = MappingProxyType({d.strip().lower(): float(w) for d, w in v.items()})
+            continue
+        if not isinstance(v, list) or not all(isinstance(x, str) and x.strip() for x in v):
+            raise ValueError(f"{k} must be a list of non-empty strings")
+        v = [x.strip() for x in v]
+        if k in URL_LISTS:
+            bad = [x for x in v if not x.startswith(("http://", "https://"))]
+            if bad: raise ValueError(f"{k}: not an http(s) URL: {bad[0]!r}")
+        out[k] = tuple(dict.fromkeys(v))
+    for k in REQUIRED:
+        if not out[k]: raise ValueError(f"{k} must not be empty")
+    for k in KEYS:
+        if k != "provider_weights": out[k] = tuple(out[k])
+    if not isinstance(out["provider_weights"], MappingProxyType):
+        out["provider_weights"] = MappingProxyType(dict(out["provider_weights"]))
+    return out
+
+def build(values, prev=None, version=1, origin="defaults"):
+    """Sources for values, reusing whatever derived part of prev has unchanged inputs."""
+    from .feeds import get_domain
+    s = Sources(values, version, origin)
+    same = lambda keys: prev is not None and all(getattr(prev, k) == values[k] for k in keys)
+    s.matcher = prev.matcher if same(MATCHER_KEYS) else KeywordMatcher({
+        "keywords": values["keywords"], "priority": values["priority_keywords"],
+        "negative": values["negative_hints"]})
+    if same(SCORER_KEYS): s.scorer, s.scorer_tag = prev.scorer, prev.scorer_tag
+    else: s.scorer, s.scorer_tag = BatchScorer(s.matcher, values["provider_weights"], get_domain), _tag(values, SCORER_KEYS)
+    s.priority_feeds = prev.priority_feeds if same(PRIORITY_KEYS) else (
+        *values["youtube_feeds"],
+        *sorted(u for u in set(values["feeds"]) if any(d in u for d in values["high_signal_domains"])))
+    return s
+
+_current = None
+_stamp = None        # (mtime_ns, size) of SOURCES_FILE last looked at, None if absent
+_checked = 0.0
+_pinned = False
+_lock = threading.Lock()
+STATS = {"reloads": 0, "rejected": 0, "last_error": None}
+
+def _stat(path):
+    try:
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size
+    except FileNotFoundError:
+        return None
+
+def current():
+    """The snapshot in use; looks at SOURCES_FILE again once SOURCES_CHECK_SEC has passed."""
+    s = _current
+    if s is None or (not _pinned and time.monotonic() - _checked >= SOURCES_CHECK_SEC):
+        s = reload()
+    return s
+
+def reload(force=False):
+    """Swap in SOURCES_FILE if it changed (or force); returns the snapshot in use.
+    While another thread is reloading this returns the current snapshot at once."""
+    global _current, _stamp, _checked
+    if not _lock.acquire(blocking=_current is None): return _current
+    try:
+        _checked = time.monotonic()
+        stamp = _stat(SOURCES_FILE)
+        if _current is not None and (_pinned or (stamp == _stamp and not force)): return _current
+        _stamp = stamp
+        prev = _current
+        try:
+            if stamp is None: raw = {}
+            else:
+                with open(SOURCES_FILE, encoding="utf-8") as f: raw = json.load(f)
+            t = time.perf_counter()
+            new = build(validate(raw), prev, (prev.version + 1) if prev else 1,
+                        SOURCES_FILE if stamp else "defaults")
+        except (OSError, ValueError) as e:   # JSONDecodeError is a ValueError
+            STATS["rejected"] += 1; STATS["last_error"] = f"{SOURCES_FILE}: {e}"
+            if prev is not None:
+                log(f"sources: {SOURCES_FILE} rejected ({e}); keeping version {prev.version}", level="error")
+                return prev
+            log(f"sources: {SOURCES_FILE} rejected ({e}); using the built-in lists", level="error")
+            new = build(validate({}))
+        else:
+            STATS["last_error"] = None
+            if prev is not None:
+                changed = [k for k in KEYS if getattr(prev, k) != getattr(new, k)]
+                rebuilt = [n for n in ("matcher", "scorer", "priority_feeds") if getattr(prev, n) is not getattr(new, n)]
+                STATS["reloads"] += 1
+                log(f"sources: version {new.version} from {new.origin}: changed {', '.join(changed) or 'nothing'}; "
+                    f"rebuilt {', '.join(rebuilt) or 'nothing'} in {(time.perf_counter() - t) * 1000:.1f} ms")
+        _current = new
+        return new
+    finally:
+        _lock.release()
+
+def use(**lists):
+    """Pin a snapshot built from the defaults plus these overrides (benchmarks,
+    replays); SOURCES_FILE is not consulted again until unpin()."""
+    global _current, _pinned
+    with _lock:
+        prev = _current
+        _current = build(validate(lists), prev, (prev.version + 1) if prev else 1, "pinned")
+        _pinned = True
+    return _current
+
+def unpin():
+    global _pinned, _checked, _stamp
+    with _lock:
+        _pinned, _checked, _stamp = False, 0.0, ()   # () matches no stat: the next current() re-reads
+
+def status():
+    """What /sources reports: version, origin, list sizes, last reload error."""
+    s = current()
+    return {"version": s.version, "origin": s.origin, "pinned": _pinned,
+            "sizes": {k: len(getattr(s, k)) for k in KEYS}, **STATS}
@@ -0,0 +1,132 @@
+# red_horizon/statestore.py — rotation cursors and priority cooldown in state.db
+#
+# These used to be whole-file JSON read-modify-writes (book_index.json,
+# fact_index.json, priority_state.json), so a cron run and a /run could
+# post the same book or both pass the priority cooldown. Here every update
+# is one IMMEDIATE transaction: take_cursor() hands each caller a distinct
+# slot and claim_priority() lets exactly one of two racing runs through.
+# The legacy files are imported once and kept as exported snapshots,
+# since the workflows commit them.
+
+import threading, time
+from . import db
+from .persistence import log, load_json, save_json
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cursors (
+    name    TEXT PRIMARY KEY,
+    idx     INTEGER NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS priority (
+    id       INTEGER PRIMARY KEY CHECK (id = 1),
+    last_ts  REAL NOT NULL,
+    last_url TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS migrations (
+    name TEXT PRIMARY KEY,
+    ts   REAL NOT NULL
+);
+"""
+db.register_schema(SCHEMA)
+
+# cursor name -> (snapshot file, older spellings to import from)
+CURSOR_FILES = {
+    "book": ("book_index.json", ("books_index.json",)),
+    "fact": ("fact_index.json", ()),
+}
+PRIORITY_FILE = "priority_state.json"
+
+_migrated = False
+_lock = threading.Lock()
+
+class _Immediate:
+    """`with _Immediate(c):` — BEGIN IMMEDIATE ... COMMIT/ROLLBACK (takes the write lock up front)."""
+
+    def __init__(self, c): self.c = c
+    def __enter__(self):
+        self.c.execute("BEGIN IMMEDIATE"); return self.c
+    def __exit__(self, exc, *_):
+        self.c.execute("ROLLBACK" if exc else "COMMIT")
+
+def once(name: str, fn):
+    """Run fn(conn) inside a transaction unless migration `name` already ran."""
+    c = _conn_raw()
+    with _Immediate(c):
+        if c.execute("SELECT 1 FROM migrations WHERE name = ?", (name,)).fetchone(): return False
+        fn(c)
+        c.execute("INSERT INTO migrations (name, ts) VALUES (?, ?)", (name, time.time()))
+    log(f"statestore: migrated {name}")
+    return True
+
+def _conn_raw():
+    c = db.conn()
+    if c.in_transaction: c.commit()
+    return c
+
+def _import_json(c):
+    now = time.time()
+    for name, (path, older) in CURSOR_FILES.items():
+        for p in (path, *older):
+            d = load_json(p, None)
+            if isinstance(d, dict) and isinstance(d.get("index"), int):
+                c.execute("INSERT OR IGNORE INTO cursors (name, idx, updated) VALUES (?, ?, ?)", (name, d["index"], now))
+                break
+    d = load_json(PRIORITY_FILE, None)
+    if isinstance(d, dict) and d.get("last_ts"):
+        c.execute("INSERT OR IGNORE INTO priority (id, last_ts, last_url) VALUES (1, ?, ?)",
+                  (float(d["last_ts"]), d.get("last_url") or ""))
+
+def _conn():
+    global _migrated
+    if not _migrated:
+        with _lock:
+            if not _migrated:
+                once("json-state-v1", _import_json); _migrated = True
+    return _conn_raw()
+
+# ---------- rotation cursors ----------
+def cursor(name: str):
+    r = _conn().execute("SELECT idx FROM cursors WHERE name = ?", (name,)).fetchone()
+    return r[0] if r else 0
+
+def take_cursor(name: str, size: int):
+    """Claim the current slot (0..size-1) and advance the cursor, atomically."""
+    c = _conn()
+    with _Immediate(c):
+        r = c.execute("SELECT idx FROM cursors WHERE name = ?", (name,)).fetchone()
+        idx = (r[0] if r else 0) % size
+        c.execute("INSERT OR REPLACE INTO cursors (name, idx, updated) VALUES (?, ?, ?)",
+                  (name, (idx + 1) % size, time.time()))
+    return idx
+
+def give_back(name: str, idx: int, size: int):
+    """Undo take_cursor() after a failed post, unless someone advanced it since."""
+    c = _conn()
+    with _Immediate(c):
+        c.execute("UPDATE cursors SET idx = ?, updated = ? WHERE name = ? AND idx = ?",
+                  (idx, time.time(), name, (idx + 1) % size))
+
+# ---------- priority cooldown ----------
+def priority():
+    r = _conn().execute("SELECT last_ts, last_url FROM priority WHERE id = 1").fetchone()
+    return {"last_ts": r[0], "last_url": r[1]} if r else {"last_ts": 0, "last_url": ""}
+
+def claim_priority(seen_ts: float, ts: float, url: str):
+    """Record a priority post at `ts` if the last one is still the `seen_ts` this
+    run read (compare-and-set); False means another run posted meanwhile."""
+    c = _conn()
+    with _Immediate(c):
+        r = c.execute("SELECT last_ts FROM priority WHERE id = 1").fetchone()
+        if (r[0] if r else 0) != seen_ts: return False
+        c.execute("INSERT OR REPLACE INTO priority (id, last_ts, last_url) VALUES (1, ?, ?)", (ts, url))
+    return True
+
+# ---------- JSON snapshots for the workflow commits ----------
+def export():
+    try:
+        for name, (path, _) in CURSOR_FILES.items():
+            save_json(path, {"index": cursor(name)})
+        save_json(PRIORITY_FILE, priority())
+    except Exception as e:
+        log(f"statestore export error: {e}")
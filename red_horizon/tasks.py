@@ -1,93 +1,215 @@
-import os, random, re, time
+import functools, hashlib, os, re, threading, time
 from datetime import datetime, timedelta
+from functools import cached_property
 from .config import (
     HASHTAG_LINE, MAX_ITEMS, SEEN_TTL_DAYS, UTC, WELCOME_MESSAGE,
-    BREAKING_MAX_AGE_MIN, ENABLE_SUPER_PRIORITY, SUPER_COOLDOWN_MIN
-)
-from .persistence import log, load_json, save_json
-from .telegram import post_to_telegram, md_escape
-from .feeds import (
-    fetch_news, fetch_images, fetch_priority_candidates,
-    mark_seen
+    BREAKING_MAX_AGE_MIN, ENABLE_SUPER_PRIORITY, SUPER_COOLDOWN_MIN,
+    ZAPIER_TIMEOUT_SEC, DEDUPE_THRESHOLD, OUTBOX_ENABLED, LEASE_TASKS
 )
+from .persistence import log, load_json
+from .telegram import post_to_telegram, md_escape, MAX_TEXT
+from . import metrics
+
+# Feed fetching (requests, feedparser, sqlite) is imported inside the run_*
+# functions that need it, so importing this module stays cheap.
 
 BOOKS_FILE = "books.json"
 FACTS_FILE = "starbase_facts.json"
 SEEN_FILE  = "seen_links.json"
-BOOK_INDEX_FILE = "book_index.json"
-FACT_INDEX_FILE = "fact_index.json"
-PRIORITY_STATE_FILE = "priority_state.json"
+POSTED_TITLES_FILE = "posted_titles.json"
+
+class StateManager:
+    """Bot state, each piece loaded from disk on first use only."""
+
+    @cached_property
+    def books(self): return load_json(BOOKS_FILE, [])
+
+    @cached_property
+    def facts(self): return load_json(FACTS_FILE, [])
+
+    # rotation cursors and the priority cooldown live in state.db (statestore);
+    # these read-only views keep the old dict shapes
+    @property
+    def book_idx(self): return {"index": statestore().cursor("book")}
+
+    @property
+    def fact_idx(self): return {"index": statestore().cursor("fact")}
+
+    @property
+    def pr_state(self): return statestore().priority()
+
+    @cached_property
+    def seen(self):
+        from .seen import SeenStore
+        return SeenStore(SEEN_FILE, SEEN_TTL_DAYS)
+
+    @cached_property
+    def posted(self):
+        from .dedupe import TitleIndex
+        return TitleIndex.load(POSTED_TITLES_FILE, DEDUPE_THRESHOLD, SEEN_TTL_DAYS)
+
+    @cached_property
+    def outbox(self):
+        from .outbox import Outbox
+        return Outbox(seen=self.seen, remember=remember_posted)
+
+    def loaded(self):
+        """Names of the state pieces loaded so far."""
+        return sorted(k for k in vars(self) if isinstance(getattr(type(self), k, None), cached_property))
+
+STATE = StateManager()
 
-BOOKS = load_json(BOOKS_FILE, [])
-FACTS = load_json(FACTS_FILE, [])
-BOOK_IDX = load_json(BOOK_INDEX_FILE, {"index": 0})
-FACT_IDX = load_json(FACT_INDEX_FILE, {"index": 0})
-SEEN     = load_json(SEEN_FILE, {})
-PR_STATE = load_json(PRIORITY_STATE_FILE, {"last_ts": 0, "last_url": ""})
+def statestore():
+    from . import statestore as store   # deferred with the rest of the SQLite state
+    return store
+
+# Old module-level names (tasks.SEEN, tasks.BOOKS, ...) resolve lazily too.
+_LEGACY = {"BOOKS": "books", "FACTS": "facts", "BOOK_IDX": "book_idx", "FACT_IDX": "fact_idx",
+           "SEEN": "seen", "PR_STATE": "pr_state", "POSTED": "posted"}
+
+def __getattr__(name):
+    if name in _LEGACY: return getattr(STATE, _LEGACY[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 BOT_TOKEN  = os.getenv("TELEGRAM_BOT_TOKEN")
 CHANNEL_ID = os.getenv("TELEGRAM_CHANNEL_ID")
+# extra chats/groups every post is mirrored to (comma-separated ids or @names)
+MIRROR_CHAT_IDS = [c.strip() for c in os.getenv("TELEGRAM_MIRROR_CHAT_IDS", "").split(",") if c.strip()]
 ZAPIER_HOOK_URL = os.getenv("ZAPIER_HOOK_URL")
 
+def post(text: str, photo_url: str=None, buttons=None, key=None, links=(), titles=()):
+    """post_to_telegram to the channel and its mirrors, through the outbound
+    queue unless OUTBOX_ENABLED=0. links are marked seen and titles added to
+    the posted-title history only once the channel post is delivered."""
+    outbox = None
+    if OUTBOX_ENABLED:
+        outbox = STATE.outbox
+        outbox.start(BOT_TOKEN)
+    res = post_to_telegram(BOT_TOKEN, [CHANNEL_ID, *MIRROR_CHAT_IDS], text, photo_url=photo_url,
+                           buttons=buttons, outbox=outbox, key=key, links=links, titles=titles)
+    if outbox is None:
+        if MIRROR_CHAT_IDS: log(f"fan-out: {res}")
+        if res and next(iter(res.values()))["ok"]:   # the channel is the first chat
+            if links: STATE.seen.mark(*links); STATE.seen.export()
+            if titles: remember_posted(*titles)
+    return res
+
 def forward_tweet_to_zapier(tweet_text: str, photo_url: str=None):
     if not ZAPIER_HOOK_URL: return
-    import requests
+    from . import httpclient
     try:
         payload = {"tweet": tweet_text}
         if photo_url: payload["photo_url"] = photo_url
-        r = requests.post(ZAPIER_HOOK_URL, json=payload, timeout=10)
+        with metrics.span("zapier_forward"):
+            r = httpclient.post(ZAPIER_HOOK_URL, json=payload, timeout=ZAPIER_TIMEOUT_SEC, retries=1)
+        metrics.inc("zapier_requests_total", status=r.status_code)
         if r.status_code >= 300:
             log(f"Zapier forward error {r.status_code}: {r.text}")
     except Exception as e:
         log(f"Zapier forward exception: {e}")
 
-def make_digest(items):
+def leased(task: str):
+    """Run the task only while holding its lease (red_horizon.lease), so one
+    replica sweeps and posts per cycle; the others return "leased"."""
+    def wrap(fn):
+        if task not in LEASE_TASKS: return fn
+        @functools.wraps(fn)
+        def run(*args, **kwargs):
+            from . import lease
+            ok, rec = lease.acquire(task)
+            if not ok:
+                log(f"{task}: leased by {rec['holder']} until {time.strftime('%H:%M:%S', time.localtime(rec['expires']))}"
+                    f" (its last result: {rec.get('note')})")
+                metrics.inc("lease_skips_total", task=task)
+                return "leased"
+            res = fn(*args, **kwargs)
+            lease.note(task, res)
+            return res
+        return run
+    return wrap
+
+_POSTED_LOCK = threading.Lock()   # /run jobs for different tasks may post at once
+
+def remember_posted(*titles):
+    """Record posted headlines so reworded repeats are deduped on later runs."""
+    with _POSTED_LOCK:
+        for t in titles: STATE.posted.add(t)
+        STATE.posted.save(POSTED_TITLES_FILE)
+
+def make_digest(items, limit=MAX_TEXT):
+    """(text, items listed): whole items only, as many of the first MAX_ITEMS
+    as fit in one message, so nothing is cut mid-line or mid-entity."""
     today = datetime.now(UTC).strftime("%b %d, %Y")
     lines = [f"🚀 *Red Horizon Daily Digest* — {today}\n"]
+    footer = "\n" + HASHTAG_LINE
+    size, used = len(lines[0]) + 1 + len(footer), []
     for it in items[:MAX_ITEMS]:
         tag = "🚀"
         low = it['title'].lower()
         if any(k in low for k in ["starbase","boca chica","spacex starship"]):
             tag = "🛠"
         title = md_escape(it['title'])
-        lines.append(f"• {tag} *{title}* — {it['link']}")
-    lines.append("\n" + HASHTAG_LINE)
-    return "\n".join(lines)[:4090]
+        line = f"• {tag} *{title}* — {it['link']}"
+        if size + len(line) + 1 > limit: break
+        lines.append(line); used.append(it); size += len(line) + 1
+    lines.append(footer)
+    return "\n".join(lines), used
 
 def run_digest():
+    from .feeds import fetch_news
     try:
-        items = fetch_news(SEEN, SEEN_FILE, SEEN_TTL_DAYS)
+        items = fetch_news(STATE.seen, SEEN_FILE, SEEN_TTL_DAYS, STATE.posted)
         if not items:
             log("run_digest: no items"); return "no_items"
-        msg = make_digest(items)
-        post_to_telegram(BOT_TOKEN, CHANNEL_ID, msg)
-        for it in items[:MAX_ITEMS]:
-            mark_seen(it["link"], SEEN, SEEN_FILE)
+        msg, shown = make_digest(items)
+        links = [it["link"] for it in shown]
+        post(msg, key="digest:" + hashlib.sha1("\n".join(sorted(links)).encode()).hexdigest(), links=links,
+             titles=[it["title"] for it in shown])
         tweet = f"🚀 Red Horizon Daily Digest — {datetime.now(UTC).strftime('%b %d')}\nSpaceX, NASA & Mars updates.\n👉 Full digest: t.me/RedHorizonHub\n\n#SpaceX #Mars #RedHorizon"
         forward_tweet_to_zapier(tweet)
         return "ok"
     except Exception as e:
         log(f"run_digest error: {e}"); return "error"
 
+_SPACEX_RE = re.compile(r"\b(spacex|starship|starbase|falcon|super heavy|booster|raptor|starlink)\b", re.I)
+
+def pick_fresh(items, now=None, max_age_min=BREAKING_MAX_AGE_MIN):
+    """What breaking/priority post from their candidates: only items published
+    within max_age_min of now, SpaceX/Starship terms first, then by score and
+    recency; None when nothing is fresh enough."""
+    now = now or datetime.now(UTC)
+    fresh = [it for it in items if (now - it["published"]).total_seconds() <= max_age_min*60]
+    if not fresh: return None
+    spacex_first = [it for it in fresh if _SPACEX_RE.search(it["title"])]
+    def sortkey(x): return (x.get("score", 0.0), x["published"])
+    return sorted(spacex_first or fresh, key=sortkey, reverse=True)[0]
+
+def priority_prefix(title: str):
+    low = title.lower()
+    if re.search(r"\b(live|livestream|streaming now|is live)\b", low):
+        return "🟢 LIVE NOW — "
+    if re.search(r"\b(upcoming|premiere|scheduled)\b", low):
+        return "🔴 LIVE SOON — "
+    if re.search(r"\b(static fire|hotfire|wdr|wet dress|stack|destack|rollback)\b", low):
+        return "🛠 Test Update — "
+    return "🚨 Priority — "
+
+@leased("breaking")
 def run_breaking():
+    from .feeds import fetch_news
     try:
-        items = fetch_news(SEEN, SEEN_FILE, SEEN_TTL_DAYS)
+        items = fetch_news(STATE.seen, SEEN_FILE, SEEN_TTL_DAYS, STATE.posted)
         if not items:
             log("run_breaking: no items"); return "no_items"
 
-        now = datetime.now(UTC)
-        fresh = [it for it in items if (now - it["published"]).total_seconds() <= BREAKING_MAX_AGE_MIN*60]
-        if not fresh:
+        pick = pick_fresh(items)
+        if pick is None:
             log("run_breaking: no fresh within window"); return "no_fresh"
 
-        spacex_first = [it for it in fresh if re.search(r"\b(spacex|starship|starbase|falcon|super heavy|booster|raptor|starlink)\b", it["title"], re.I)]
-        def sortkey(x): return (x.get("score", 0.0), x["published"])
-        pick = sorted(spacex_first or fresh, key=sortkey, reverse=True)[0]
-
         title = md_escape(pick['title'])
         text = f"🚨 *Breaking News* — {title}\n{pick['link']}\n\n#SpaceX #Starship #RedHorizon"
-        post_to_telegram(BOT_TOKEN, CHANNEL_ID, text, buttons=[("Read Source", pick["link"])])
-        mark_seen(pick["link"], SEEN, SEEN_FILE)
+        post(text, buttons=[("Read Source", pick["link"])], key=f"breaking:{pick['link']}",
+             links=[pick["link"]], titles=[pick["title"]])
 
         tweet = f"🚨 Breaking: {pick['title']}\n👉 Details → t.me/RedHorizonHub\n\n#SpaceX #Starship #RedHorizon"
         forward_tweet_to_zapier(tweet)
@@ -95,48 +217,36 @@ def run_breaking():
     except Exception as e:
         log(f"run_breaking error: {e}"); return "error"
 
+@leased("priority")
 def run_super_priority(force=False):
+    from .feeds import fetch_priority_candidates
     try:
         if not ENABLE_SUPER_PRIORITY and not force:
             return "disabled"
         now = time.time()
+        last_ts = statestore().priority()["last_ts"]
         # Cooldown
-        if (not force) and (now - PR_STATE.get("last_ts", 0) < SUPER_COOLDOWN_MIN*60):
+        if (not force) and (now - last_ts < SUPER_COOLDOWN_MIN*60):
             return "cooldown"
 
-        cands = fetch_priority_candidates(SEEN, SEEN_TTL_DAYS)
+        cands = fetch_priority_candidates(STATE.seen, SEEN_TTL_DAYS)
         if not cands:
             return "no_candidates"
 
-        # Only consider within BREAKING_MAX_AGE_MIN window
-        utcnow = datetime.now(UTC)
-        window = [c for c in cands if (utcnow - c["published"]).total_seconds() <= BREAKING_MAX_AGE_MIN*60]
-        if not window:
+        pick = pick_fresh(cands)
+        if pick is None:
             return "no_fresh"
+        prefix = priority_prefix(pick["title"])
 
-        # Prefer SpaceX/Starship terms
-        spacexy = [c for c in window if re.search(r"\b(spacex|starship|starbase|falcon|super heavy|booster|raptor|starlink)\b", c["title"], re.I)]
-        def sortkey(x): return (x.get("score", 0.0), x["published"])
-        pick = sorted(spacexy or window, key=sortkey, reverse=True)[0]
-
-        low = pick["title"].lower()
-        if re.search(r"\b(live|livestream|streaming now|is live)\b", low):
-            prefix = "🟢 LIVE NOW — "
-        elif re.search(r"\b(upcoming|premiere|scheduled)\b", low):
-            prefix = "🔴 LIVE SOON — "
-        elif re.search(r"\b(static fire|hotfire|wdr|wet dress|stack|destack|rollback)\b", low):
-            prefix = "🛠 Test Update — "
-        else:
-            prefix = "🚨 Priority — "
+        # a concurrent run (cron vs /run) that got here first wins the cooldown slot
+        if not statestore().claim_priority(last_ts, now, pick["link"]):
+            return "cooldown"
+        statestore().export()
 
         title = md_escape(pick["title"])
         text = f"{prefix}{title}\n{pick['link']}\n\n#SpaceX #Starship #RedHorizon"
-        post_to_telegram(BOT_TOKEN, CHANNEL_ID, text, buttons=[("Open", pick["link"])])
-
-        mark_seen(pick["link"], SEEN, SEEN_FILE)
-        PR_STATE["last_ts"] = now
-        PR_STATE["last_url"] = pick["link"]
-        save_json(PRIORITY_STATE_FILE, PR_STATE)
+        post(text, buttons=[("Open", pick["link"])], key=f"priority:{pick['link']}",
+             links=[pick["link"]], titles=[pick["title"]])
 
         # Tweet LIVE NOW and Test Update; skip LIVE SOON if you want
         if prefix.startswith("🟢") or prefix.startswith("🛠") or prefix.startswith("🚨"):
@@ -147,19 +257,24 @@ def run_super_priority(force=False):
         log(f"run_super_priority error: {e}"); return "error"
 
 def run_daily_image():
+    from .feeds import fetch_images
     try:
-        cands = fetch_images(SEEN, SEEN_FILE, SEEN_TTL_DAYS)
+        cands = fetch_images(STATE.seen, SEEN_FILE, SEEN_TTL_DAYS)
         if not cands:
             log("run_daily_image: no candidates"); return "no_items"
-        chosen = random.choice(cands[:8])
+        # candidates come shuffled; take the first whose image pre-flights (type, size, dimensions)
+        from .imagecheck import pick
+        chosen = pick(cands)
+        if not chosen:
+            log("run_daily_image: no candidate passed image pre-flight"); return "no_valid_image"
         source_tag = "📸 Space Image"
         if "flickr.com" in chosen["link"]:
             if "154560776@N07" in chosen["link"]: source_tag = "🛫 RGV Starbase Photo"
             elif "182367180@N05" in chosen["link"]: source_tag = "🌌 Andrew McCarthy Photo"
         title = md_escape(chosen['title'])
         caption = f"{source_tag}\n*{title}*\n{chosen['link']}\n\n#Astronomy #SpaceX #RedHorizon"
-        post_to_telegram(BOT_TOKEN, CHANNEL_ID, caption, photo_url=chosen["img"], buttons=[("View Source", chosen["link"])])
-        mark_seen(chosen["link"], SEEN, SEEN_FILE)
+        post(caption, photo_url=chosen["img"], buttons=[("View Source", chosen["link"])],
+             key=f"image:{chosen['link']}", links=[chosen["link"]])
         tweet = f"📸 Today’s Space Image: {chosen['title']}\n🌌 More daily images: t.me/RedHorizonHub\n\n#Astronomy #NASA #RedHorizon"
         forward_tweet_to_zapier(tweet, photo_url=chosen["img"])
         return "ok"
@@ -168,43 +283,47 @@ def run_daily_image():
 
 def run_book_spotlight():
     try:
-        if not BOOKS:
+        if not STATE.books:
             log("run_book_spotlight: no books.json"); return "no_books"
-        idx = BOOK_IDX.get("index", 0) % len(BOOKS)
-        book = BOOKS[idx]
+        idx = statestore().take_cursor("book", len(STATE.books))
+        book = STATE.books[idx]
         title = md_escape(book['title'])
         msg = (f"📖 *Red Horizon Book Spotlight*\n"
                f"{title}\n{book['blurb']}\n\n"
                f"🔗 [Get it here]({book['link']})\n\n"
                "#Mars #SciFi #RedHorizonReads")
-        post_to_telegram(BOT_TOKEN, CHANNEL_ID, msg, buttons=[("Open on Amazon", book["link"])])
-        BOOK_IDX["index"] = (idx + 1) % len(BOOKS)
-        save_json(BOOK_INDEX_FILE, BOOK_IDX)
+        try:
+            post(msg, buttons=[("Open on Amazon", book["link"])])
+        except Exception:
+            statestore().give_back("book", idx, len(STATE.books)); raise
+        statestore().export()
         return "ok"
     except Exception as e:
         log(f"run_book_spotlight error: {e}"); return "error"
 
 def run_welcome():
     try:
-        post_to_telegram(BOT_TOKEN, CHANNEL_ID, WELCOME_MESSAGE)
+        post(WELCOME_MESSAGE)
         return "ok"
     except Exception as e:
         log(f"run_welcome error: {e}"); return "error"
 
 def run_starbase_fact():
     try:
-        if not FACTS:
+        if not STATE.facts:
             log("run_starbase_fact: no starbase_facts.json"); return "no_facts"
-        idx = FACT_IDX.get("index", 0) % len(FACTS)
-        fact = FACTS[idx]
+        idx = statestore().take_cursor("fact", len(STATE.facts))
+        fact = STATE.facts[idx]
         caption = (f"🏗 *Starbase Highlight*\n"
                    f"{md_escape(fact['title'])}\n{fact['desc']}\n\n"
                    "#Starbase #SpaceX #RedHorizon")
         buttons = [("Learn More", fact["link"])] if fact.get("link") else None
         photo = fact.get("img")
-        post_to_telegram(BOT_TOKEN, CHANNEL_ID, caption, photo_url=photo, buttons=buttons)
-        FACT_IDX["index"] = (idx + 1) % len(FACTS)
-        save_json(FACT_INDEX_FILE, FACT_IDX)
+        try:
+            post(caption, photo_url=photo, buttons=buttons)
+        except Exception:
+            statestore().give_back("fact", idx, len(STATE.facts)); raise
+        statestore().export()
         return "ok"
     except Exception as e:
         log(f"run_starbase_fact error: {e}"); return "error"
@@ -1,5 +1,8 @@
-import requests, time, re
+import re, time
+from concurrent.futures import ThreadPoolExecutor
+from .config import TELEGRAM_TIMEOUT_SEC, TELEGRAM_API_BASE, TG_FANOUT_WORKERS
 from .persistence import log
+from . import metrics
 
 _MD_RE = re.compile(r'([_*()\[\]])')  # basic Markdown escape for Telegram
 
@@ -7,46 +10,146 @@ def md_escape(s: str) -> str:
     if not s: return s
     return _MD_RE.sub(r'\\\1', s)
 
-def tg_request(bot_token: str, method: str, payload: dict):
-    url = f"https://api.telegram.org/bot{bot_token}/{method}"
-    for attempt in range(3):
-        r = requests.post(url, json=payload, timeout=30)
-        if r.status_code == 429:
-            wait = int(r.headers.get("Retry-After", "2"))
-            time.sleep(min(wait, 10)); continue
-        if r.status_code >= 500:
-            time.sleep(2*(attempt+1)); continue
-        return r
-    log(f"tg_request failed {method}: {getattr(r,'status_code','no_resp')}")
+def tg_request(bot_token: str, method: str, payload: dict, retries=2):
+    from . import httpclient   # deferred: keeps `import red_horizon.tasks` free of requests
+    url = f"{TELEGRAM_API_BASE}/bot{bot_token}/{method}"
+    with metrics.span("telegram_send", method=method):
+        r = httpclient.post(url, json=payload, timeout=TELEGRAM_TIMEOUT_SEC, retries=retries, backoff=2.0)
+    metrics.inc("telegram_requests_total", method=method, status=r.status_code)
+    metrics.inc("telegram_retries_total", getattr(r, "retries", 0), method=method)
+    if r.status_code in httpclient.RETRY_STATUSES:
+        log(f"tg_request failed {method}: {r.status_code}")
     return r
 
-def split_chunks(text: str, limit=4096):
-    if len(text) <= limit: return [text]
-    parts, cur = [], []
+MAX_TEXT = 4096
+FENCE = "```"
+
+def _safe_breaks(line: str):
+    """Positions of the spaces in line that sit outside every Markdown entity
+    (*bold*, _italic_, `code`, [text](url)); backslash escapes are skipped."""
+    out, inside, i, n = [], None, 0, len(line)
+    while i < n:
+        ch = line[i]
+        if ch == "\\" and inside != "`": i += 2; continue
+        if inside is None:
+            if ch == " ": out.append(i)
+            elif ch in "*_`[": inside = ch
+        elif inside == "[":
+            if ch == "]": inside = "(" if line[i + 1:i + 2] == "(" else None
+        elif (inside == "(" and ch == ")") or ch == inside:
+            inside = None
+        i += 1
+    return out
+
+def _pieces(text: str, width: int):
+    """(sep, piece) for text's lines, cutting any longer than width at a space
+    outside an entity (hard cut only when the line has no such space in
+    reach); sep joins the piece back to the one before: "\n" between lines,
+    " " after a space cut, "" after a hard cut."""
     for line in text.split("\n"):
-        if sum(len(x)+1 for x in cur) + len(line) + 1 > limit:
-            parts.append("\n".join(cur)); cur=[line]
-        else:
-            cur.append(line)
-    if cur: parts.append("\n".join(cur))
+        start, j, sep = 0, 0, "\n"
+        breaks = _safe_breaks(line) if len(line) > width else []
+        while len(line) - start > width:
+            cut = None            # furthest safe space in (start, start + width]
+            while j < len(breaks) and breaks[j] <= start + width:
+                if breaks[j] > start: cut = breaks[j]
+                j += 1
+            if cut is None:
+                yield sep, line[start:start + width]; start, sep = start + width, ""
+            else:
+                yield sep, line[start:cut]; start, sep = cut + 1, " "
+        yield sep, line[start:]
+
+def split_chunks(text: str, limit=MAX_TEXT):
+    """Split text into messages of at most `limit` chars in one pass: at line
+    breaks, over-long lines at a space outside any entity, and a ``` block
+    cut between chunks is closed and reopened so each chunk parses alone."""
+    if limit <= 2 * (len(FENCE) + 1):   # no room left for text between the fences
+        raise ValueError(f"split_chunks: limit must be over {2 * (len(FENCE) + 1)}, got {limit}")
+    if len(text) <= limit: return [text]
+    budget = limit - len(FENCE) - 1        # room to close an open ``` block
+    parts, cur, size, fence = [], [], 0, False
+    for sep, line in _pieces(text, budget - len(FENCE) - 1):
+        if cur and size + len(sep) + len(line) > budget:
+            parts.append("".join(cur) + ("\n" + FENCE if fence else ""))
+            cur, size = ([FENCE], len(FENCE)) if fence else ([], 0)
+            sep = "\n" if fence else ""   # a cut line carries on in the next chunk
+        elif not cur:
+            sep = ""
+        cur += (sep, line)
+        size += len(sep) + len(line)
+        if line.count(FENCE) % 2: fence = not fence
+    if cur: parts.append("".join(cur))
     return parts
 
-def post_to_telegram(bot_token: str, chat_id: str, text: str, photo_url: str=None, buttons=None):
+def render(text: str, photo_url: str=None, buttons=None):
+    """[(method, payload without chat_id)] for one post, rendered and chunked
+    once however many chats it goes to: a photo, or the text in chunks."""
     reply_markup = None
     if buttons:
         reply_markup = {"inline_keyboard": [[{"text": t, "url": u}] for (t,u) in buttons]}
 
     if photo_url:
-        payload = {"chat_id": chat_id, "photo": photo_url, "caption": text, "parse_mode": "Markdown"}
+        payload = {"photo": photo_url, "caption": text, "parse_mode": "Markdown"}
         if reply_markup: payload["reply_markup"] = reply_markup
-        r = tg_request(bot_token, "sendPhoto", payload)
-        if r is not None and r.status_code >= 300:
-            log(f"sendPhoto error {r.status_code}: {r.text}")
-        return
+        return [("sendPhoto", payload)]
 
+    out = []
     for chunk in split_chunks(text):
-        payload = {"chat_id": chat_id, "text": chunk, "parse_mode": "Markdown", "disable_web_page_preview": False}
+        payload = {"text": chunk, "parse_mode": "Markdown", "disable_web_page_preview": False}
         if reply_markup: payload["reply_markup"] = reply_markup
-        r = tg_request(bot_token, "sendMessage", payload)
-        if r is not None and r.status_code >= 300:
-            log(f"sendMessage error {r.status_code}: {r.text}")
+        out.append(("sendMessage", payload))
+    return out
+
+def _chats(chat_id):
+    ids = [chat_id] if isinstance(chat_id, (str, int)) else list(chat_id)
+    return list(dict.fromkeys(str(c) for c in ids if c))
+
+def _send_chat(bot_token, chat, msgs):
+    """Send one chat's messages in order (stop at the first failure); (ok, seconds)."""
+    t = time.monotonic()
+    ok = True
+    for method, payload in msgs:
+        try:
+            r = tg_request(bot_token, method, {"chat_id": chat, **payload})
+        except Exception as e:
+            log(f"{method} to {chat} error: {e}"); ok = False; break
+        if r.status_code >= 300:
+            log(f"{method} to {chat} error {r.status_code}: {r.text}"); ok = False; break
+    secs = time.monotonic() - t
+    metrics.observe("telegram_delivery", secs, chat=chat)
+    return ok, secs
+
+def post_to_telegram(bot_token: str, chat_id, text: str, photo_url: str=None, buttons=None,
+                     outbox=None, key=None, links=(), titles=()):
+    """Post to one chat, or fan out to several (chat_id may be a list; the
+    first is the primary): send now, chats in parallel, or hand everything to
+    `outbox` (red_horizon.outbox.Outbox), which paces each chat, and return.
+
+    key   — idempotency key for the post (chunks get key:1, key:2, ...;
+            mirror chats key@chat)
+    links, titles — with `outbox`, marked seen / added to the posted-title
+            history once the primary chat's post is delivered
+    Returns {chat: {"ok", "seconds"}} when sending now, else {chat: [outbox row ids]}.
+    """
+    chats = _chats(chat_id)
+    msgs = render(text, photo_url, buttons)
+    if outbox is not None:
+        out = {}
+        for n, chat in enumerate(chats):
+            base = key if (n == 0 or not key) else f"{key}@{chat}"
+            out[chat] = [outbox.enqueue(chat, method, {"chat_id": chat, **payload},
+                                        key=(f"{base}:{i}" if base and i else base),
+                                        **({"links": links, "titles": titles} if n == 0 and i == len(msgs) - 1 else {}))[0]
+                         for i, (method, payload) in enumerate(msgs)]
+        return out
+
+    if len(chats) == 1:
+        ok, secs = _send_chat(bot_token, chats[0], msgs)
+        return {chats[0]: {"ok": ok, "seconds": round(secs, 3)}}
+    with ThreadPoolExecutor(max_workers=min(len(chats), TG_FANOUT_WORKERS), thread_name_prefix="tg") as pool:
+        run = metrics.current()
+        def one(chat):
+            with metrics.attach(run): return _send_chat(bot_token, chat, msgs)
+        done = dict(zip(chats, pool.map(one, chats)))
+    return {c: {"ok": ok, "seconds": round(secs, 3)} for c, (ok, secs) in done.items()}
@@ -0,0 +1,146 @@
+# red_horizon/watcher.py — long-running priority watcher (seconds instead of a 5-minute cron)
+#
+# Polls only the priority feeds (YouTube + high-signal domains) every
+# WATCH_INTERVAL_SEC, jittered so it never beats in step with a host, with
+# conditional requests (ETag / Last-Modified from feedcache, so an unchanged
+# feed costs a 304). The learned per-feed schedule is ignored here but the
+# host breaker still applies. Validators and feed health stay in memory and
+# are flushed every WATCH_FLUSH_SEC rather than on every tick. When a tick
+# (or a WebSub push, via notify()) stores new entries, the normal priority
+# path runs at once; a "cooldown" verdict is retried on later ticks until
+# the cooldown has passed (likewise "leased": another replica holds the cycle).
+#
+#   python -m red_horizon.watcher [--interval 20] [--once]
+#
+# or WATCH_ENABLED=1 to run it inside the web app. The priority feed list
+# follows sources.py reloads, and a changed YouTube list is re-subscribed.
+
+import argparse, random, signal, sys, threading, time
+
+from . import metrics
+from .config import (
+    WATCH_INTERVAL_SEC, WATCH_JITTER, WATCH_FLUSH_SEC, WEBSUB_CALLBACK_URL, WEBSUB_RENEW_HOURS,
+    WEBSUB_ENABLED,
+)
+from .persistence import log
+
+def _run_priority():
+    from .tasks import run_super_priority
+    with metrics.run("priority"):
+        return run_super_priority()
+
+class Watcher:
+    def __init__(self, trigger=None, interval=WATCH_INTERVAL_SEC, jitter=WATCH_JITTER):
+        """trigger() runs the priority task and returns its result string."""
+        self.trigger = trigger or _run_priority
+        self.interval, self.jitter = interval, jitter
+        self._pending = False          # new entries not yet run through priority
+        self._mu = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._flushed = time.monotonic()
+        self._renewed = None
+        self._subscribed = None        # youtube_feeds the last subscribe covered
+
+    def start(self):
+        """Run in a background thread (idempotent)."""
+        with self._mu:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self.run, name="watcher", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout=10.0):
+        self._stop.set(); self._wake.set()
+        t = self._thread
+        if t is not None and t is not threading.current_thread(): t.join(timeout)
+
+    def notify(self, new=1):
+        """Entries arrived some other way (a WebSub push): run priority now."""
+        if new:
+            with self._mu: self._pending = True
+        self._wake.set()
+
+    def tick(self):
+        """One poll, then the priority task if anything new is waiting; (new entries, result or None)."""
+        from .feeds import poll_priority
+        from .lease import held_elsewhere
+        if held_elsewhere("priority"):
+            return 0, "leased"        # another replica sweeps this cycle; its entries land in the shared store
+        t = time.monotonic()
+        new = poll_priority(flush=False)
+        metrics.observe("watch_poll", time.monotonic() - t)
+        with self._mu:
+            pending, self._pending = self._pending or new > 0, False
+        if not pending: return new, None
+        res = self.trigger()
+        metrics.inc("watch_triggers_total", result=res)
+        log(f"watcher: {new} new entries -> priority {res}")
+        if res in ("cooldown", "leased"):
+            with self._mu: self._pending = True
+        return new, res
+
+    def flush(self):
+        from . import feedcache, feedhealth
+        feedcache.flush()
+        feedhealth.flush()
+        self._flushed = time.monotonic()
+
+    def _housekeeping(self):
+        now = time.monotonic()
+        if now - self._flushed >= WATCH_FLUSH_SEC: self.flush()
+        if not WEBSUB_ENABLED: return
+        from .sources import current
+        youtube = current().youtube_feeds
+        if self._renewed is None or now - self._renewed >= WEBSUB_RENEW_HOURS * 3600 or youtube != self._subscribed:
+            from .websub import subscribe
+            self._renewed, self._subscribed = now, youtube
+            log(f"watcher: websub subscribe -> {subscribe(WEBSUB_CALLBACK_URL, youtube)}")
+
+    def run(self):
+        """Poll until stop(); flushes on the way out."""
+        log(f"watcher: polling priority feeds every ~{self.interval:g}s (±{self.jitter:.0%})")
+        while not self._stop.is_set():
+            try:
+                self.tick()
+            except Exception as e:
+                metrics.inc("watch_errors_total")
+                log(f"watcher error: {e}")
+            try:
+                self._housekeeping()
+            except Exception as e:
+                log(f"watcher housekeeping error: {e}")
+            self._wake.wait(self.interval * random.uniform(1 - self.jitter, 1 + self.jitter))
+            self._wake.clear()
+        self.flush()
+        log("watcher: stopped")
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="red_horizon.watcher", description="Watch the priority feeds and post within seconds.")
+    ap.add_argument("--interval", type=float, default=WATCH_INTERVAL_SEC, help="seconds between polls (jittered)")
+    ap.add_argument("--once", action="store_true", help="poll once, run priority if needed, exit")
+    args = ap.parse_args(argv)
+
+    from . import tasks
+    from .config import OUTBOX_ENABLED, OUTBOX_DRAIN_SEC
+    if OUTBOX_ENABLED and tasks.BOT_TOKEN:
+        tasks.STATE.outbox.start(tasks.BOT_TOKEN)   # resume anything an earlier run left queued
+    w = Watcher(interval=args.interval)
+    signal.signal(signal.SIGTERM, lambda *_: w.stop())
+    try:
+        if args.once:
+            print(w.tick()); w.flush()
+        else:
+            w.run()
+    except KeyboardInterrupt:
+        w.flush()
+    if "outbox" in tasks.STATE.loaded():
+        left = tasks.STATE.outbox.drain(OUTBOX_DRAIN_SEC)
+        if left: log(f"watcher: {left} message(s) left queued in state.db")
+    from .db import checkpoint
+    checkpoint()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+# red_horizon/websub.py — WebSub (PubSubHubbub) push for the YouTube priority feeds
+#
+# YouTube announces new uploads through a hub: we subscribe each channel's
+# topic with our public callback (WEBSUB_CALLBACK_URL), the hub confirms
+# with a GET carrying hub.challenge, then POSTs the Atom entry whenever the
+# channel publishes. Pushes are signed with WEBSUB_SECRET (X-Hub-Signature)
+# and map back to the configured youtube_feeds url by channel id, so the
+# entry lands in the store exactly as a poll would have put it. Leases
+# expire; the watcher renews them every WEBSUB_RENEW_HOURS. Without both a
+# callback URL and a secret (WEBSUB_ENABLED) nothing subscribes and the
+# web app serves no /websub routes: an unsigned push could be forged.
+
+import hashlib, hmac, re
+from urllib.parse import parse_qs, urlparse
+
+from . import httpclient, metrics, sources
+from .config import WEBSUB_HUB, WEBSUB_SECRET, WEBSUB_LEASE_HOURS
+from .persistence import log
+
+TOPIC = "https://www.youtube.com/xml/feeds/videos.xml?channel_id={}"
+_SELF_RE = re.compile(r"<([^>]+)>\s*;\s*rel=\"?self\"?", re.I)
+
+def _channel(url: str):
+    try: return (parse_qs(urlparse(url or "").query).get("channel_id") or [None])[0]
+    except Exception: return None
+
+def topic_for(feed_url: str):
+    ch = _channel(feed_url)
+    return TOPIC.format(ch) if ch else None
+
+def feed_for(topic: str):
+    """The youtube_feeds url a hub topic belongs to, or None if it is not ours."""
+    ch = _channel(topic)
+    return next((u for u in sources.current().youtube_feeds if ch and _channel(u) == ch), None)
+
+def topic_from(headers, body: bytes):
+    """Topic of a push: the Link rel=self header, else the feed's own self link."""
+    m = _SELF_RE.search(headers.get("Link") or "")
+    if m: return m.group(1)
+    m = re.search(rb"<link[^>]+rel=\"self\"[^>]+href=\"([^\"]+)\"", body or b"")
+    return m.group(1).decode("utf-8", "replace") if m else None
+
+def verify(body: bytes, signature: str, secret=WEBSUB_SECRET):
+    """Check X-Hub-Signature ("sha1=<hex>", or any hashlib name); False when no secret is set."""
+    if not secret: return False
+    algo, _, digest = (signature or "").partition("=")
+    if algo not in ("sha1", "sha256", "sha384", "sha512") or not digest: return False
+    mac = hmac.new(secret.encode(), body or b"", getattr(hashlib, algo)).hexdigest()
+    return hmac.compare_digest(mac, digest.strip().lower())
+
+def subscribe(callback: str, feeds=None, mode="subscribe"):
+    """Ask the hub to (un)subscribe callback to each YouTube feed; {topic: HTTP status or error}."""
+    out = {}
+    for url in feeds or sources.current().youtube_feeds:
+        topic = topic_for(url)
+        if not topic: continue
+        data = {"hub.mode": mode, "hub.topic": topic, "hub.callback": callback,
+                "hub.verify": "async", "hub.lease_seconds": str(int(WEBSUB_LEASE_HOURS * 3600))}
+        if WEBSUB_SECRET: data["hub.secret"] = WEBSUB_SECRET
+        try:
+            r = httpclient.post(WEBSUB_HUB, data=data, timeout=10, retries=2)
+            out[topic] = r.status_code
+            if r.status_code >= 300: log(f"websub {mode} {topic}: HTTP {r.status_code} {r.text[:200]}")
+        except Exception as e:
+            out[topic] = str(e)[:200]
+            log(f"websub {mode} {topic} error: {e}")
+        metrics.inc("websub_subscribe_total", status=out[topic] if isinstance(out[topic], int) else "error")
+    return out